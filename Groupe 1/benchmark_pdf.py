@@ -0,0 +1,98 @@
+"""
+Banc d'essai des moteurs d'extraction PDF (utils/documents.py) sur le CV fictif du groupe 4.
+
+Pour chaque moteur installé, mesure :
+- le débit (pages/seconde, médiane sur plusieurs répétitions) ;
+- le pic de mémoire du processus (RSS, chaque moteur est mesuré dans un processus neuf) ;
+- la fidélité du texte : part des valeurs du JSON de référence retrouvées dans le texte extrait.
+
+Utilisation :
+    python benchmark_pdf.py --repetitions 20
+    python benchmark_pdf.py --moteurs pypdf2,pypdfium2 --details
+Puis DOCUMENT_MOTEUR_PDF=<moteur> pour l'utiliser dans le bot.
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.documents import MOTEURS_PDF, lire_document
+from utils.prefiltre import normaliser
+
+DOSSIER_GROUPE_4 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Groupe 4")
+
+
+def valeurs_reference(donnees):
+    """Valeurs textuelles (feuilles) du JSON de référence"""
+    if isinstance(donnees, dict):
+        return [valeur for element in donnees.values() for valeur in valeurs_reference(element)]
+    if isinstance(donnees, list):
+        return [valeur for element in donnees for valeur in valeurs_reference(element)]
+    return [str(donnees)] if str(donnees).strip() else []
+
+
+def fidelite(texte, valeurs):
+    """Part des valeurs de référence présentes dans le texte (comparaison sans accents ni ponctuation)"""
+    texte_normalise = f" {normaliser(texte)} "
+    manquantes = [valeur for valeur in valeurs if f" {normaliser(valeur)} " not in texte_normalise]
+    return 1 - len(manquantes) / len(valeurs) if valeurs else 1.0, manquantes
+
+
+def mesurer(moteur, contenu, repetitions):
+    """Exécuté dans un processus neuf : durées d'extraction, pic de mémoire et texte obtenu"""
+    memoire_initiale = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        texte, pages, _ = lire_document("cv.pdf", contenu, moteur=moteur)
+        durees.append(time.perf_counter() - debut)
+    pic_memoire = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memoire_initiale  # Ko sous Linux
+    return durees, pages, pic_memoire, texte
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les moteurs d'extraction PDF (débit, mémoire, fidélité)")
+    parser.add_argument("--pdf", default=os.path.join(DOSSIER_GROUPE_4, "CV_Fictif.pdf"))
+    parser.add_argument("--reference", default=os.path.join(DOSSIER_GROUPE_4, "CV_Fictif_Resultat.json"),
+                        help="JSON attendu pour le PDF (valeurs à retrouver dans le texte)")
+    parser.add_argument("--moteurs", default=",".join(MOTEURS_PDF), help="Moteurs à comparer, séparés par des virgules")
+    parser.add_argument("--repetitions", type=int, default=10)
+    parser.add_argument("--details", action="store_true", help="Affiche les valeurs non retrouvées par moteur")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        contenu = f.read()
+    with open(args.reference, encoding="utf-8") as f:
+        valeurs = valeurs_reference(json.load(f))
+
+    print(f"📄 {os.path.basename(args.pdf)} ({len(contenu) / 1024:.0f} Ko), {len(valeurs)} valeurs de référence, "
+          f"{args.repetitions} répétitions\n")
+    print(f"{'Moteur':<10} {'Pages/s':>9} {'p50 (ms)':>9} {'Mémoire (Mo)':>13} {'Fidélité':>9}")
+
+    contexte = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    for moteur in [m.strip() for m in args.moteurs.split(",") if m.strip()]:
+        if moteur not in MOTEURS_PDF:
+            print(f"{moteur:<10} moteur inconnu")
+            continue
+        module = MOTEURS_PDF[moteur][0]
+        if importlib.util.find_spec(module) is None:
+            print(f"{moteur:<10} non installé (module {module} absent)")
+            continue
+
+        # Un processus par moteur : le pic de mémoire de l'un ne masque pas celui du suivant
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexte) as pool:
+            durees, pages, pic_memoire, texte = pool.submit(mesurer, moteur, contenu, args.repetitions).result()
+
+        mediane = statistics.median(durees)
+        score, manquantes = fidelite(texte, valeurs)
+        print(f"{moteur:<10} {pages / mediane:>9.1f} {mediane * 1000:>9.1f} {pic_memoire / 1024:>13.1f} {score:>9.0%}")
+        if args.details and manquantes:
+            print(f"   non retrouvées : {', '.join(manquantes)}")
+
+
+if __name__ == "__main__":
+    main()
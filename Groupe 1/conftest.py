@@ -0,0 +1,3 @@
+# conftest.py
+# Tests lancés avec pytest depuis la racine du dépôt ou depuis « Groupe 1 » : ce dossier est ajouté
+# au chemin d'import par pytest (présence de ce fichier), les tests importent donc « utils.* » comme le bot.
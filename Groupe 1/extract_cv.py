@@ -1,257 +1,332 @@
 import discord
 from discord import app_commands
 import os
-import io
-import docx
-import PyPDF2
-import requests
-import json
+import asyncio
+import time
 from utils.helper import get_user_data, cv_to_dict
+from utils.cache import cache_extractions_cv, cle_extraction_cv
+from utils.texte import compacter_texte_cv, estimer_tokens
+from utils.sections_cv import decouper_sections, CHAMPS_SECTIONS
+from utils.documents import charger_document, ErreurDocument
+from utils.json_tolerant import charger_json
+from utils.extraction_locale import CHAMPS_LOCAUX, extraire_champs_locaux, fusionner_champs_locaux
+from utils.rate_limiter import PRIORITE_INTERACTIVE, PRIORITE_ARRIERE_PLAN
+from utils.speculation import lancer_speculation, attendre_speculation, annuler_speculation
+from llm_client import appeler_llm, appeler_gemini_en_course, LLMError
 
-def setup_cv_mistral_command(bot):
-    """Configure la commande pour extraire les informations d'un CV avec Mistral"""
-    
-    @bot.tree.command(name="extraire_cv_mistral", description="Extraire les informations de votre CV avec Mistral")
-    async def extraire_cv(interaction: discord.Interaction):
-        await interaction.response.defer(thinking=True)
-        
-        # Vérifier si l'utilisateur a déjà téléchargé un CV
-        user_data = get_user_data(interaction.user.id)
-        if not user_data.cv_raw:
-            await interaction.followup.send("❌ Vous devez d'abord télécharger votre CV avec la commande `/telecharger_cv`.", ephemeral=True)
-            return
-        
-        try:
-            # Utiliser l'API Mistral pour extraire les informations du CV
-            MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-            if not MISTRAL_API_KEY:
-                await interaction.followup.send("❌ Clé API Mistral non configurée sur le serveur.", ephemeral=True)
-                return
-            
-            mistral_url = "https://api.mistral.ai/v1/chat/completions"
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {MISTRAL_API_KEY}"
-            }
-            
-            prompt = f"""
+# Version du prompt d'extraction (à incrémenter à chaque modification du prompt
+# pour invalider les extractions mises en cache)
+VERSION_PROMPT_EXTRACTION = "extraction-v3"
+
+VERSION_PROMPT_EXTRACTION_SECTIONS = "extraction-sections-v4"
+
+# Au-delà de ce nombre de tokens estimés (texte compacté), le CV est extrait section par section
+# avec des appels parallèles (0 : extraction en un seul appel)
+SEUIL_EXTRACTION_SECTIONS = int(os.getenv("EXTRACTION_SECTIONS_SEUIL", "1500"))
+
+# Modèle utilisé pour l'extraction par chaque fournisseur
+MODELES_EXTRACTION = {"gemini": "gemini-1.5-pro", "mistral": "mistral-large-latest"}
+
+# Modèles Gemini mis en concurrence pour les extractions interactives (séparés par des virgules) :
+# le suivant part après GEMINI_HEDGE_DELAI secondes sans réponse ou dès qu'un modèle échoue.
+# Un seul modèle : pas de course, appel classique avec réessais
+MODELES_COURSE_GEMINI = [m.strip() for m in os.getenv("EXTRACTION_GEMINI_MODELES", "gemini-1.5-pro,gemini-1.5-flash").split(",") if m.strip()]
+
+# Fournisseur de l'extraction lancée en arrière-plan dès le téléchargement du CV
+FOURNISSEUR_SPECULATIF = os.getenv("EXTRACTION_SPECULATIVE_FOURNISSEUR", "gemini")
+
+# Champs du CV structuré et leur description dans le prompt d'extraction
+CHAMPS_EXTRACTION = {
+    "prenom_nom": "full name of the candidate",
+    "email": "email address",
+    "telephone": "phone number",
+    "linkedin": "LinkedIn profile URL (if any)",
+    "github": "GitHub profile URL (if any)",
+    "formation": "array of education entries, each with titre, etablissement, periode, and details (array of strings)",
+    "experience": "array of professional experience, each with titre, entreprise, lieu, periode, and details (array of strings)",
+    "competences_techniques": "array of technical skills: programming languages, software and concrete tools only (no theoretical fields such as economics or mathematics)",
+    "soft_skills": "array of soft skills",
+    "langues": "array of languages and proficiency levels",
+    "certifications": "array of certifications",
+}
+CHAMPS_TEXTE = ("prenom_nom", "email", "telephone", "linkedin", "github")
+
+# Champs demandés au LLM : les coordonnées sont extraites localement (utils/extraction_locale.py)
+CHAMPS_LLM = tuple(champ for champ in CHAMPS_EXTRACTION if champ not in CHAMPS_LOCAUX)
+
+def construire_prompt_extraction(cv_text, champs=CHAMPS_LLM, compacter=True):
+    """Construit le prompt d'extraction structurée partagé par Mistral et Gemini (limité à `champs`)"""
+    if compacter:
+        cv_text = compacter_texte_cv(cv_text)
+    description_champs = "\n".join(f"            - {champ}: {CHAMPS_EXTRACTION[champ]}" for champ in champs)
+    return f"""
             Analyze the following CV and extract information in a structured format.
             Return a JSON object with the following fields:
-            - prenom_nom: full name of the candidate
-            - email: email address
-            - telephone: phone number
-            - linkedin: LinkedIn profile URL (if any)
-            - github: GitHub profile URL (if any)
-            - formation: array of education entries, each with titre, etablissement, periode, and details (array of strings)
-            - experience: array of professional experience, each with titre, entreprise, lieu, periode, and details (array of strings)
-            - competences_techniques: array of technical skills
-            - soft_skills: array of soft skills
-            - langues: array of languages and proficiency levels
-            - certifications: array of certifications
+{description_champs}
 
             CV text:
-            {user_data.cv_raw}
+            {cv_text}
             """
-            
-            data = {
-                "model": "mistral-large-latest",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.2
-            }
-            
-            response = requests.post(mistral_url, headers=headers, json=data)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                # Extraire le JSON de la réponse
-                start_index = content.find('{')
-                end_index = content.rfind('}') + 1
-                
-                if start_index >= 0 and end_index > start_index:
-                    json_content = content[start_index:end_index]
-                    try:
-                        cv_data = json.loads(json_content)
-                        
-                        # Stocker les données structurées
-                        user_data.cv_structured = cv_data
-                        
-                        # Créer un résumé pour l'affichage
-                        embed = discord.Embed(
-                            title="✅ CV analysé avec succès",
-                            description=f"Nom: {cv_data.get('prenom_nom', 'Non détecté')}\nEmail: {cv_data.get('email', 'Non détecté')}",
-                            color=discord.Color.green()
-                        )
-                        
-                        # Ajouter d'autres champs
-                        if cv_data.get('formation'):
-                            formations = "\n".join([f"• {f.get('titre', 'N/A')} - {f.get('etablissement', 'N/A')}" for f in cv_data.get('formation', [])[:2]])
-                            embed.add_field(name="📚 Formation", value=formations, inline=False)
-                        
-                        if cv_data.get('experience'):
-                            experiences = "\n".join([f"• {e.get('titre', 'N/A')} - {e.get('entreprise', 'N/A')}" for e in cv_data.get('experience', [])[:2]])
-                            embed.add_field(name="💼 Expérience", value=experiences, inline=False)
-                        
-                        if cv_data.get('competences_techniques'):
-                            competences = ", ".join(cv_data.get('competences_techniques', [])[:5])
-                            embed.add_field(name="🛠️ Compétences techniques", value=competences, inline=False)
-                        
-                        # Suggestions pour les prochaines étapes
-                        embed.add_field(
-                            name="📋 Prochaine étape", 
-                            value="1. Utilisez `/analyser_cv_offre` pour évaluer la compatibilité", 
-                            inline=False
-                        )
-                        
-                        await interaction.followup.send(embed=embed)
-                    except json.JSONDecodeError:
-                        # Si la réponse n'est pas du JSON valide, essayer de la convertir
-                        structured_cv = cv_to_dict(content)
-                        user_data.cv_structured = structured_cv
-                        await interaction.followup.send("✅ CV analysé. Les données ont été structurées mais le format n'était pas optimal.")
-                else:
-                    await interaction.followup.send("❌ Impossible d'extraire les données structurées du CV.", ephemeral=True)
-            else:
-                await interaction.followup.send(f"❌ Erreur API Mistral: {response.status_code} - {response.text}", ephemeral=True)
-                
-        except Exception as e:
-            print(f"Erreur lors de l'extraction du CV: {e}")
-            await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
 
-def setup_cv_gemini_command(bot):
-    """Configure la commande pour extraire les informations d'un CV avec Gemini"""
+def lire_cv_json(content):
+    """CV structuré contenu dans une réponse LLM (JSON réparé si nécessaire)"""
+    cv_data = charger_json(content)
+    if not isinstance(cv_data, dict):
+        raise ValueError("la réponse n'est pas un objet JSON")
+    return cv_data
+
+def creer_embed_cv(cv_data, titre):
+    """Crée l'embed Discord résumant un CV structuré"""
+    embed = discord.Embed(
+        title=titre,
+        description=f"Nom: {cv_data.get('prenom_nom', 'Non détecté')}\nEmail: {cv_data.get('email', 'Non détecté')}",
+        color=discord.Color.green()
+    )
     
-    @bot.tree.command(name="extraire_cv_gemini", description="Extraire les informations de votre CV avec Gemini")
-    async def extraire_cv_gemini(interaction: discord.Interaction):
-        await interaction.response.defer(thinking=True)
-        
-        # Vérifier si l'utilisateur a déjà téléchargé un CV
-        user_data = get_user_data(interaction.user.id)
-        if not user_data.cv_raw:
-            await interaction.followup.send("❌ Vous devez d'abord télécharger votre CV avec la commande `/telecharger_cv`.", ephemeral=True)
+    # Ajouter d'autres champs
+    if cv_data.get('formation'):
+        formations = "\n".join([f"• {f.get('titre', 'N/A')} - {f.get('etablissement', 'N/A')}" for f in cv_data.get('formation', [])[:2]])
+        embed.add_field(name="📚 Formation", value=formations, inline=False)
+    
+    if cv_data.get('experience'):
+        experiences = "\n".join([f"• {e.get('titre', 'N/A')} - {e.get('entreprise', 'N/A')}" for e in cv_data.get('experience', [])[:2]])
+        embed.add_field(name="💼 Expérience", value=experiences, inline=False)
+    
+    if cv_data.get('competences_techniques'):
+        competences = ", ".join(cv_data.get('competences_techniques', [])[:5])
+        embed.add_field(name="🛠️ Compétences techniques", value=competences, inline=False)
+    
+    # Suggestions pour les prochaines étapes
+    embed.add_field(
+        name="📋 Prochaine étape", 
+        value="1. Utilisez `/analyser_cv_offre` pour évaluer la compatibilité", 
+        inline=False
+    )
+    return embed
+
+async def extraire_cv_structure(cv_raw, fournisseur, api_key, priorite=PRIORITE_INTERACTIVE):
+    """
+    Extrait le CV structuré (cache, appel LLM avec bascule vers l'autre fournisseur, lecture JSON tolérante).
+    Email, téléphone, LinkedIn et GitHub sont extraits localement ; les outils du catalogue complètent ceux du LLM.
+
+    Returns:
+        tuple: (données du CV, fournisseur utilisé, format JSON exploitable)
+
+    Raises:
+        LLMError: si aucun fournisseur n'a pu répondre.
+    """
+    # Les CV longs sont extraits par sections, en parallèle
+    texte_compacte = compacter_texte_cv(cv_raw)
+    sections = None
+    if SEUIL_EXTRACTION_SECTIONS and estimer_tokens(texte_compacte) > SEUIL_EXTRACTION_SECTIONS:
+        sections = decouper_sections(texte_compacte)
+        if len(sections) < 3:
+            # Titres de section non reconnus : le découpage n'apporterait rien
+            sections = None
+    version = VERSION_PROMPT_EXTRACTION_SECTIONS if sections else VERSION_PROMPT_EXTRACTION
+
+    # Réutiliser une extraction déjà validée pour ce même CV
+    modele = MODELES_EXTRACTION[fournisseur]
+    cle_cache = cle_extraction_cv(cv_raw, fournisseur, modele, version)
+    cv_data = await cache_extractions_cv.get_async(cle_cache)
+    if cv_data is not None:
+        print(f"♻️ Extraction {fournisseur} servie depuis le cache ({await cache_extractions_cv.statistiques_async()})")
+        return cv_data, fournisseur, True
+
+    locaux = extraire_champs_locaux(texte_compacte)
+    if sections:
+        resultat = await extraire_par_sections(sections, texte_compacte, fournisseur, api_key, priorite)
+        if resultat:
+            cv_data, utilise = resultat
+            fusionner_champs_locaux(cv_data, locaux)
+            await cache_extractions_cv.set_async(cle_extraction_cv(cv_raw, utilise, MODELES_EXTRACTION[utilise], version), cv_data)
+            return cv_data, utilise, True
+        # Une section a échoué : extraction complète en un seul appel
+        version = VERSION_PROMPT_EXTRACTION
+        cle_cache = cle_extraction_cv(cv_raw, fournisseur, modele, version)
+
+    prompt = construire_prompt_extraction(texte_compacte, compacter=False)
+    if fournisseur == "gemini" and priorite == PRIORITE_INTERACTIVE and len(MODELES_COURSE_GEMINI) > 1:
+        # Un utilisateur attend : modèles Gemini mis en concurrence. Les travaux d'arrière-plan
+        # (spéculation, ingestion) n'en ont pas besoin et n'occupent qu'un modèle
+        cv_data, gagnant, _ = await appeler_gemini_en_course(prompt, MODELES_COURSE_GEMINI, lire_cv_json,
+                                                             api_key=api_key, priorite=priorite, format_json=True)
+        if cv_data is not None:
+            fusionner_champs_locaux(cv_data, locaux)
+            await cache_extractions_cv.set_async(cle_extraction_cv(cv_raw, fournisseur, gagnant, version), cv_data)
+            return cv_data, fournisseur, True
+        # Tous les modèles ont échoué : appel classique, avec réessais et bascule vers Mistral
+
+    content, utilise, modele = await appeler_llm(prompt, fournisseur, model=modele, api_key=api_key, priorite=priorite, format_json=True)
+    if utilise != fournisseur:
+        cle_cache = cle_extraction_cv(cv_raw, utilise, modele, version)
+
+    # Extraire le JSON de la réponse (réparé s'il est tronqué ou mal formé)
+    try:
+        cv_data = lire_cv_json(content)
+    except ValueError:
+        # Si la réponse n'est pas du JSON exploitable, essayer de la convertir
+        return fusionner_champs_locaux(cv_to_dict(content), locaux), utilise, False
+
+    fusionner_champs_locaux(cv_data, locaux)
+    await cache_extractions_cv.set_async(cle_cache, cv_data)
+    return cv_data, utilise, True
+
+async def extraire_section(section, texte, champs, fournisseur, api_key, priorite):
+    """Extrait les `champs` d'une section du CV ; retourne (valeurs, fournisseur utilisé)"""
+    prompt = construire_prompt_extraction(texte, champs, compacter=False)
+    content, utilise, _ = await appeler_llm(prompt, fournisseur, model=MODELES_EXTRACTION[fournisseur],
+                                            api_key=api_key, priorite=priorite, format_json=True)
+    donnees = charger_json(content)
+    if not isinstance(donnees, dict):
+        raise ValueError(f"section {section} : la réponse n'est pas un objet JSON")
+    return {champ: donnees[champ] for champ in champs if champ in donnees}, utilise
+
+async def extraire_par_sections(sections, texte_complet, fournisseur, api_key, priorite=PRIORITE_INTERACTIVE):
+    """
+    Extrait chaque section détectée avec un appel LLM plus court, tous en parallèle :
+    la durée totale est celle de la section la plus lente. Les résultats partiels sont
+    fusionnés dans le schéma du CV structuré (champs absents : chaîne ou liste vide).
+
+    Returns:
+        tuple: (données du CV, fournisseur majoritaire), ou None si une section a échoué.
+    """
+    champs_par_section = {section: [c for c in CHAMPS_SECTIONS[section] if c in CHAMPS_LLM] for section in sections}
+    # Champs d'une section dont le titre n'a pas été reconnu (« Technical Skills »...) : son texte
+    # a été rattaché à la section précédente, ils sont donc demandés sur le CV complet
+    orphelins = [c for section, champs in CHAMPS_SECTIONS.items() if section not in sections
+                 for c in champs if c in CHAMPS_LLM]
+    if orphelins:
+        sections = {**sections, "cv_complet": texte_complet}
+        champs_par_section["cv_complet"] = orphelins
+    # Section dont tous les champs sont extraits localement : aucun appel
+    sections = {section: texte for section, texte in sections.items() if champs_par_section[section]}
+
+    debut = time.monotonic()
+    resultats = await asyncio.gather(*(
+        extraire_section(section, texte, champs_par_section[section], fournisseur, api_key, priorite)
+        for section, texte in sections.items()
+    ), return_exceptions=True)
+
+    echecs = [r for r in resultats if isinstance(r, BaseException)]
+    if echecs:
+        print(f"⚠️ Extraction par sections abandonnée ({len(echecs)} échec(s) : {echecs[0]})")
+        return None
+
+    cv_data = {champ: "" if champ in CHAMPS_TEXTE else [] for champ in CHAMPS_EXTRACTION}
+    fournisseurs = []
+    for champs, utilise in resultats:
+        cv_data.update(champs)
+        fournisseurs.append(utilise)
+    print(f"🧩 CV extrait en {len(resultats)} sections parallèles ({', '.join(sections)}) en {time.monotonic() - debut:.1f}s")
+    return cv_data, max(set(fournisseurs), key=fournisseurs.count)
+
+def lancer_extraction_speculative(user_data):
+    """
+    Lance l'extraction du CV en arrière-plan (basse priorité) dès son téléchargement,
+    pour que /extraire_cv_gemini ou /extraire_cv_mistral n'ait plus qu'à récupérer le résultat.
+    """
+    annuler_speculation(user_data.extraction_speculative and user_data.extraction_speculative["tache"])
+    user_data.extraction_speculative = None
+
+    # Fournisseur préféré, ou l'autre si sa clé API est absente
+    fournisseur = FOURNISSEUR_SPECULATIF if os.getenv(f"{FOURNISSEUR_SPECULATIF.upper()}_API_KEY") else \
+        next((f for f in MODELES_EXTRACTION if os.getenv(f"{f.upper()}_API_KEY")), FOURNISSEUR_SPECULATIF)
+    api_key = os.getenv(f"{fournisseur.upper()}_API_KEY")
+    tache = lancer_speculation(
+        "extraction",
+        extraire_cv_structure(user_data.cv_raw, fournisseur, api_key, PRIORITE_ARRIERE_PLAN),
+        fournisseur, MODELES_EXTRACTION[fournisseur], api_key
+    )
+    if tache:
+        user_data.extraction_speculative = {"cv_raw": user_data.cv_raw, "fournisseur": fournisseur, "tache": tache}
+        print(f"🔮 Extraction spéculative du CV de {user_data.user_id} lancée ({fournisseur})")
+    return tache is not None
+
+async def obtenir_extraction(user_data, fournisseur, api_key):
+    """
+    Rattache la commande à l'extraction spéculative du même CV et du même fournisseur
+    (en cours ou terminée) ; sinon, ou si elle a échoué, lance l'extraction normalement.
+    """
+    speculative = user_data.extraction_speculative
+    # Entrée détachée avant l'attente : un nouveau /telecharger_cv n'annule plus la tâche attendue
+    user_data.extraction_speculative = None
+    if (speculative and speculative["fournisseur"] == fournisseur and speculative["cv_raw"] == user_data.cv_raw
+            and not speculative["tache"].cancelled()):
+        tache = speculative["tache"]
+        try:
+            resultat = await attendre_speculation(tache)
+            print(f"🔮 Extraction spéculative utilisée pour {user_data.user_id}")
+            return resultat
+        except LLMError as e:
+            print(f"⚠️ Extraction spéculative échouée ({e}), nouvelle tentative")
+        except asyncio.CancelledError:
+            # Seule l'annulation de la tâche spéculative est rattrapée, pas celle de la commande
+            if not tache.cancelled():
+                raise
+            print("⚠️ Extraction spéculative annulée, nouvelle tentative")
+    elif speculative:
+        # Autre fournisseur ou CV remplacé : le travail spéculatif ne servira pas
+        annuler_speculation(speculative["tache"])
+
+    return await extraire_cv_structure(user_data.cv_raw, fournisseur, api_key)
+
+async def executer_commande_extraction(interaction, fournisseur):
+    """Corps commun de /extraire_cv_mistral et /extraire_cv_gemini"""
+    nom = fournisseur.capitalize()
+    autre = "Gemini" if fournisseur == "mistral" else "Mistral"
+    
+    # Vérifier si l'utilisateur a déjà téléchargé un CV
+    user_data = get_user_data(interaction.user.id)
+    if not user_data.cv_raw:
+        await interaction.followup.send("❌ Vous devez d'abord télécharger votre CV avec la commande `/telecharger_cv`.", ephemeral=True)
+        return
+    
+    try:
+        # Utiliser l'API du fournisseur demandé pour extraire les informations du CV
+        api_key = os.getenv(f"{fournisseur.upper()}_API_KEY")
+        if not api_key:
+            await interaction.followup.send(f"❌ Clé API {nom} non configurée sur le serveur.", ephemeral=True)
             return
         
         try:
-            # Utiliser l'API Gemini pour extraire les informations du CV
-            GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-            if not GEMINI_API_KEY:
-                await interaction.followup.send("❌ Clé API Gemini non configurée sur le serveur.", ephemeral=True)
-                return
-            
-            url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent"
-            headers = {"Content-Type": "application/json"}
-            params = {"key": GEMINI_API_KEY}
+            # Bascule automatique vers l'autre fournisseur en cas de panne
+            cv_data, utilise, format_ok = await obtenir_extraction(user_data, fournisseur, api_key)
+        except LLMError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+            return
+        
+        # Stocker les données structurées
+        user_data.cv_structured = cv_data
+        if not format_ok:
+            await interaction.followup.send("✅ CV analysé. Les données ont été structurées mais le format n'était pas optimal.")
+            return
+        
+        if utilise != fournisseur:
+            titre = f"✅ CV analysé avec succès ({nom} indisponible, analyse réalisée par {autre})"
+        else:
+            titre = "✅ CV analysé avec succès" + (" (Gemini)" if fournisseur == "gemini" else "")
+        await interaction.followup.send(embed=creer_embed_cv(cv_data, titre))
             
-            prompt = f"""
-            Analyze the following CV and extract information in a structured format.
-            Return a JSON object with the following fields:
-            - prenom_nom: full name of the candidate
-            - email: email address
-            - telephone: phone number
-            - linkedin: LinkedIn profile URL (if any)
-            - github: GitHub profile URL (if any)
-            - formation: array of education entries, each with titre, etablissement, periode, and details (array of strings)
-            - experience: array of professional experience, each with titre, entreprise, lieu, periode, and details (array of strings)
-            - competences_techniques: array of technical skills
-            - soft_skills: array of soft skills
-            - langues: array of languages and proficiency levels
-            - certifications: array of certifications
+    except Exception as e:
+        print(f"Erreur lors de l'extraction du CV avec {nom}: {e}")
+        await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
 
-            CV text:
-            {user_data.cv_raw}
-            """
-            
-            data = {
-                "contents": [
-                    {
-                        "role": "user",
-                        "parts": [{"text": prompt}]
-                    }
-                ]
-            }
-            
-            response = requests.post(url, headers=headers, params=params, json=data)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-                
-                # Extraire le JSON de la réponse
-                start_index = content.find('{')
-                end_index = content.rfind('}') + 1
-                
-                if start_index >= 0 and end_index > start_index:
-                    json_content = content[start_index:end_index]
-                    try:
-                        cv_data = json.loads(json_content)
-                        
-                        # Stocker les données structurées
-                        user_data.cv_structured = cv_data
-                        
-                        # Créer un résumé pour l'affichage
-                        embed = discord.Embed(
-                            title="✅ CV analysé avec succès (Gemini)",
-                            description=f"Nom: {cv_data.get('prenom_nom', 'Non détecté')}\nEmail: {cv_data.get('email', 'Non détecté')}",
-                            color=discord.Color.green()
-                        )
-                        
-                        # Ajouter d'autres champs
-                        if cv_data.get('formation'):
-                            formations = "\n".join([f"• {f.get('titre', 'N/A')} - {f.get('etablissement', 'N/A')}" for f in cv_data.get('formation', [])[:2]])
-                            embed.add_field(name="📚 Formation", value=formations, inline=False)
-                        
-                        if cv_data.get('experience'):
-                            experiences = "\n".join([f"• {e.get('titre', 'N/A')} - {e.get('entreprise', 'N/A')}" for e in cv_data.get('experience', [])[:2]])
-                            embed.add_field(name="💼 Expérience", value=experiences, inline=False)
-                        
-                        if cv_data.get('competences_techniques'):
-                            competences = ", ".join(cv_data.get('competences_techniques', [])[:5])
-                            embed.add_field(name="🛠️ Compétences techniques", value=competences, inline=False)
-                        
-                        # Suggestions pour les prochaines étapes
-                        embed.add_field(
-                            name="📋 Prochaine étape", 
-                            value="1. Utilisez `/analyser_cv_offre` pour évaluer la compatibilité",
-                            inline=False
-                        )
-                        
-                        await interaction.followup.send(embed=embed)
-                    except json.JSONDecodeError:
-                        # Si la réponse n'est pas du JSON valide, essayer de la convertir
-                        structured_cv = cv_to_dict(content)
-                        user_data.cv_structured = structured_cv
-                        await interaction.followup.send("✅ CV analysé. Les données ont été structurées mais le format n'était pas optimal.")
-                else:
-                    await interaction.followup.send("❌ Impossible d'extraire les données structurées du CV.", ephemeral=True)
-            else:
-                await interaction.followup.send(f"❌ Erreur API Gemini: {response.status_code} - {response.text}", ephemeral=True)
-                
-        except Exception as e:
-            print(f"Erreur lors de l'extraction du CV avec Gemini: {e}")
-            await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
-
-# Fonction pour extraire le texte d'un fichier
-async def extract_text_from_file(attachment):
-    """Extrait le texte d'un fichier PDF, DOCX ou TXT"""
-    file_bytes = await attachment.read()
-    file_stream = io.BytesIO(file_bytes)
-    text = ""
+def setup_cv_mistral_command(bot):
+    """Configure la commande pour extraire les informations d'un CV avec Mistral"""
     
-    if attachment.filename.lower().endswith('.pdf'):
-        reader = PyPDF2.PdfReader(file_stream)
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-    elif attachment.filename.lower().endswith('.docx'):
-        doc = docx.Document(file_stream)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-    elif attachment.filename.lower().endswith('.txt'):
-        text = file_stream.read().decode('utf-8')
-    else:
-        text = "Format non supporté. Veuillez télécharger un fichier PDF, DOCX ou TXT."
+    @bot.tree.command(name="extraire_cv_mistral", description="Extraire les informations de votre CV avec Mistral")
+    async def extraire_cv(interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True)
+        await executer_commande_extraction(interaction, "mistral")
+
+def setup_cv_gemini_command(bot):
+    """Configure la commande pour extraire les informations d'un CV avec Gemini"""
     
-    return text
+    @bot.tree.command(name="extraire_cv_gemini", description="Extraire les informations de votre CV avec Gemini")
+    async def extraire_cv_gemini(interaction: discord.Interaction):
+        await interaction.response.defer(thinking=True)
+        await executer_commande_extraction(interaction, "gemini")
 
 # Commande pour télécharger un CV
 def setup_upload_cv_command(bot):
@@ -267,14 +342,22 @@ def setup_upload_cv_command(bot):
                 await interaction.followup.send("❌ Format non supporté. Veuillez télécharger un fichier PDF, DOCX ou TXT.", ephemeral=True)
                 return
             
-            # Extraire le texte du fichier
-            cv_text = await extract_text_from_file(fichier)
+            # Extraire le texte du fichier (lecture dans le pool de processus, budgets de pages et de caractères)
+            try:
+                document = await charger_document(fichier.filename, await fichier.read())
+            except ErreurDocument as e:
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+                return
+            cv_text = document.texte
             
             # Stocker le CV pour cet utilisateur
             user_data = get_user_data(interaction.user.id)
             user_data.cv_raw = cv_text
             user_data.cv_file_name = fichier.filename
             
+            # Préparer l'extraction pendant que l'utilisateur lit la réponse
+            speculation = lancer_extraction_speculative(user_data)
+            
             # Afficher un aperçu du texte extrait
             preview = cv_text[:200] + "..." if len(cv_text) > 200 else cv_text
             
@@ -289,6 +372,10 @@ def setup_upload_cv_command(bot):
                 value="1. Utilisez `/extraire_cv_gemini` ou `extraire_cv_mistral` pour analyser votre CV\n2. Utilisez bien `/scrape` pour trouver des offres et en sélectionner une", 
                 inline=False
             )
+            if document.troncature:
+                embed.add_field(name="✂️ Lecture partielle", value=document.troncature, inline=False)
+            if speculation:
+                embed.set_footer(text="🔮 L'analyse de votre CV a déjà commencé en arrière-plan")
             
             await interaction.followup.send(embed=embed)
             
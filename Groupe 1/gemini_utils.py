@@ -1,17 +1,89 @@
-import io
 import json
-import PyPDF2
+import time
 import google.generativeai as genai
-import re
 import os
 from dotenv import load_dotenv
+from llm_client import appeler_gemini_en_course, DELAI_HEDGE_GEMINI
+from utils.texte import compacter_texte_cv
+from utils.json_tolerant import charger_json
+from utils.extraction_locale import extraire_champs_locaux, fusionner_champs_locaux
+from utils.documents import texte_document, extraire_texte_document, ErreurDocument
+from utils.metriques import enregistrer_appel, RESULTAT_SUCCES
 
 # Charger les variables d'environnement
 load_dotenv()
 
 # Configuration Gemini - Obtenir la clé API depuis les variables d'environnement
 GENAI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GENAI_API_KEY)
+if os.getenv("GEMINI_API_BASE"):
+    # Point d'accès alternatif (ex. serveur_llm_local.py) : le SDK passe alors par l'API REST
+    genai.configure(api_key=GENAI_API_KEY, transport="rest",
+                    client_options={"api_endpoint": os.getenv("GEMINI_API_BASE").rstrip("/")})
+else:
+    genai.configure(api_key=GENAI_API_KEY)
+
+# Modèles essayés par extract_with_gemini_fallback, dans l'ordre de préférence
+MODELES_GEMINI = [
+    "gemini-1.5-pro",
+    "gemini-1.5-flash",
+    "gemini-1.5-pro-latest",
+    "gemini-1.5-flash-latest",
+    "gemini-2.0-pro-exp",
+    "gemini-2.0-flash"
+]
+
+# Mode hedgé : délai (en secondes) avant de lancer le modèle candidat suivant
+DELAI_HEDGE = DELAI_HEDGE_GEMINI
+
+def construire_prompt_cv(texte_cv):
+    """
+    Construit le prompt de conversion d'un CV en JSON structuré
+    (coordonnées et profils sont extraits localement, voir reponse_vers_json)
+    """
+    texte_cv = compacter_texte_cv(texte_cv)
+    return f"""Voici un CV. Convertis-le en JSON structuré :
+    {{
+        "prenom_nom": "",
+        "competences_techniques": [],
+        "soft_skills": [],
+        "langues": [],
+        "certifications": [],
+        "formation": [{{"titre": "", "etablissement": "", "periode": "", "details": []}}],
+        "experience": [{{"titre": "", "entreprise": "", "lieu": "", "periode": "", "details": []}}]
+    }}
+    Texte :
+    {texte_cv}
+    """
+
+def reponse_vers_json(content, texte_cv=""):
+    """
+    Extrait et valide le JSON d'une réponse Gemini (réparé si nécessaire), y ajoute les champs
+    extraits localement du texte du CV et complète les champs manquants.
+    Lève une exception si la réponse ne contient pas de JSON exploitable.
+    """
+    json_obj = charger_json(content)
+    if not isinstance(json_obj, dict):
+        raise ValueError("la réponse n'est pas un objet JSON")
+    fusionner_champs_locaux(json_obj, extraire_champs_locaux(texte_cv))
+    
+    for champ in ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]:
+        if champ not in json_obj:
+            json_obj[champ] = "" if champ in ["linkedin", "github"] else []
+    
+    return json.dumps(json_obj, ensure_ascii=False, indent=2)
+
+def generer_avec_mesure(model, model_name, prompt, **options):
+    """Appel generate_content du SDK, enregistré dans les métriques des appels LLM"""
+    debut = time.perf_counter()
+    try:
+        response = model.generate_content(prompt, **options)
+    except Exception as e:
+        enregistrer_appel("gemini", model_name, time.perf_counter() - debut, f"erreur {type(e).__name__}")
+        raise
+    usage = getattr(response, "usage_metadata", None)
+    enregistrer_appel("gemini", model_name, time.perf_counter() - debut, RESULTAT_SUCCES,
+                      getattr(usage, "prompt_token_count", 0), getattr(usage, "candidates_token_count", 0))
+    return response
 
 # Fonction pour lister les modèles disponibles
 def list_available_models():
@@ -41,12 +113,8 @@ def extract_text_from_pdf(pdf_bytes):
         str: texte extrait.
     """
     try:
-        texte = ""
-        pdf = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        for page in pdf.pages:
-            texte += page.extract_text() + "\n"
-        return texte
-    except Exception as e:
+        return texte_document("cv.pdf", pdf_bytes)
+    except ErreurDocument as e:
         print(f"Erreur extraction PDF Gemini : {e}")
         return None
 
@@ -66,23 +134,7 @@ def extract_with_gemini(pdf_bytes):
     if not texte_cv:
         return None
     
-    prompt = f"""Voici un CV. Convertis-le en JSON structuré :
-    {{
-        "prenom_nom": "",
-        "email": "",
-        "telephone": "",
-        "linkedin": "",
-        "github": "",
-        "competences_techniques": [],
-        "soft_skills": [],
-        "langues": [],
-        "certifications": [],
-        "formation": [{{"titre": "", "etablissement": "", "periode": "", "details": []}}],
-        "experience": [{{"titre": "", "entreprise": "", "lieu": "", "periode": "", "details": []}}]
-    }}
-    Texte :
-    {texte_cv}
-    """
+    prompt = construire_prompt_cv(texte_cv)
     
     try:
         print(f"Tentative de génération avec le modèle: {MODEL_NAME}")
@@ -92,6 +144,7 @@ def extract_with_gemini(pdf_bytes):
         generation_config = {
             "temperature": 0.2,  # Plus bas pour des réponses plus cohérentes
             "max_output_tokens": 8192,  # Limite la taille de la réponse
+            "response_mime_type": "application/json",  # Sortie JSON native
         }
         
         safety_settings = [
@@ -113,7 +166,9 @@ def extract_with_gemini(pdf_bytes):
             }
         ]
         
-        response = model.generate_content(
+        response = generer_avec_mesure(
+            model,
+            MODEL_NAME,
             prompt,
             generation_config=generation_config,
             safety_settings=safety_settings
@@ -136,24 +191,10 @@ def extract_with_gemini(pdf_bytes):
             print(f"Attributs de réponse: {dir(response)}")
             return None
             
-        json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
-        match = re.search(json_pattern, content)
-        json_str = match.group(1) or match.group(2) if match else content
-        
-        # Nettoyer le JSON pour éviter les erreurs de parsing
-        json_str = json_str.strip()
-        
         # Débogage
-        print(f"JSON extrait: {json_str[:200]}...")
-        
-        json_obj = json.loads(json_str)
+        print(f"Réponse reçue: {content[:200]}...")
         
-        # Ajouter les champs manquants
-        for champ in ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]:
-            if champ not in json_obj:
-                json_obj[champ] = "" if champ in ["linkedin", "github"] else []
-                
-        return json.dumps(json_obj, ensure_ascii=False, indent=2)
+        return reponse_vers_json(content, texte_cv)
     except Exception as e:
         print(f"Erreur Gemini: {e}")
         import traceback
@@ -164,38 +205,16 @@ def extract_with_gemini(pdf_bytes):
 def extract_with_gemini_fallback(pdf_bytes):
     """
     Version alternative qui essaie différents modèles Gemini si le premier échoue.
+    Depuis la boucle asyncio du bot, utiliser extract_with_gemini_hedged (modèles mis en concurrence).
     """
     # Liste des modèles à essayer dans l'ordre
-    models_to_try = [
-        "gemini-1.5-pro",
-        "gemini-1.5-flash",
-        "gemini-1.5-pro-latest",
-        "gemini-1.5-flash-latest",
-        "gemini-2.0-pro-exp",
-        "gemini-2.0-flash"
-    ]
+    models_to_try = MODELES_GEMINI
     
     texte_cv = extract_text_from_pdf(pdf_bytes)
     if not texte_cv:
         return None
     
-    prompt = f"""Voici un CV. Convertis-le en JSON structuré :
-    {{
-        "prenom_nom": "",
-        "email": "",
-        "telephone": "",
-        "linkedin": "",
-        "github": "",
-        "competences_techniques": [],
-        "soft_skills": [],
-        "langues": [],
-        "certifications": [],
-        "formation": [{{"titre": "", "etablissement": "", "periode": "", "details": []}}],
-        "experience": [{{"titre": "", "entreprise": "", "lieu": "", "periode": "", "details": []}}]
-    }}
-    Texte :
-    {texte_cv}
-    """
+    prompt = construire_prompt_cv(texte_cv)
     
     last_error = None
     
@@ -203,7 +222,7 @@ def extract_with_gemini_fallback(pdf_bytes):
         try:
             print(f"Tentative avec le modèle: {model_name}")
             model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
+            response = generer_avec_mesure(model, model_name, prompt, generation_config={"response_mime_type": "application/json"})
             
             # Traitement de la réponse similaire à la fonction principale
             if hasattr(response, 'text'):
@@ -216,19 +235,9 @@ def extract_with_gemini_fallback(pdf_bytes):
                 print(f"Format de réponse non reconnu pour {model_name}")
                 continue
                 
-            json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
-            match = re.search(json_pattern, content)
-            json_str = match.group(1) or match.group(2) if match else content
-            json_str = json_str.strip()
-            
-            json_obj = json.loads(json_str)
-            
-            for champ in ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]:
-                if champ not in json_obj:
-                    json_obj[champ] = "" if champ in ["linkedin", "github"] else []
-                    
+            json_str = reponse_vers_json(content, texte_cv)
             print(f"Succès avec le modèle {model_name}")
-            return json.dumps(json_obj, ensure_ascii=False, indent=2)
+            return json_str
         
         except Exception as e:
             print(f"Échec avec le modèle {model_name}: {e}")
@@ -242,6 +251,47 @@ def extract_with_gemini_fallback(pdf_bytes):
         traceback.print_exc()
     return None
 
+async def course_modeles_gemini(prompt, models=None, delai_hedge=DELAI_HEDGE, texte_cv=""):
+    """
+    Mode hedgé : lance le modèle principal, puis le candidat suivant après `delai_hedge`
+    secondes sans réponse ou dès qu'un modèle échoue (appels sans réessai, voir
+    llm_client.appeler_gemini_en_course). Le premier JSON valide l'emporte
+    et les requêtes encore en cours sont annulées.
+    
+    Returns:
+        tuple: (JSON structuré ou None, modèle gagnant ou None, durée en secondes)
+    """
+    return await appeler_gemini_en_course(
+        prompt,
+        models or MODELES_GEMINI,
+        valider=lambda content: reponse_vers_json(content, texte_cv),
+        delai_hedge=delai_hedge,
+        api_key=GENAI_API_KEY,
+        generation_config={"temperature": 0.2, "maxOutputTokens": 8192},
+        format_json=True
+    )
+
+async def extract_with_gemini_hedged(pdf_bytes, models=None, delai_hedge=DELAI_HEDGE):
+    """
+    Version asynchrone et hedgée de extract_with_gemini_fallback.
+    Args:
+        pdf_bytes (bytes): contenu du fichier PDF.
+        models (list): modèles candidats, dans l'ordre de préférence.
+        delai_hedge (float): délai avant de lancer le candidat suivant.
+    Returns:
+        tuple: (JSON structuré ou None, modèle gagnant ou None, durée en secondes)
+    """
+    try:
+        # Lecture dans le pool de processus : la boucle d'événements n'est pas bloquée
+        texte_cv = await extraire_texte_document("cv.pdf", pdf_bytes)
+    except ErreurDocument as e:
+        print(f"Erreur extraction PDF Gemini : {e}")
+        return None, None, 0.0
+    if not texte_cv:
+        return None, None, 0.0
+    
+    return await course_modeles_gemini(construire_prompt_cv(texte_cv), models, delai_hedge, texte_cv)
+
 # Exécuter cette fonction si le script est lancé directement
 if __name__ == "__main__":
     print("Vérification des modèles disponibles...")
@@ -0,0 +1,177 @@
+"""
+Ingestion en masse de CV (PDF, DOCX, TXT) hors Discord, pour le service carrières en début de semestre.
+
+Chaque fichier suit le même chemin que /telecharger_cv puis /extraire_cv_* : lecture dans le pool
+de processus (utils/documents.py), puis structuration par Mistral ou Gemini (extraire_cv_structure,
+avec cache, extraction locale des coordonnées et bascule vers l'autre fournisseur).
+
+- Concurrence bornée : au plus --concurrence CV en cours de structuration à la fois.
+- Reprise : chaque CV réussi est ajouté immédiatement au fichier JSONL de sortie ; une relance
+  ignore les fichiers déjà présents avec le même contenu (empreinte SHA-256).
+- Les échecs, y compris les réponses LLM au format JSON inexploitable, sont consignés dans
+  <sortie>.erreurs.jsonl et retentés à la relance suivante.
+
+Utilisation :
+    python ingestion_cv.py cvs_promo_2025/ --sortie cvs_promo_2025.jsonl --fournisseur mistral --concurrence 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from utils import documents
+from utils.documents import EXTENSIONS_SUPPORTEES, charger_document, fermer_pool_documents, ErreurDocument
+from utils.metriques import definir_commande, totaux_commande
+from utils.rate_limiter import PRIORITE_ARRIERE_PLAN
+from extract_cv import extraire_cv_structure, MODELES_EXTRACTION
+from llm_client import fermer_sessions
+
+
+def lister_fichiers(dossier):
+    """Fichiers PDF, DOCX et TXT du dossier et de ses sous-dossiers (ordre stable)"""
+    fichiers = []
+    for racine, _, noms in os.walk(dossier):
+        fichiers.extend(os.path.join(racine, nom) for nom in noms if nom.lower().endswith(EXTENSIONS_SUPPORTEES))
+    return sorted(fichiers)
+
+
+def charger_reprise(sortie):
+    """(chemin relatif, empreinte) des CV déjà présents dans le fichier de sortie"""
+    deja_traites = set()
+    if not os.path.exists(sortie):
+        return deja_traites
+    with open(sortie, encoding="utf-8") as f:
+        for ligne in f:
+            try:
+                entree = json.loads(ligne)
+                deja_traites.add((entree["fichier"], entree["empreinte"]))
+            except (ValueError, KeyError):
+                # Dernière ligne tronquée par une interruption : le CV sera retraité
+                continue
+    return deja_traites
+
+
+def ecrire_ligne(f, entree):
+    """Ajoute une ligne JSONL et la force sur le disque (point de reprise)"""
+    f.write(json.dumps(entree, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+class Ingestion:
+    """Traitement concurrent d'un dossier de CV et statistiques de débit"""
+
+    def __init__(self, dossier, sortie, fournisseur, concurrence):
+        self.dossier = dossier
+        self.sortie = sortie
+        self.fournisseur = fournisseur
+        self.api_key = os.getenv(f"{fournisseur.upper()}_API_KEY")
+        self.semaphore = asyncio.Semaphore(concurrence)
+        self.compteurs = Counter()
+        self.fournisseurs = Counter()
+        self.durees = []
+        self.pages = 0
+
+    async def traiter(self, chemin, deja_traites, f_sortie, f_erreurs):
+        fichier = os.path.relpath(chemin, self.dossier)
+        # Le fichier n'est lu qu'une fois son tour venu : la mémoire reste bornée par la concurrence
+        async with self.semaphore:
+            with open(chemin, "rb") as f:
+                contenu = f.read()
+            empreinte = hashlib.sha256(contenu).hexdigest()
+            if (fichier, empreinte) in deja_traites:
+                self.compteurs["repris"] += 1
+                return
+
+            debut = time.perf_counter()
+            try:
+                document = await charger_document(os.path.basename(chemin), contenu)
+                if not document.texte.strip():
+                    raise ErreurDocument("aucun texte extrait (document scanné ?)")
+                cv_data, utilise, format_ok = await extraire_cv_structure(
+                    document.texte, self.fournisseur, self.api_key, PRIORITE_ARRIERE_PLAN
+                )
+                if not format_ok:
+                    # Données approximatives (non mises en cache) : le CV sera retraité à la relance
+                    raise ValueError(f"réponse {utilise} au format JSON inexploitable")
+            except Exception as e:
+                # Document illisible, fournisseurs indisponibles (LLMError)... : le lot continue
+                self.compteurs["erreurs"] += 1
+                ecrire_ligne(f_erreurs, {"fichier": fichier, "empreinte": empreinte, "erreur": str(e)})
+                print(f"❌ {fichier} : {e}")
+                return
+            duree = time.perf_counter() - debut
+
+        self.compteurs["reussis"] += 1
+        self.compteurs["tronques"] += document.troncature is not None
+        self.fournisseurs[utilise] += 1
+        self.durees.append(duree)
+        self.pages += document.pages or 0
+        ecrire_ligne(f_sortie, {
+            "fichier": fichier,
+            "empreinte": empreinte,
+            "fournisseur": utilise,
+            "pages": document.pages,
+            "troncature": document.troncature,
+            "duree": round(duree, 2),
+            "cv": cv_data,
+        })
+        print(f"✅ {fichier} ({utilise}, {duree:.1f}s) — {self.compteurs['reussis'] + self.compteurs['erreurs']} traité(s)")
+
+    async def executer(self):
+        fichiers = lister_fichiers(self.dossier)
+        deja_traites = charger_reprise(self.sortie)
+        print(f"📂 {len(fichiers)} CV trouvés dans {self.dossier}, {len(deja_traites)} déjà dans {self.sortie}")
+
+        # Appels LLM regroupés sous « ingestion_cv » dans les métriques ; compteurs cumulés relevés
+        # au départ (le résumé glissant de resume_metriques ne couvre que la dernière heure)
+        definir_commande("ingestion_cv")
+        totaux_depart = totaux_commande("ingestion_cv")
+        debut = time.perf_counter()
+        try:
+            with open(self.sortie, "a", encoding="utf-8") as f_sortie, \
+                    open(f"{os.path.splitext(self.sortie)[0]}.erreurs.jsonl", "a", encoding="utf-8") as f_erreurs:
+                await asyncio.gather(*(self.traiter(chemin, deja_traites, f_sortie, f_erreurs) for chemin in fichiers))
+        finally:
+            await fermer_sessions()
+            fermer_pool_documents(attendre=True)
+        totaux = totaux_commande("ingestion_cv")
+        self.afficher_statistiques(time.perf_counter() - debut, {cle: totaux[cle] - totaux_depart[cle] for cle in totaux})
+
+    def afficher_statistiques(self, duree_totale, appels_llm):
+        reussis = self.compteurs["reussis"]
+        print(f"\n📊 Ingestion terminée en {duree_totale:.1f}s")
+        print(f"   {reussis} réussi(s), {self.compteurs['erreurs']} erreur(s), {self.compteurs['repris']} déjà traité(s)")
+        if reussis:
+            durees = sorted(self.durees)
+            print(f"   Débit : {reussis / duree_totale * 60:.1f} CV/min, {self.pages / duree_totale:.1f} pages/s")
+            print(f"   Durée par CV : p50 {statistics.median(durees):.1f}s • p95 {durees[int(0.95 * (len(durees) - 1))]:.1f}s")
+            print(f"   Fournisseurs : {', '.join(f'{nom} {nombre}' for nom, nombre in self.fournisseurs.items())}")
+            print(f"   {self.compteurs['tronques']} CV lu(s) en partie")
+        if appels_llm["appels"]:
+            print(f"   Appels LLM : {appels_llm['appels']} ({appels_llm['erreurs']} erreur(s), {appels_llm['reessais']} réessai(s)) • "
+                  f"tokens {appels_llm['tokens_prompt']} → {appels_llm['tokens_reponse']} • ≈ {appels_llm['cout']:.4f} $")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion en masse de CV (PDF/DOCX/TXT) vers un fichier JSONL")
+    parser.add_argument("dossier", help="Dossier contenant les CV (sous-dossiers inclus)")
+    parser.add_argument("--sortie", default="cv_structures.jsonl", help="Fichier JSONL de sortie (sert aussi de point de reprise)")
+    parser.add_argument("--fournisseur", choices=tuple(MODELES_EXTRACTION), default="mistral")
+    parser.add_argument("--concurrence", type=int, default=4, help="CV structurés simultanément")
+    parser.add_argument("--processus", type=int, default=documents.PROCESSUS_DOCUMENTS,
+                        help="Processus de lecture des documents")
+    args = parser.parse_args()
+
+    if not os.getenv(f"{args.fournisseur.upper()}_API_KEY"):
+        parser.error(f"clé API {args.fournisseur} absente ({args.fournisseur.upper()}_API_KEY)")
+    # Lu à la création du pool, au premier document
+    documents.PROCESSUS_DOCUMENTS = args.processus
+
+    asyncio.run(Ingestion(args.dossier, args.sortie, args.fournisseur, args.concurrence).executer())
+
+
+if __name__ == "__main__":
+    main()
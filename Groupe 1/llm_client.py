@@ -0,0 +1,519 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import aiohttp
+from dotenv import load_dotenv
+from utils.cache import empreinte
+from utils.disjoncteur import get_disjoncteur
+from utils.metriques import enregistrer_appel, RESULTAT_SUCCES, RESULTAT_ANNULE
+from utils.rate_limiter import get_limiteur, PRIORITE_INTERACTIVE
+from utils.texte import estimer_tokens
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Points d'accès des fournisseurs LLM (adresses de base surchargeables, ex. serveur_llm_local.py)
+MISTRAL_API_BASE = os.getenv("MISTRAL_API_BASE", "https://api.mistral.ai").rstrip("/")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+MISTRAL_API_URL = f"{MISTRAL_API_BASE}/v1/chat/completions"
+GEMINI_API_URL = f"{GEMINI_API_BASE}/v1beta/models/{{model}}:generateContent"
+GEMINI_STREAM_URL = f"{GEMINI_API_BASE}/v1beta/models/{{model}}:streamGenerateContent"
+
+# Paramètres du pool de connexions (une session keep-alive par fournisseur)
+DELAI_MAX_REQUETE = float(os.getenv("LLM_TIMEOUT", "120"))
+CONNEXIONS_MAX_PAR_FOURNISSEUR = int(os.getenv("LLM_MAX_CONNEXIONS", "20"))
+DUREE_KEEPALIVE = 60
+
+# Réessais sur erreurs transitoires (429 et 5xx) avec recul exponentiel et gigue
+REESSAIS_MAX = int(os.getenv("LLM_REESSAIS_MAX", "4"))
+DELAI_REESSAI_BASE = 1.0
+DELAI_REESSAI_MAX = 60.0
+STATUT_RESEAU = "réseau"  # Connexion refusée ou interrompue
+STATUT_DELAI = "délai dépassé"  # Aucune réponse avant DELAI_MAX_REQUETE (non réessayé)
+STATUTS_TRANSITOIRES = {429, 500, 502, 503, 504, STATUT_RESEAU}
+
+# Course de modèles Gemini : délai (en secondes) avant de lancer le modèle candidat suivant
+DELAI_HEDGE_GEMINI = float(os.getenv("GEMINI_HEDGE_DELAI", "8"))
+
+# Modèles équivalents utilisés lors d'une bascule vers l'autre fournisseur
+MODELES_EQUIVALENTS = {"gemini": "gemini-1.5-pro", "mistral": "mistral-large-latest"}
+
+# Sessions HTTP partagées : fournisseur -> (boucle asyncio, session)
+_sessions = {}
+
+# Requêtes en vol : empreinte de la requête -> tâche asyncio partagée (single-flight)
+_requetes_en_cours = {}
+
+
+class LLMError(Exception):
+    """Erreur renvoyée par un fournisseur LLM (statut HTTP non 200 ou réponse inexploitable)"""
+
+    def __init__(self, fournisseur, status, message, retry_after=None):
+        super().__init__(f"Erreur API {fournisseur}: {status} - {message}")
+        self.fournisseur = fournisseur
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class CircuitOuvert(LLMError):
+    """Le disjoncteur du fournisseur est ouvert : l'appel échoue sans être envoyé"""
+
+    def __init__(self, fournisseur, modele, reste):
+        super().__init__(fournisseur, 503, f"{modele} temporairement indisponible (nouvel essai dans {reste:.0f}s)")
+
+
+def lire_retry_after(response, corps):
+    """Délai de réessai demandé par le fournisseur (en-tête Retry-After ou RetryInfo Gemini)"""
+    valeur = response.headers.get("Retry-After")
+    if valeur:
+        try:
+            return float(valeur)
+        except ValueError:
+            pass
+    match = re.search(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"', corps or "")
+    return float(match.group(1)) if match else None
+
+
+async def _executer_avec_limite(fournisseur, modele, api_key, prompt, priorite, envoyer, reessais=REESSAIS_MAX):
+    """
+    Exécute une requête en respectant le limiteur de débit et le disjoncteur du fournisseur.
+    Les erreurs 429/5xx sont réessayées (au plus `reessais` fois) avec recul exponentiel et gigue ;
+    un 429 suspend le limiteur pour toutes les requêtes utilisant la même clé.
+    Si le disjoncteur est ouvert, l'appel échoue immédiatement (CircuitOuvert).
+    Chaque appel est enregistré dans les métriques (latence totale, tokens, réessais, résultat).
+    """
+    limiteur = get_limiteur(fournisseur, api_key)
+    disjoncteur = get_disjoncteur(fournisseur, modele)
+    tokens_estimes = estimer_tokens(prompt)
+    debut_appel = time.monotonic()
+
+    def mesurer(resultat, usage=None, tentative=0):
+        usage = usage or {}
+        enregistrer_appel(fournisseur, modele, time.monotonic() - debut_appel, resultat,
+                          usage.get("prompt"), usage.get("reponse"), tentative)
+
+    for tentative in range(reessais + 1):
+        if not disjoncteur.autoriser():
+            erreur = CircuitOuvert(fournisseur.capitalize(), modele, disjoncteur.reste())
+            mesurer("circuit ouvert", tentative=tentative)
+            raise erreur
+
+        debut = time.monotonic()
+        try:
+            await limiteur.acquerir(tokens_estimes, priorite)
+            debut = time.monotonic()
+            texte, usage = await envoyer()
+        except asyncio.CancelledError:
+            disjoncteur.abandonner()
+            mesurer(RESULTAT_ANNULE, tentative=tentative)
+            raise
+        except LLMError as e:
+            erreur = e
+        except asyncio.TimeoutError:
+            erreur = LLMError(fournisseur.capitalize(), STATUT_DELAI, f"aucune réponse après {DELAI_MAX_REQUETE:.0f}s")
+        except aiohttp.ClientError as e:
+            erreur = LLMError(fournisseur.capitalize(), STATUT_RESEAU, str(e) or type(e).__name__)
+        else:
+            disjoncteur.enregistrer(True, time.monotonic() - debut)
+            tokens_utilises = (usage.get("prompt") or 0) + (usage.get("reponse") or 0)
+            if tokens_utilises:
+                limiteur.ajuster_tokens(tokens_utilises, tokens_estimes)
+            mesurer(RESULTAT_SUCCES, usage, tentative)
+            return texte
+
+        # Les erreurs de requête (400, 401...) ne traduisent pas une panne du fournisseur
+        panne = erreur.status in STATUTS_TRANSITOIRES or erreur.status == STATUT_DELAI
+        disjoncteur.enregistrer(not panne, time.monotonic() - debut)
+        if erreur.status not in STATUTS_TRANSITOIRES or tentative == reessais:
+            mesurer(f"erreur {erreur.status}", tentative=tentative)
+            raise erreur
+
+        delai = erreur.retry_after or min(DELAI_REESSAI_MAX, DELAI_REESSAI_BASE * 2 ** tentative)
+        delai *= random.uniform(1.0, 1.5)
+        print(f"⏳ {erreur.fournisseur} a répondu {erreur.status}, nouvel essai dans {delai:.1f}s "
+              f"({tentative + 1}/{reessais}, file: {limiteur.profondeur})")
+        if erreur.status == 429:
+            limiteur.signaler_limite(delai)
+        else:
+            await asyncio.sleep(delai)
+
+
+def get_session(fournisseur):
+    """
+    Récupère (ou crée) la session HTTP partagée d'un fournisseur.
+    Les connexions TCP/TLS sont conservées entre les appels de toutes les commandes.
+    """
+    boucle = asyncio.get_running_loop()
+    entree = _sessions.get(fournisseur)
+    if entree is not None:
+        boucle_session, session = entree
+        if boucle_session is boucle and not session.closed:
+            return session
+
+    connector = aiohttp.TCPConnector(
+        limit=CONNEXIONS_MAX_PAR_FOURNISSEUR,
+        keepalive_timeout=DUREE_KEEPALIVE,
+        ttl_dns_cache=300
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=DELAI_MAX_REQUETE),
+        headers={"Content-Type": "application/json"}
+    )
+    _sessions[fournisseur] = (boucle, session)
+    return session
+
+
+async def fermer_sessions():
+    """Ferme toutes les sessions HTTP ouvertes (à appeler à l'arrêt du bot)"""
+    for _, session in list(_sessions.values()):
+        if not session.closed:
+            await session.close()
+    _sessions.clear()
+
+
+async def _coalescer(cle, fabrique):
+    """
+    Regroupe les requêtes identiques simultanées : tant qu'une requête de même
+    empreinte est en cours, les appelants suivants attendent le même résultat.
+    La requête n'est annulée que lorsque tous ses appelants ont abandonné.
+    """
+    entree = _requetes_en_cours.get(cle)
+    if entree is None:
+        tache = asyncio.ensure_future(fabrique())
+        entree = {"tache": tache, "appelants": 0}
+        _requetes_en_cours[cle] = entree
+
+        def liberer(t):
+            if _requetes_en_cours.get(cle) is entree:
+                del _requetes_en_cours[cle]
+            # Marquer l'exception comme récupérée si tous les appelants ont abandonné
+            if not t.cancelled():
+                t.exception()
+
+        tache.add_done_callback(liberer)
+    else:
+        print("🔗 Requête LLM identique déjà en cours, attente de sa réponse")
+
+    entree["appelants"] += 1
+    try:
+        # shield : l'annulation d'un appelant ne doit pas annuler la requête des autres
+        return await asyncio.shield(entree["tache"])
+    except asyncio.CancelledError:
+        if entree["appelants"] == 1:
+            entree["tache"].cancel()
+        raise
+    finally:
+        entree["appelants"] -= 1
+
+
+def requetes_en_cours():
+    """Nombre de requêtes LLM distinctes actuellement en vol"""
+    return len(_requetes_en_cours)
+
+
+async def appeler_mistral(prompt, model="mistral-small-latest", temperature=0.2, api_key=None, priorite=PRIORITE_INTERACTIVE, format_json=False):
+    """
+    Envoie un prompt à l'API de chat Mistral sans bloquer la boucle d'événements.
+
+    Args:
+        prompt (str): Contenu du message utilisateur.
+        model (str): Modèle Mistral à utiliser.
+        temperature (float): Température d'échantillonnage.
+        api_key (str): Clé API (par défaut MISTRAL_API_KEY).
+        priorite (int): Priorité dans la file du limiteur de débit.
+        format_json (bool): Demande un objet JSON natif (response_format json_object).
+
+    Returns:
+        str: Texte de la réponse du modèle.
+
+    Raises:
+        LLMError: si l'API renvoie une erreur ou une réponse inexploitable.
+    """
+    api_key = api_key or os.getenv("MISTRAL_API_KEY")
+    cle = empreinte("mistral", model, temperature, format_json, prompt)
+    return await _coalescer(cle, lambda: _executer_avec_limite(
+        "mistral", model, api_key, prompt, priorite,
+        lambda: _requete_mistral(prompt, model, temperature, api_key, format_json)
+    ))
+
+
+async def _requete_mistral(prompt, model, temperature, api_key, format_json=False):
+    headers = {"Authorization": f"Bearer {api_key}"}
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature
+    }
+    if format_json:
+        payload["response_format"] = {"type": "json_object"}
+
+    session = get_session("mistral")
+    async with session.post(MISTRAL_API_URL, headers=headers, json=payload) as response:
+        if response.status != 200:
+            corps = await response.text()
+            raise LLMError("Mistral", response.status, corps, lire_retry_after(response, corps))
+        resultat = await response.json()
+
+    try:
+        texte = resultat["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        raise LLMError("Mistral", 200, f"Réponse inattendue: {str(resultat)[:200]}")
+    usage = resultat.get("usage") or {}
+    return texte, {"prompt": usage.get("prompt_tokens"), "reponse": usage.get("completion_tokens")}
+
+
+async def appeler_gemini(prompt, model="gemini-1.5-pro", api_key=None, generation_config=None, priorite=PRIORITE_INTERACTIVE, format_json=False,
+                         reessais=REESSAIS_MAX):
+    """
+    Envoie un prompt à l'API REST Gemini (generateContent) sans bloquer la boucle d'événements.
+
+    Args:
+        prompt (str): Contenu du message utilisateur.
+        model (str): Modèle Gemini à utiliser.
+        api_key (str): Clé API (par défaut GEMINI_API_KEY).
+        generation_config (dict): Options de génération (température, etc.).
+        priorite (int): Priorité dans la file du limiteur de débit.
+        format_json (bool): Demande une réponse JSON native (responseMimeType application/json).
+        reessais (int): Nombre maximal de réessais sur erreur transitoire (0 : échec immédiat).
+
+    Returns:
+        str: Texte de la réponse du modèle.
+
+    Raises:
+        LLMError: si l'API renvoie une erreur ou une réponse inexploitable.
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if format_json:
+        generation_config = {**(generation_config or {}), "responseMimeType": "application/json"}
+    cle = empreinte("gemini", model, generation_config, reessais, prompt)
+    return await _coalescer(cle, lambda: _executer_avec_limite(
+        "gemini", model, api_key, prompt, priorite,
+        lambda: _requete_gemini(prompt, model, api_key, generation_config),
+        reessais
+    ))
+
+
+def _corps_gemini(prompt, generation_config):
+    data = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": prompt}]
+            }
+        ]
+    }
+    if generation_config:
+        data["generationConfig"] = generation_config
+    return data
+
+
+async def _requete_gemini(prompt, model, api_key, generation_config):
+    url = GEMINI_API_URL.format(model=model)
+    params = {"key": api_key}
+    data = _corps_gemini(prompt, generation_config)
+
+    session = get_session("gemini")
+    async with session.post(url, params=params, json=data) as response:
+        if response.status != 200:
+            corps = await response.text()
+            raise LLMError("Gemini", response.status, corps, lire_retry_after(response, corps))
+        resultat = await response.json()
+
+    try:
+        texte = resultat['candidates'][0]['content']['parts'][0]['text'].strip()
+    except (KeyError, IndexError, TypeError):
+        raise LLMError("Gemini", 200, f"Réponse inattendue: {str(resultat)[:200]}")
+    return texte, usage_gemini(resultat)
+
+
+def usage_gemini(resultat):
+    """Tokens consommés d'après le champ usageMetadata d'une réponse Gemini"""
+    usage = resultat.get("usageMetadata") or {}
+    return {"prompt": usage.get("promptTokenCount"), "reponse": usage.get("candidatesTokenCount")}
+
+
+def fournisseur_disponible(fournisseur, model=None):
+    """Indique si le disjoncteur du fournisseur laisse passer les appels"""
+    return get_disjoncteur(fournisseur, model or MODELES_EQUIVALENTS[fournisseur]).disponible()
+
+
+async def appeler_llm(prompt, fournisseur="gemini", model=None, api_key=None, priorite=PRIORITE_INTERACTIVE, repli=True, format_json=False):
+    """
+    Envoie un prompt au fournisseur demandé et bascule vers l'autre fournisseur
+    (modèle équivalent, clé API de l'environnement) si le premier est en panne :
+    disjoncteur ouvert ou erreurs transitoires persistantes.
+    Avec `format_json`, la sortie JSON native du fournisseur est demandée.
+
+    Returns:
+        tuple: (texte de la réponse, fournisseur utilisé, modèle utilisé)
+
+    Raises:
+        LLMError: si aucun fournisseur n'a pu répondre.
+    """
+    model = model or MODELES_EQUIVALENTS[fournisseur]
+    appels = {"gemini": appeler_gemini, "mistral": appeler_mistral}
+    try:
+        texte = await appels[fournisseur](prompt, model=model, api_key=api_key, priorite=priorite, format_json=format_json)
+        return texte, fournisseur, model
+    except LLMError as e:
+        autre = "mistral" if fournisseur == "gemini" else "gemini"
+        panne = e.status in STATUTS_TRANSITOIRES or e.status == STATUT_DELAI
+        if not (repli and panne and os.getenv(f"{autre.upper()}_API_KEY") and fournisseur_disponible(autre)):
+            raise
+        modele_repli = MODELES_EQUIVALENTS[autre]
+        print(f"🔀 {fournisseur} indisponible ({e.status}), bascule vers {autre} ({modele_repli})")
+        texte = await appels[autre](prompt, model=modele_repli, priorite=priorite, format_json=format_json)
+        return texte, autre, modele_repli
+
+
+async def appeler_gemini_en_course(prompt, modeles, valider=None, delai_hedge=DELAI_HEDGE_GEMINI, api_key=None,
+                                   generation_config=None, priorite=PRIORITE_INTERACTIVE, format_json=False):
+    """
+    Met plusieurs modèles Gemini en concurrence (hedging) : le premier modèle est lancé seul, le candidat
+    suivant part après `delai_hedge` secondes sans réponse ou dès qu'un modèle échoue. Les candidats sont
+    appelés sans réessai, pour qu'une erreur passe immédiatement la main au suivant. La première réponse
+    acceptée par `valider` (qui la transforme ou lève une exception) l'emporte ; les requêtes encore
+    en cours sont annulées.
+
+    Returns:
+        tuple: (réponse validée ou None, modèle gagnant ou None, durée en secondes)
+    """
+    restants = list(modeles)
+    en_cours = {}
+    debut = time.perf_counter()
+
+    async def essayer(modele):
+        texte = await appeler_gemini(prompt, model=modele, api_key=api_key, generation_config=generation_config,
+                                     priorite=priorite, format_json=format_json, reessais=0)
+        return valider(texte) if valider else texte
+
+    def lancer_suivant():
+        modele = restants.pop(0)
+        print(f"Tentative avec le modèle: {modele} (+{time.perf_counter() - debut:.1f}s)")
+        en_cours[asyncio.ensure_future(essayer(modele))] = modele
+
+    lancer_suivant()
+    try:
+        while en_cours:
+            termines, _ = await asyncio.wait(
+                en_cours,
+                timeout=delai_hedge if restants else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            # Aucun modèle n'a répondu dans le délai : on lance le suivant en parallèle
+            if not termines:
+                lancer_suivant()
+                continue
+
+            for tache in termines:
+                modele = en_cours.pop(tache)
+                try:
+                    resultat = tache.result()
+                except Exception as e:
+                    print(f"Échec avec le modèle {modele}: {e}")
+                    if restants:
+                        lancer_suivant()
+                    continue
+
+                duree = time.perf_counter() - debut
+                print(f"🏁 Succès avec le modèle {modele} en {duree:.1f}s")
+                return resultat, modele, duree
+    finally:
+        # Annuler les modèles encore en course
+        for tache in en_cours:
+            tache.cancel()
+
+    duree = time.perf_counter() - debut
+    print(f"Tous les modèles ont échoué ({duree:.1f}s)")
+    return None, None, duree
+
+
+async def streamer_gemini(prompt, model="gemini-1.5-pro", api_key=None, generation_config=None, priorite=PRIORITE_INTERACTIVE):
+    """
+    Interroge Gemini en streaming (streamGenerateContent, SSE) et produit le texte
+    au fur et à mesure de sa génération.
+
+    Args:
+        prompt (str): Contenu du message utilisateur.
+        model (str): Modèle Gemini à utiliser.
+        api_key (str): Clé API (par défaut GEMINI_API_KEY).
+        generation_config (dict): Options de génération (température, etc.).
+        priorite (int): Priorité dans la file du limiteur de débit.
+
+    Yields:
+        str: Fragments successifs du texte généré.
+
+    Raises:
+        LLMError: si l'API renvoie une erreur.
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    limiteur = get_limiteur("gemini", api_key)
+    disjoncteur = get_disjoncteur("gemini", model)
+    if not disjoncteur.autoriser():
+        enregistrer_appel("gemini", model, 0.0, "circuit ouvert")
+        raise CircuitOuvert("Gemini", model, disjoncteur.reste())
+
+    url = GEMINI_STREAM_URL.format(model=model)
+    params = {"key": api_key, "alt": "sse"}
+    data = _corps_gemini(prompt, generation_config)
+
+    # La latence retenue par le disjoncteur est celle du premier fragment,
+    # celle des métriques la durée totale de la génération
+    debut_appel = debut = time.monotonic()
+    premier_fragment = True
+    usage = {}
+    try:
+        await limiteur.acquerir(estimer_tokens(prompt), priorite)
+        debut = time.monotonic()
+
+        session = get_session("gemini")
+        async with session.post(url, params=params, json=data) as response:
+            if response.status != 200:
+                corps = await response.text()
+                erreur = LLMError("Gemini", response.status, corps, lire_retry_after(response, corps))
+                if response.status == 429:
+                    limiteur.signaler_limite(erreur.retry_after or DELAI_REESSAI_BASE)
+                raise erreur
+
+            async for ligne in response.content:
+                ligne = ligne.decode("utf-8").strip()
+                if not ligne.startswith("data:"):
+                    continue
+                evenement = json.loads(ligne[len("data:"):])
+                if evenement.get("usageMetadata"):
+                    usage = usage_gemini(evenement)
+                candidats = evenement.get("candidates") or [{}]
+                for partie in candidats[0].get("content", {}).get("parts", []):
+                    if partie.get("text"):
+                        if premier_fragment:
+                            disjoncteur.enregistrer(True, time.monotonic() - debut)
+                            premier_fragment = False
+                        yield partie["text"]
+
+        if premier_fragment:
+            # Réponse vide mais le fournisseur a répondu
+            disjoncteur.enregistrer(True, time.monotonic() - debut)
+        enregistrer_appel("gemini", model, time.monotonic() - debut_appel, RESULTAT_SUCCES,
+                          usage.get("prompt"), usage.get("reponse"))
+    except (asyncio.CancelledError, GeneratorExit):
+        if premier_fragment:
+            disjoncteur.abandonner()
+        enregistrer_appel("gemini", model, time.monotonic() - debut_appel, RESULTAT_ANNULE,
+                          usage.get("prompt"), usage.get("reponse"))
+        raise
+    except LLMError as e:
+        if premier_fragment:
+            disjoncteur.enregistrer(e.status not in STATUTS_TRANSITOIRES, time.monotonic() - debut)
+        enregistrer_appel("gemini", model, time.monotonic() - debut_appel, f"erreur {e.status}")
+        raise
+    except Exception as e:
+        if premier_fragment:
+            disjoncteur.enregistrer(False, time.monotonic() - debut)
+        enregistrer_appel("gemini", model, time.monotonic() - debut_appel, f"erreur {type(e).__name__}")
+        raise
@@ -0,0 +1,79 @@
+import discord
+from discord import app_commands
+import io
+import os
+from utils.metriques import resume_metriques, texte_metriques, FENETRE_METRIQUES, LIMITES_LATENCE
+from utils.disjoncteur import etats_disjoncteurs
+from utils.rate_limiter import profondeur_files
+from utils.cache import cache_extractions_cv, cache_reponses_llm
+from utils import speculation
+
+# Identifiants Discord autorisés en plus des administrateurs du serveur (séparés par des virgules)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if i.isdigit()}
+
+def est_admin(interaction: discord.Interaction) -> bool:
+    """Vérifie que l'utilisateur est administrateur du serveur ou listé dans ADMIN_IDS"""
+    permissions = getattr(interaction.user, "guild_permissions", None)
+    return interaction.user.id in ADMIN_IDS or bool(permissions and permissions.administrator)
+
+def histogramme_latence(classes):
+    """Histogramme compact des latences (classes non vides uniquement)"""
+    return " ".join(
+        f"{'>' + format(LIMITES_LATENCE[i - 1], 'g') if borne == float('inf') else '≤' + format(borne, 'g')}s:{nombre}"
+        for i, (borne, nombre) in enumerate(zip(LIMITES_LATENCE, classes)) if nombre
+    )
+
+def setup_metriques_command(bot):
+    """Configure la commande d'administration affichant les métriques des appels LLM"""
+
+    @bot.tree.command(name="metriques_llm", description="[Admin] Coût, latence et tokens des appels LLM par commande")
+    @app_commands.default_permissions(administrator=True)
+    async def metriques_llm(interaction: discord.Interaction):
+        if not est_admin(interaction):
+            await interaction.response.send_message("❌ Commande réservée aux administrateurs.", ephemeral=True)
+            return
+
+        resume = resume_metriques()
+        embed = discord.Embed(
+            title="📈 Métriques des appels LLM",
+            description=f"Appels des {FENETRE_METRIQUES / 60:.0f} dernières minutes, par commande",
+            color=discord.Color.blurple()
+        )
+
+        # Commandes les plus coûteuses en premier (25 champs maximum par embed)
+        for commande, stats in sorted(resume.items(), key=lambda item: item[1]["cout"], reverse=True)[:22]:
+            embed.add_field(
+                name=f"/{commande}" if commande != "hors_commande" else "Hors commande",
+                value=(
+                    f"{stats['appels']} appel(s) • {stats['erreurs']} erreur(s) • {stats['reessais']} réessai(s)\n"
+                    f"Latence p50 {stats['latence_p50']:.1f}s • p95 {stats['latence_p95']:.1f}s\n"
+                    f"`{histogramme_latence(stats['classes'])}`\n"
+                    f"Tokens {stats['tokens_prompt']} → {stats['tokens_reponse']} • ≈ {stats['cout']:.4f} $\n"
+                    f"{', '.join(stats['modeles'])}"
+                )[:1024],
+                inline=False
+            )
+
+        if not resume:
+            embed.add_field(name="Aucun appel", value="Aucun appel LLM sur la période.", inline=False)
+
+        # État des fournisseurs : disjoncteurs, files du limiteur de débit et caches
+        etats = "\n".join(f"{nom} : {etat}" for nom, etat in etats_disjoncteurs().items()) or "Aucun appel"
+        files = "\n".join(f"{nom} : {profondeur}" for nom, profondeur in profondeur_files().items()) or "Vides"
+        statistiques_caches = (
+            ("Extractions", await cache_extractions_cv.statistiques_async()),
+            ("Réponses", await cache_reponses_llm.statistiques_async())
+        )
+        caches = "\n".join(
+            f"{nom} : {stats['taux_succes']:.0%} de succès ({stats['entrees']} entrées)"
+            for nom, stats in statistiques_caches
+        )
+        embed.add_field(name="🔌 Disjoncteurs", value=etats[:1024], inline=True)
+        embed.add_field(name="⏳ Files d'attente", value=files[:1024], inline=True)
+        embed.add_field(name="♻️ Caches", value=caches[:1024], inline=False)
+        travaux = " • ".join(f"{nom} : {nombre}" for nom, nombre in speculation.statistiques.items()) or "Aucun"
+        embed.add_field(name="🔮 Travaux spéculatifs", value=travaux[:1024], inline=False)
+
+        # Export texte complet (compteurs cumulés et histogrammes de latence)
+        fichier = discord.File(io.BytesIO(texte_metriques().encode("utf-8")), filename="metriques_llm.txt")
+        await interaction.response.send_message(embed=embed, file=fichier, ephemeral=True)
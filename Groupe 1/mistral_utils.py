@@ -1,17 +1,20 @@
-import io
 import requests
 import json
-import PyPDF2
-import re
 import os
+import time
 from dotenv import load_dotenv
+from utils.texte import compacter_texte_cv
+from utils.json_tolerant import charger_json
+from utils.extraction_locale import extraire_champs_locaux, fusionner_champs_locaux
+from utils.documents import texte_document, ErreurDocument
+from utils.metriques import enregistrer_appel, RESULTAT_SUCCES
 
 # Charger les variables d'environnement
 load_dotenv()
 
 # Clé API Mistral depuis les variables d'environnement
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-API_URL = "https://api.mistral.ai/v1/chat/completions"
+API_URL = os.getenv("MISTRAL_API_BASE", "https://api.mistral.ai").rstrip("/") + "/v1/chat/completions"
 
 def extraire_texte_pdf(fichier_pdf):
     """
@@ -24,13 +27,8 @@ def extraire_texte_pdf(fichier_pdf):
         str: Texte extrait du PDF ou None en cas d'erreur.
     """
     try:
-        texte = ""
-        pdf_stream = io.BytesIO(fichier_pdf)
-        lecteur_pdf = PyPDF2.PdfReader(pdf_stream)
-        for page in lecteur_pdf.pages:
-            texte += page.extract_text() + "\n"
-        return texte
-    except Exception as e:
+        return texte_document("cv.pdf", fichier_pdf)
+    except ErreurDocument as e:
         print(f"Erreur lors de l'extraction du texte du PDF: {e}")
         return None
 
@@ -45,18 +43,18 @@ def generer_json_avec_mistral(texte_cv):
     Returns:
         str: JSON structuré ou None si échec.
     """
+    # Compacter le texte brut du PDF pour réduire la taille du prompt
+    texte_cv = compacter_texte_cv(texte_cv)
+    
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {MISTRAL_API_KEY}"
     }
 
+    # Coordonnées et profils sont extraits localement : le LLM ne les produit plus
     prompt = f"""Voici un CV. Analyse-le et retourne un JSON structuré :
     {{
       "prenom_nom": "",
-      "email": "",
-      "telephone": "",
-      "linkedin": "",
-      "github": "",
       "competences_techniques": [],
       "soft_skills": [],
       "langues": [],
@@ -71,20 +69,24 @@ def generer_json_avec_mistral(texte_cv):
     payload = {
         "model": "mistral-small-latest",
         "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.2
+        "temperature": 0.2,
+        "response_format": {"type": "json_object"}  # Sortie JSON native
     }
 
     try:
+        debut = time.perf_counter()
         response = requests.post(API_URL, headers=headers, json=payload)
+        if not response.ok:
+            enregistrer_appel("mistral", payload["model"], time.perf_counter() - debut, f"erreur {response.status_code}")
         response.raise_for_status()
         resultat = response.json()
+        usage = resultat.get("usage") or {}
+        enregistrer_appel("mistral", payload["model"], time.perf_counter() - debut, RESULTAT_SUCCES,
+                          usage.get("prompt_tokens"), usage.get("completion_tokens"))
         content = resultat["choices"][0]["message"]["content"]
 
-        json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
-        match = re.search(json_pattern, content)
-        json_str = match.group(1) or match.group(2) if match else content
-
-        json_obj = json.loads(json_str)
+        json_obj = charger_json(content)
+        fusionner_champs_locaux(json_obj, extraire_champs_locaux(texte_cv))
 
         # Champs obligatoires par défaut
         for champ in ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]:
@@ -1,21 +1,26 @@
 import discord
-from discord import app_commands
-import os
 import io
-import PyPDF2
-import tempfile
-import requests
-import json
-import re
-from datetime import datetime
+import os
 import google.generativeai as genai
 from utils.helper import get_user_data
+from utils.cache import cache_extractions_cv, cle_extraction_cv
+from utils.texte import compacter_texte_cv
+from utils.json_tolerant import charger_json
+from utils.extraction_locale import extraire_champs_locaux, fusionner_champs_locaux
+from utils.competences import CATALOGUE_COMPETENCES, detecteur_competences
+from utils.documents import charger_document, ErreurDocument, DocumentCV
+from llm_client import appeler_llm, LLMError
 
 # Configuration de l'API Gemini
 def setup_gemini_api():
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     if GEMINI_API_KEY:
-        genai.configure(api_key=GEMINI_API_KEY)
+        if os.getenv("GEMINI_API_BASE"):
+            # Même point d'accès alternatif que llm_client et gemini_utils
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": os.getenv("GEMINI_API_BASE").rstrip("/")})
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
         return True
     return False
 
@@ -24,21 +29,24 @@ def setup_mistral_api():
     MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
     return MISTRAL_API_KEY is not None
 
-# Fonction pour extraire le texte d'un PDF
-def extract_text_from_pdf(file_bytes):
-    try:
-        text = ""
-        pdf = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        print(f"Erreur extraction PDF: {e}")
-        return None
+# Versions des prompts de parsing (à incrémenter à chaque modification d'un prompt
+# pour invalider les extractions mises en cache)
+VERSION_PROMPT_GEMINI = "parse-gemini-v3"
+VERSION_PROMPT_MISTRAL = "parse-mistral-v3"
+
+# Fichier JSON envoyé sur Discord depuis un tampon mémoire (aucun fichier temporaire)
+def fichier_json(document: DocumentCV, filename: str) -> discord.File:
+    return discord.File(io.BytesIO(document.json_octets()), filename=filename)
+
+# Message accompagnant le JSON, signalant un document lu en partie (budgets de pages et de caractères)
+def message_resultat(document: DocumentCV, message="✅ Analyse terminée avec succès! Voici le fichier JSON généré:") -> str:
+    if document.troncature:
+        return f"{message}\n✂️ {document.troncature}"
+    return message
 
-async def parse_cv_with_gemini(cv_bytes, cv_filename):
+async def parse_cv_with_gemini(document: DocumentCV):
     """
-    Utilise l'API Gemini pour analyser un CV au format PDF
+    Utilise l'API Gemini pour analyser un CV déjà lu (charger_document) et remplit document.structure
     """
     try:
         # Configuration de Gemini
@@ -46,14 +54,23 @@ async def parse_cv_with_gemini(cv_bytes, cv_filename):
         if not GEMINI_API_KEY:
             return None, "❌ Clé API Gemini non configurée."
         
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-pro")
-        
-        # Extraction du texte du PDF
-        cv_text = extract_text_from_pdf(cv_bytes)
+        # Texte extrait une seule fois à la lecture du document
+        cv_text = document.texte
         if not cv_text:
             return None, "❌ Impossible d'extraire le texte du PDF."
         
+        # Réutiliser une extraction déjà validée pour ce même CV
+        cle_cache = cle_extraction_cv(cv_text, "gemini", "gemini-1.5-pro", VERSION_PROMPT_GEMINI)
+        json_obj = await cache_extractions_cv.get_async(cle_cache)
+        if json_obj is not None:
+            print(f"♻️ Parsing Gemini servi depuis le cache ({await cache_extractions_cv.statistiques_async()})")
+            document.structure = json_obj
+            return document, "✅ Analyse terminée avec succès!"
+        
+        # Compacter le texte brut du PDF pour réduire la taille du prompt
+        texte_brut = cv_text
+        cv_text = compacter_texte_cv(cv_text)
+        
         # Création du prompt
         prompt = f"""
         Voici le texte complet d'un CV extrait d'un fichier PDF. Analyse-le et convertis-le directement en JSON avec la structure suivante:
@@ -61,10 +78,6 @@ async def parse_cv_with_gemini(cv_bytes, cv_filename):
         ```json
         {{
           "prenom_nom": "string",
-          "email": "string",
-          "telephone": "string",
-          "linkedin": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
-          "github": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
           "competences_techniques": [
             "compétence technique 1",
             "compétence technique 2"
@@ -105,11 +118,6 @@ async def parse_cv_with_gemini(cv_bytes, cv_filename):
         ```
 
         Instructions spéciales:
-        - Inclus TOUJOURS les champs "linkedin" et "github" dans le JSON, même s'ils sont vides ("").
-        - Pour LinkedIn, si tu trouves une URL comme "linkedin.com/in/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/linkedin-innom-utilisateur", n'inclus que "nom-utilisateur".
-        - Pour GitHub, si tu trouves une URL comme "github.com/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/githubnom-utilisateur", n'inclus que "nom-utilisateur".
-        - Si aucun profil LinkedIn ou GitHub n'est mentionné dans le CV, laisse ces champs vides: "linkedin": "", "github": "".
-
         - IMPORTANT: Pour les compétences techniques, inclus UNIQUEMENT les langages de programmation, logiciels, et outils concrets.
           * Ne pas inclure dans cette section les domaines de connaissances théoriques comme l'économie, la finance, les mathématiques, etc.
           * Limite-toi aux compétences techniques concrètes et opérationnelles (langages, logiciels, frameworks, etc.)
@@ -129,43 +137,39 @@ async def parse_cv_with_gemini(cv_bytes, cv_filename):
         Retourne UNIQUEMENT le JSON sans aucun autre commentaire. Assure-toi que le format est valide.
         """
         
-        # Appel de l'API Gemini
-        response = model.generate_content(prompt)
-        
-        # Récupération de la réponse
-        if hasattr(response, 'text'):
-            result_json = response.text
-        else:
-            result_json = response.parts[0].text
-        
-        # Vérification et nettoyage de la réponse JSON
-        # Parfois Gemini ajoute des ```json et ``` autour du JSON
-        json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
-        match = re.search(json_pattern, result_json)
+        # Appel de l'API Gemini (session HTTP partagée, non bloquant, bascule vers Mistral si Gemini est en panne)
+        try:
+            result_json, fournisseur, modele = await appeler_llm(prompt, "gemini", model="gemini-1.5-pro", api_key=GEMINI_API_KEY, format_json=True)
+        except LLMError as e:
+            return None, f"❌ {e}"
         
-        if match:
-            result_json = match.group(1) or match.group(2)
+        message_succes = "✅ Analyse terminée avec succès!"
+        if fournisseur != "gemini":
+            # Le résultat est mis en cache sous la clé du fournisseur qui a répondu
+            cle_cache = cle_extraction_cv(texte_brut, fournisseur, modele, VERSION_PROMPT_GEMINI)
+            message_succes = "✅ Analyse terminée avec succès (Gemini indisponible, analyse réalisée par Mistral)!"
         
-        # Vérifier que le JSON est valide
+        # Extraire le JSON de la réponse (blocs ```json, virgules finales, réponse tronquée...)
         try:
-            json_obj = json.loads(result_json)
-            
-            # Créer un fichier temporaire pour stocker le JSON
-            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
-                temp_file.write(json.dumps(json_obj, ensure_ascii=False, indent=2).encode('utf-8'))
-                temp_path = temp_file.name
-            
-            return temp_path, "✅ Analyse terminée avec succès!"
-            
-        except json.JSONDecodeError as e:
+            json_obj = charger_json(result_json)
+        except ValueError as e:
             return None, f"❌ Erreur de format JSON: {str(e)}"
+        
+        # Coordonnées et profils extraits localement (non demandés au LLM), outils du catalogue
+        # ajoutés aux compétences techniques trouvées par le LLM
+        fusionner_champs_locaux(json_obj, extraire_champs_locaux(cv_text))
+        
+        await cache_extractions_cv.set_async(cle_cache, json_obj)
+        
+        document.structure = json_obj
+        return document, message_succes
             
     except Exception as e:
         return None, f"❌ Erreur lors de l'analyse: {str(e)}"
 
-async def parse_cv_with_mistral(cv_bytes, cv_filename):
+async def parse_cv_with_mistral(document: DocumentCV):
     """
-    Utilise l'API Mistral pour analyser un CV au format PDF
+    Utilise l'API Mistral pour analyser un CV déjà lu (charger_document) et remplit document.structure
     """
     try:
         # Configuration de Mistral
@@ -173,49 +177,34 @@ async def parse_cv_with_mistral(cv_bytes, cv_filename):
         if not MISTRAL_API_KEY:
             return None, "❌ Clé API Mistral non configurée."
         
-        API_URL = "https://api.mistral.ai/v1/chat/completions"
-        
-        # Extraction du texte du PDF
-        cv_text = extract_text_from_pdf(cv_bytes)
+        # Texte extrait une seule fois à la lecture du document
+        cv_text = document.texte
         if not cv_text:
             return None, "❌ Impossible d'extraire le texte du PDF."
         
-        # Liste des compétences techniques et soft skills à rechercher pour aider le modèle
-        liste_competences = """
-        Exemples de compétences techniques à identifier (UNIQUEMENT les outils concrets et langages de programmation):
-        
-        # Langages de programmation
-        Python, R, Java, C, C++, C#, JavaScript, TypeScript, PHP, Ruby, Swift, Kotlin, Go, Rust, SQL, Scala, Perl, Shell, Bash, PowerShell, MATLAB, VBA
-        
-        # Data Science et ML (outils uniquement)
-        TensorFlow, PyTorch, Keras, Scikit-learn, Pandas, NumPy, SciPy, NLTK, spaCy, Matplotlib, Seaborn
-        
-        # Web et Frontend
-        HTML, CSS, Bootstrap, React, Angular, Vue.js, jQuery, REST API, GraphQL, Node.js, Express
-        
-        # Bases de données
-        MySQL, PostgreSQL, SQLite, Oracle, MongoDB, Redis, Elasticsearch, NoSQL, SQL Server, MariaDB
-        
-        # DevOps et Cloud
-        AWS, Azure, GCP, Docker, Kubernetes, Git, GitHub, GitLab, CI/CD, Jenkins, Linux, Unix, Windows, MacOS
+        # Réutiliser une extraction déjà validée pour ce même CV
+        cle_cache = cle_extraction_cv(cv_text, "mistral", "mistral-small-latest", VERSION_PROMPT_MISTRAL)
+        json_obj = await cache_extractions_cv.get_async(cle_cache)
+        if json_obj is not None:
+            print(f"♻️ Parsing Mistral servi depuis le cache ({await cache_extractions_cv.statistiques_async()})")
+            document.structure = json_obj
+            return document, "✅ Analyse terminée avec succès!"
         
-        # Bureautique et outils
-        Microsoft Office, Microsoft 365, Office 365, Suite Office, Excel, Word, PowerPoint, Access, Outlook, OneNote, SharePoint, OneDrive, Teams, Microsoft Teams, Tableau, Power BI, SAP, Salesforce, Jira, Confluence, Trello, MS Project
+        # Compacter le texte brut du PDF pour réduire la taille du prompt
+        texte_brut = cv_text
+        cv_text = compacter_texte_cv(cv_text)
         
-        # Autres outils techniques
-        LaTeX, RStudio, Jupyter, Orange, SAS, SPSS
-        
-        ATTENTION: N'inclus PAS les domaines de connaissances ou sujets théoriques comme compétences techniques.
-        Par exemple, n'inclus PAS: Économie, Microéconomie, Macroéconomie, Comptabilité, Finance, Droit, Mathématiques, 
-        Statistiques théoriques, Machine Learning théorique, etc. 
-        
-        Inclus UNIQUEMENT les outils et langages concrets que la personne sait utiliser.
+        # Exemples de compétences à rechercher pour aider le modèle (catalogue de utils/competences.py)
+        liste_competences = f"""
+        Exemples de compétences techniques à identifier (UNIQUEMENT les outils concrets et langages de programmation),
+        à compléter par tout autre outil cité dans le CV:
+        {", ".join(CATALOGUE_COMPETENCES["competences_techniques"])}
         
         Exemples de soft skills à identifier:
-        Communication, leadership, travail d'équipe, résolution de problèmes, gestion de projet, organisation, autonomie, adaptabilité, créativité, esprit critique, négociation, intelligence émotionnelle, gestion du temps, gestion du stress, écoute active, empathie, flexibilité, prise de décision, persuasion, présentation, prise de parole en public
+        {", ".join(CATALOGUE_COMPETENCES["soft_skills"])}
         
         Exemples de certifications:
-        Permis B, Permis BVA, TOEIC, TOEFL, IELTS, Cambridge Certificate, DELF, DALF, HSK, PIX, Google Analytics, Certification Microsoft, Certification AWS, Certification Azure, ITIL, PMP, PRINCE2
+        {", ".join(CATALOGUE_COMPETENCES["certifications"])}
         """
         
         # Créer le prompt pour Mistral
@@ -225,10 +214,6 @@ async def parse_cv_with_mistral(cv_bytes, cv_filename):
         ```json
         {{
           "prenom_nom": "string",
-          "email": "string",
-          "telephone": "string",
-          "linkedin": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
-          "github": "string (seulement le nom d'utilisateur, pas l'URL complète, ou vide si non présent)",
           "competences_techniques": [
             "compétence technique 1",
             "compétence technique 2"
@@ -269,16 +254,10 @@ async def parse_cv_with_mistral(cv_bytes, cv_filename):
         ```
 
         Instructions spéciales:
-        - Inclus TOUJOURS les champs "linkedin" et "github" dans le JSON, même s'ils sont vides ("").
-        - Pour LinkedIn, si tu trouves une URL comme "linkedin.com/in/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/linkedin-innom-utilisateur", n'inclus que "nom-utilisateur".
-        - Pour GitHub, si tu trouves une URL comme "github.com/nom-utilisateur", n'inclus que "nom-utilisateur". Si tu trouves directement "/githubnom-utilisateur", n'inclus que "nom-utilisateur".
-        - Si aucun profil LinkedIn ou GitHub n'est mentionné dans le CV, laisse ces champs vides: "linkedin": "", "github": "".
-        
         - IMPORTANT: Pour les compétences techniques, inclus UNIQUEMENT les langages de programmation, logiciels, et outils concrets.
           * Ne pas inclure dans cette section les domaines de connaissances théoriques comme l'économie, la finance, les mathématiques, etc.
           * Limite-toi aux compétences techniques concrètes et opérationnelles (langages, logiciels, frameworks, etc.)
-          * Assure-toi d'inclure les outils de la suite Microsoft Office (Word, Excel, PowerPoint) et Microsoft 365 s'ils sont mentionnés dans le CV
-        
+
         - Identifie et liste toutes les soft skills (compétences personnelles, interpersonnelles et transversales).
         
         - CERTIFICATIONS:
@@ -296,85 +275,46 @@ async def parse_cv_with_mistral(cv_bytes, cv_filename):
         Retourne UNIQUEMENT le JSON sans aucun autre commentaire. Assure-toi que le format est valide.
         """
         
-        # Configuration des en-têtes pour l'API Mistral
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {MISTRAL_API_KEY}"
-        }
-        
-        # Préparation des données pour l'API
-        payload = {
-            "model": "mistral-small-latest",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
-        }
-        
-        # Envoi de la requête à l'API Mistral
-        response = requests.post(API_URL, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
-            
-            # Extraction du JSON de la réponse
-            json_pattern = r"```json\s*([\s\S]*?)\s*```|^\s*(\{[\s\S]*\})\s*$"
-            match = re.search(json_pattern, content)
-            
-            if match:
-                json_str = match.group(1) or match.group(2)
-                
-                # Vérifier que le JSON est valide
-                try:
-                    json_obj = json.loads(json_str)
-                    
-                    # Post-traitement pour détecter Microsoft Office et ses composants
-                    if "competences_techniques" in json_obj:
-                        # Liste des termes bureautiques à rechercher dans le texte du CV
-                        bureautique_terms = [
-                            "Microsoft Office", "MS Office", "Office", "Suite Office", 
-                            "Microsoft 365", "Office 365", "M365", "O365",
-                            "Excel", "Word", "PowerPoint", "PPT", "Access", "Outlook",
-                            "OneNote", "SharePoint", "OneDrive", "Teams", "Microsoft Teams"
-                        ]
-                        
-                        # Vérifier si ces termes sont dans le texte du CV mais pas dans les compétences
-                        found_terms = set()
-                        for term in bureautique_terms:
-                            pattern = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-                            if pattern.search(cv_text):
-                                # Normaliser le nom de la compétence (première lettre de chaque mot en majuscule)
-                                normalized_term = ' '.join(word.capitalize() for word in term.split())
-                                found_terms.add(normalized_term)
-                        
-                        # Ajouter les termes trouvés qui ne sont pas déjà dans les compétences
-                        for term in found_terms:
-                            if not any(comp.lower() == term.lower() for comp in json_obj["competences_techniques"]):
-                                json_obj["competences_techniques"].append(term)
-                    
-                    # Vérifier que tous les champs requis sont présents, sinon les ajouter
-                    champs_requis = ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]
-                    for champ in champs_requis:
-                        if champ not in json_obj:
-                            if champ in ["linkedin", "github"]:
-                                json_obj[champ] = ""
-                            elif champ in ["competences_techniques", "soft_skills", "certifications"]:
-                                json_obj[champ] = []
-                    
-                    # Créer un fichier temporaire pour stocker le JSON
-                    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as temp_file:
-                        temp_file.write(json.dumps(json_obj, ensure_ascii=False, indent=2).encode('utf-8'))
-                        temp_path = temp_file.name
-                    
-                    return temp_path, "✅ Analyse terminée avec succès!"
-                    
-                except json.JSONDecodeError as e:
-                    return None, f"❌ Erreur de format JSON: {str(e)}"
-            else:
-                return None, "❌ Impossible d'extraire un JSON valide de la réponse."
-        else:
-            return None, f"❌ Erreur API Mistral: {response.status_code} - {response.text}"
+        # Envoi de la requête à l'API Mistral (session HTTP partagée, non bloquant, bascule vers Gemini si Mistral est en panne)
+        try:
+            content, fournisseur, modele = await appeler_llm(prompt, "mistral", model="mistral-small-latest", api_key=MISTRAL_API_KEY, format_json=True)
+        except LLMError as e:
+            return None, f"❌ {e}"
+        
+        message_succes = "✅ Analyse terminée avec succès!"
+        if fournisseur != "mistral":
+            # Le résultat est mis en cache sous la clé du fournisseur qui a répondu
+            cle_cache = cle_extraction_cv(texte_brut, fournisseur, modele, VERSION_PROMPT_MISTRAL)
+            message_succes = "✅ Analyse terminée avec succès (Mistral indisponible, analyse réalisée par Gemini)!"
+        
+        # Extraction du JSON de la réponse (blocs ```json, virgules finales, réponse tronquée...)
+        try:
+            json_obj = charger_json(content)
+        except ValueError as e:
+            return None, f"❌ Erreur de format JSON: {str(e)}"
+        
+        # Coordonnées et profils extraits localement (non demandés au LLM), outils du catalogue
+        # ajoutés aux compétences techniques trouvées par le LLM
+        fusionner_champs_locaux(json_obj, extraire_champs_locaux(cv_text))
+        
+        # Certifications du catalogue présentes dans le CV mais omises par le LLM
+        # (les soft skills citées hors contexte ne sont pas ajoutées : c'est au LLM d'en juger)
+        certifications = detecteur_competences.detecter(cv_text)["certifications"]
+        fusionner_champs_locaux(json_obj, {"certifications": certifications})
+        
+        # Vérifier que tous les champs requis sont présents, sinon les ajouter
+        champs_requis = ["linkedin", "github", "competences_techniques", "soft_skills", "certifications"]
+        for champ in champs_requis:
+            if champ not in json_obj:
+                if champ in ["linkedin", "github"]:
+                    json_obj[champ] = ""
+                elif champ in ["competences_techniques", "soft_skills", "certifications"]:
+                    json_obj[champ] = []
+        
+        await cache_extractions_cv.set_async(cle_cache, json_obj)
+        
+        document.structure = json_obj
+        return document, message_succes
             
     except Exception as e:
         return None, f"❌ Erreur lors de l'analyse: {str(e)}"
@@ -393,33 +333,32 @@ def setup_parse_cv_commands(bot):
             return
             
         try:
-            # Télécharger le fichier
-            file_bytes = await fichier.read()
+            # Télécharger et lire le fichier (une seule fois pour toute l'analyse)
+            try:
+                document = await charger_document(fichier.filename, await fichier.read())
+            except ErreurDocument as e:
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+                return
             
             # Informer l'utilisateur que l'analyse est en cours
             await interaction.followup.send("⏳ Analyse du CV avec Gemini en cours... Veuillez patienter.")
             
             # Analyser le CV avec Gemini
-            temp_path, message = await parse_cv_with_gemini(file_bytes, fichier.filename)
+            document, message = await parse_cv_with_gemini(document)
             
-            if temp_path:
+            if document:
                 # Stocker les données pour cet utilisateur
                 user_data = get_user_data(interaction.user.id)
-                user_data.cv_raw = extract_text_from_pdf(file_bytes)
+                user_data.cv_raw = document.texte
                 user_data.cv_file_name = fichier.filename
-                
-                with open(temp_path, 'r', encoding='utf-8') as f:
-                    user_data.cv_structured = json.load(f)
+                user_data.cv_structured = document.structure
                 
                 # Envoyer le fichier JSON
                 filename = f"{fichier.filename.rsplit('.', 1)[0]}_gemini.json"
                 await interaction.followup.send(
-                    content="✅ Analyse terminée avec succès! Voici le fichier JSON généré:",
-                    file=discord.File(temp_path, filename=filename)
+                    content=message_resultat(document, f"{message} Voici le fichier JSON généré:"),
+                    file=fichier_json(document, filename)
                 )
-                
-                # Supprimer le fichier temporaire
-                os.unlink(temp_path)
             else:
                 await interaction.followup.send(f"❌ {message}", ephemeral=True)
                 
@@ -437,33 +376,32 @@ def setup_parse_cv_commands(bot):
             return
             
         try:
-            # Télécharger le fichier
-            file_bytes = await fichier.read()
+            # Télécharger et lire le fichier (une seule fois pour toute l'analyse)
+            try:
+                document = await charger_document(fichier.filename, await fichier.read())
+            except ErreurDocument as e:
+                await interaction.followup.send(f"❌ {e}", ephemeral=True)
+                return
             
             # Informer l'utilisateur que l'analyse est en cours
             await interaction.followup.send("⏳ Analyse du CV avec Mistral en cours... Veuillez patienter.")
             
             # Analyser le CV avec Mistral
-            temp_path, message = await parse_cv_with_mistral(file_bytes, fichier.filename)
+            document, message = await parse_cv_with_mistral(document)
             
-            if temp_path:
+            if document:
                 # Stocker les données pour cet utilisateur
                 user_data = get_user_data(interaction.user.id)
-                user_data.cv_raw = extract_text_from_pdf(file_bytes)
+                user_data.cv_raw = document.texte
                 user_data.cv_file_name = fichier.filename
-                
-                with open(temp_path, 'r', encoding='utf-8') as f:
-                    user_data.cv_structured = json.load(f)
+                user_data.cv_structured = document.structure
                 
                 # Envoyer le fichier JSON
                 filename = f"{fichier.filename.rsplit('.', 1)[0]}_mistral.json"
                 await interaction.followup.send(
-                    content="✅ Analyse terminée avec succès! Voici le fichier JSON généré:",
-                    file=discord.File(temp_path, filename=filename)
+                    content=message_resultat(document, f"{message} Voici le fichier JSON généré:"),
+                    file=fichier_json(document, filename)
                 )
-                
-                # Supprimer le fichier temporaire
-                os.unlink(temp_path)
             else:
                 await interaction.followup.send(f"❌ {message}", ephemeral=True)
                 
@@ -490,29 +428,28 @@ def setup_parse_cv_commands(bot):
         processing_msg = await ctx.send("⏳ Traitement du CV en cours... Veuillez patienter.")
         
         try:
-            # Télécharger le fichier PDF
-            pdf_content = await attachment.read()
+            # Télécharger et lire le fichier PDF (une seule fois pour toute l'analyse)
+            try:
+                document = await charger_document(attachment.filename, await attachment.read())
+            except ErreurDocument as e:
+                await processing_msg.edit(content=f"❌ {e}")
+                return
             
             # Analyser le CV avec Mistral
             await processing_msg.edit(content="⏳ Analyse du CV avec Mistral AI en cours...")
-            temp_path, message = await parse_cv_with_mistral(pdf_content, attachment.filename)
+            document, message = await parse_cv_with_mistral(document)
             
-            if temp_path:
+            if document:
                 # Stocker les données pour cet utilisateur
                 user_id = str(ctx.author.id)
                 user_data = get_user_data(user_id)
-                user_data.cv_raw = extract_text_from_pdf(pdf_content)
+                user_data.cv_raw = document.texte
                 user_data.cv_file_name = attachment.filename
-                
-                with open(temp_path, 'r', encoding='utf-8') as f:
-                    user_data.cv_structured = json.load(f)
+                user_data.cv_structured = document.structure
                 
                 # Envoyer le fichier JSON
-                await processing_msg.edit(content="✅ Traitement terminé ! Voici le fichier JSON généré:")
-                await ctx.send(file=discord.File(temp_path, f"{attachment.filename.rsplit('.', 1)[0]}.json"))
-                
-                # Supprimer le fichier temporaire
-                os.unlink(temp_path)
+                await processing_msg.edit(content=message_resultat(document, f"{message} Voici le fichier JSON généré:"))
+                await ctx.send(file=fichier_json(document, f"{attachment.filename.rsplit('.', 1)[0]}.json"))
             else:
                 await processing_msg.edit(content=f"❌ {message}")
                 
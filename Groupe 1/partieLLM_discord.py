@@ -1,10 +1,41 @@
 import discord
 from discord import app_commands
-import requests
+import asyncio
 import json
 import io
+import os
+import time
+import zipfile
 from docx import Document
 from utils.helper import get_user_data, check_user_prerequisites, UserData
+from utils.cache import cache_reponses_llm, cle_reponse_llm
+from utils.json_tolerant import charger_json
+from utils.prefiltre import score_local, termes_cv, DECISION_REJET, DECISION_BASSE_PRIORITE
+from utils.rate_limiter import PRIORITE_INTERACTIVE, PRIORITE_ARRIERE_PLAN
+from utils.speculation import lancer_speculation, attendre_speculation, annuler_speculation
+from llm_client import appeler_llm, streamer_gemini, fournisseur_disponible, LLMError
+
+# Versions des prompts (à incrémenter à chaque modification d'un prompt
+# pour invalider les réponses mises en cache)
+VERSION_PROMPT_PERTINENCE = "pertinence-v1"
+VERSION_PROMPT_LETTRE = "lettre-v1"
+VERSION_PROMPT_CRIBLAGE = "criblage-v1"
+
+# Criblage par lot : nombre d'offres évaluées par appel, longueur des résumés d'offre
+# et score minimal (sur 100) pour qu'une offre soit jugée pertinente
+TAILLE_LOT_CRIBLAGE = int(os.getenv("CRIBLAGE_TAILLE_LOT", "15"))
+LONGUEUR_RESUME_OFFRE = int(os.getenv("CRIBLAGE_LONGUEUR_RESUME", "600"))
+SEUIL_PERTINENCE = int(os.getenv("CRIBLAGE_SEUIL_PERTINENCE", "70"))
+
+# Lettres multiples : nombre maximal par commande et générations simultanées par utilisateur
+LETTRES_MAX = int(os.getenv("LETTRES_MAX", "10"))
+LETTRES_SIMULTANEES_PAR_UTILISATEUR = int(os.getenv("LETTRES_SIMULTANEES", "3"))
+_verrous_lettres = {}
+
+# Streaming de la lettre : intervalle minimal entre deux éditions du message Discord
+# (les éditions sont regroupées pour respecter les limites de débit de Discord)
+INTERVALLE_EDITION_STREAMING = 1.5
+LIMITE_MESSAGE_DISCORD = 2000
 
 # --- 1. Fonctions pour générer les prompts ---
 
@@ -28,8 +59,8 @@ def formatter_experience(experience):
         "\n  ".join(e.get('details', [])) for e in experience
     )
 
-def generer_prompt_pertinence(cv_dict, offre_dict):
-    """Génère un prompt pour vérifier la pertinence du CV pour l'offre"""
+def formatter_cv_pertinence(cv_dict):
+    """Formate le CV structuré pour les prompts d'analyse de pertinence"""
     formations = formatter_formation(cv_dict.get("formation", []))
     experiences = formatter_experience(cv_dict.get("experience", []))
     competences = "\n- ".join(cv_dict.get("competences_techniques", ["Aucune compétence technique mentionnée"]))
@@ -37,7 +68,7 @@ def generer_prompt_pertinence(cv_dict, offre_dict):
     langues = "\n- ".join(cv_dict.get("langues", ["Aucune langue mentionnée"]))
     certifications = "\n- ".join(cv_dict.get("certifications", ["Aucune certification mentionnée"]))
 
-    cv_txt = f"""Nom : {cv_dict.get('prenom_nom', 'Non spécifié')}
+    return f"""Nom : {cv_dict.get('prenom_nom', 'Non spécifié')}
 Email : {cv_dict.get('email', 'Non spécifié')}
 Téléphone : {cv_dict.get('telephone', 'Non spécifié')}
 
@@ -60,6 +91,10 @@ Certifications :
 - {certifications}
 """
 
+def generer_prompt_pertinence(cv_dict, offre_dict):
+    """Génère un prompt pour vérifier la pertinence du CV pour l'offre"""
+    cv_txt = formatter_cv_pertinence(cv_dict)
+
     offre_txt = f"""Titre : {offre_dict.get('titre', 'Non spécifié')}
 Entreprise : {offre_dict.get('entreprise', 'Non spécifié')}
 Lieu : {offre_dict.get('lieu', 'Non spécifié')}
@@ -91,6 +126,44 @@ Voici un CV et une offre d'emploi. Analyse en détail la compatibilité entre le
 {offre_txt}
 """
 
+def resumer_offre(offre_dict, numero):
+    """Résumé compact d'une offre pour le criblage par lot (texte tronqué à LONGUEUR_RESUME_OFFRE caractères)"""
+    # Les offres Indeed ont des missions et un profil, celles de France Travail une simple description
+    contenu = " ".join(
+        str(offre_dict[champ]) for champ in ("missions", "profil_recherche", "description") if offre_dict.get(champ)
+    )
+    contenu = " ".join(contenu.split())
+    if len(contenu) > LONGUEUR_RESUME_OFFRE:
+        contenu = contenu[:LONGUEUR_RESUME_OFFRE] + "…"
+
+    return (
+        f"[{numero}] {offre_dict.get('titre', 'Non spécifié')} – {offre_dict.get('entreprise', 'Non spécifié')} "
+        f"({offre_dict.get('lieu', 'Non spécifié')}, {offre_dict.get('type_contrat', 'contrat non spécifié')})\n"
+        f"{contenu or 'Pas de description.'}"
+    )
+
+def generer_prompt_criblage(cv_dict, offres_numerotees):
+    """
+    Génère un prompt évaluant plusieurs offres en un seul appel.
+    `offres_numerotees` est une liste de couples (numéro, offre).
+    """
+    cv_txt = formatter_cv_pertinence(cv_dict)
+    offres_txt = "\n\n".join(resumer_offre(offre, numero) for numero, offre in offres_numerotees)
+
+    return f"""
+Tu es un expert RH.
+
+Voici un CV et {len(offres_numerotees)} offres d'emploi numérotées. Évalue la compatibilité du profil avec chaque offre.
+Réponds uniquement avec un tableau JSON, sans aucun texte autour, contenant un objet par offre :
+[{{"numero": <numéro de l'offre>, "score": <pourcentage de correspondance entre 0 et 100>, "raison": "<une phrase courte>"}}]
+
+--- CV ---
+{cv_txt}
+
+--- Offres ---
+{offres_txt}
+"""
+
 def generer_prompt_lettre(cv_dict, offre_dict, infos_perso=None):
     """Génère un prompt pour créer une lettre de motivation"""
     if infos_perso is None:
@@ -172,42 +245,319 @@ Profil recherché :
 """
 
 # --- 2. Interaction avec l'API Gemini ---
-async def interroger_gemini(prompt, api_key):
-    """Interroge l'API Gemini avec un prompt"""
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent"
-    headers = {"Content-Type": "application/json"}
-    params = {"key": api_key}
-    
-    data = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-    }
-    
+async def interroger_gemini(prompt, api_key, priorite=PRIORITE_INTERACTIVE, format_json=False):
+    """Interroge l'API Gemini avec un prompt (bascule vers Mistral si Gemini est en panne)"""
     try:
-        response = requests.post(url, headers=headers, params=params, json=data)
-        if response.status_code == 200:
-            resultat = response.json()
-            return resultat['candidates'][0]['content']['parts'][0]['text'].strip()
-        else:
-            print(f"\n❌ Erreur Gemini : {response.status_code}")
-            print(response.text)
-            return None
+        texte, _, _ = await appeler_llm(prompt, "gemini", model="gemini-1.5-pro", api_key=api_key, priorite=priorite, format_json=format_json)
+        return texte
+    except LLMError as e:
+        print(f"\n❌ Erreur Gemini : {e.status}")
+        print(e.message)
+        return None
     except Exception as e:
         print(f"Erreur lors de l'appel à l'API Gemini: {e}")
         return None
 
+def apercu_lettre(texte, en_cours=True):
+    """Prépare le contenu du message Discord affichant la lettre (limité à 2000 caractères)"""
+    entete = "✍️ **Rédaction en cours...**\n" if en_cours else "📝 **Lettre générée**\n"
+    place = LIMITE_MESSAGE_DISCORD - len(entete) - 1
+    if len(texte) > place:
+        # Afficher la fin du texte pour que la progression reste visible
+        texte = "…" + texte[-(place - 1):]
+    return entete + texte
+
+async def editer_message(message, contenu):
+    """Modifie un message Discord ; False si le message a été supprimé ou n'est plus modifiable"""
+    try:
+        await message.edit(content=contenu)
+        return True
+    except discord.HTTPException as e:
+        print(f"Erreur lors de la mise à jour du message: {e}")
+        return False
+
+async def interroger_gemini_en_direct(prompt, api_key, message):
+    """
+    Interroge Gemini en streaming et met à jour progressivement un message Discord.
+    Retourne le texte complet, ou None en cas d'erreur (l'appelant bascule alors vers generer_lettre).
+    """
+    morceaux = []
+    derniere_edition = 0.0
+    edition = None
+    
+    try:
+        async for morceau in streamer_gemini(prompt, model="gemini-1.5-pro", api_key=api_key):
+            morceaux.append(morceau)
+            
+            # Regrouper les éditions : au plus une toutes les INTERVALLE_EDITION_STREAMING secondes
+            maintenant = time.monotonic()
+            if maintenant - derniere_edition >= INTERVALLE_EDITION_STREAMING and (edition is None or edition.done()):
+                edition = asyncio.create_task(editer_message(message, apercu_lettre("".join(morceaux))))
+                derniere_edition = maintenant
+    except LLMError as e:
+        print(f"\n❌ Erreur Gemini (streaming) : {e.status}")
+        print(e.message)
+        return None
+    except Exception as e:
+        print(f"Erreur lors du streaming de l'API Gemini: {e}")
+        return None
+    finally:
+        if edition is not None:
+            await edition
+    
+    lettre = "".join(morceaux).strip()
+    if lettre:
+        await editer_message(message, apercu_lettre(lettre, en_cours=False))
+    return lettre or None
+
+def lire_scores_criblage(reponse, numeros):
+    """
+    Extrait le tableau JSON de scores renvoyé par le modèle (réparé s'il est tronqué).
+    Retourne un dictionnaire numéro -> {"score", "pertinent", "raison"} limité aux numéros demandés ;
+    les offres sans score (élément tronqué ou incomplet) restent non évaluées.
+
+    Raises:
+        ValueError: si la réponse ne contient pas de tableau de scores.
+    """
+    elements = charger_json(reponse)
+    if isinstance(elements, dict):
+        # Le mode JSON de Mistral impose un objet : le tableau est alors l'une de ses valeurs
+        elements = next((valeur for valeur in elements.values() if isinstance(valeur, list)), [])
+    if not isinstance(elements, list):
+        raise ValueError(f"tableau de scores attendu, {type(elements).__name__} reçu")
+
+    scores = {}
+    for element in elements:
+        try:
+            numero = int(element["numero"])
+            score = max(0, min(100, int(float(element["score"]))))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if numero in numeros:
+            scores[numero] = {
+                "score": score,
+                "pertinent": score >= SEUIL_PERTINENCE,
+                "raison": str(element.get("raison", "")).strip()
+            }
+    return scores
+
+async def _cribler_lot(cv_dict, lot, api_key, regenerer, priorite):
+    """Évalue un lot d'offres numérotées en un appel (réponse mise en cache par lot)"""
+    numeros = {numero for numero, _ in lot}
+    cle_cache = cle_reponse_llm("criblage", VERSION_PROMPT_CRIBLAGE, cv_dict, lot)
+    reponse = None if regenerer else await cache_reponses_llm.get_async(cle_cache)
+    appel = reponse is None
+
+    if appel:
+        reponse = await interroger_gemini(generer_prompt_criblage(cv_dict, lot), api_key, priorite, format_json=True)
+        if not reponse:
+            return {}, appel
+
+    try:
+        scores = lire_scores_criblage(reponse, numeros)
+    except ValueError as e:
+        print(f"⚠️ Réponse de criblage illisible ({len(lot)} offres) : {e}")
+        return {}, appel
+
+    if appel and scores:
+        await cache_reponses_llm.set_async(cle_cache, reponse)
+    return scores, appel
+
+async def cribler_offres(cv_dict, offres, api_key, taille_lot=TAILLE_LOT_CRIBLAGE, regenerer=False, prefiltrer=True):
+    """
+    Évalue la pertinence du CV pour toutes les offres en envoyant le CV une seule fois
+    par lot de `taille_lot` offres (les lots sont traités en parallèle).
+    Avec `prefiltrer`, les offres écartées par le score local ne sont pas envoyées au modèle
+    et celles au score local faible sont évaluées en dernier.
+
+    Returns:
+        tuple: (liste alignée sur `offres` de dictionnaires {"score", "pertinent", "raison"}
+        ou None si l'offre n'a pas pu être évaluée, nombre d'appels effectués)
+    """
+    scores = {}
+    a_evaluer, basse_priorite = [], []
+    termes = termes_cv(cv_dict) if prefiltrer else {}
+
+    for numero, offre in enumerate(offres, start=1):
+        prefiltre = score_local(cv_dict, offre, termes) if termes else None
+        if prefiltre is None:
+            a_evaluer.append((numero, offre))
+        elif prefiltre["decision"] == DECISION_REJET:
+            scores[numero] = {
+                "score": prefiltre["score"],
+                "pertinent": False,
+                "raison": "Écartée par le pré-filtre local : trop peu de compétences du CV retrouvées dans l'offre.",
+                "local": True
+            }
+        elif prefiltre["decision"] == DECISION_BASSE_PRIORITE:
+            basse_priorite.append((numero, offre))
+        else:
+            a_evaluer.append((numero, offre))
+
+    # Les offres au score local faible sont placées en fin de liste : un lot qui n'en contient
+    # que de celles-ci passe en basse priorité dans le limiteur de débit
+    a_evaluer += basse_priorite
+    lots = []
+    for i in range(0, len(a_evaluer), taille_lot):
+        lot = a_evaluer[i:i + taille_lot]
+        priorite = PRIORITE_ARRIERE_PLAN if i >= len(a_evaluer) - len(basse_priorite) else PRIORITE_INTERACTIVE
+        lots.append((lot, priorite))
+
+    resultats = await asyncio.gather(*(_cribler_lot(cv_dict, lot, api_key, regenerer, priorite) for lot, priorite in lots))
+
+    appels = 0
+    for scores_lot, appel in resultats:
+        scores.update(scores_lot)
+        appels += appel
+
+    print(f"📊 Criblage : {len(scores)}/{len(offres)} offres évaluées en {appels} appel(s) Gemini "
+          f"({len(lots)} lot(s), {len(offres) - len(a_evaluer)} écartée(s) localement)")
+    return [scores.get(numero) for numero in range(1, len(offres) + 1)], appels
+
+def formater_prefiltre(prefiltre):
+    """Message affichant le score local provisoire d'une offre"""
+    communs = ", ".join(prefiltre["communs"][:10]) or "aucun"
+    return f"⚡ Score provisoire (local) : **{prefiltre['score']}/100** — termes communs avec l'offre : {communs}"
+
 # --- 3. Fonctions pour le bot Discord ---
 
+async def analyser_pertinence(cv_dict, offre_dict, api_key, priorite=PRIORITE_INTERACTIVE):
+    """Analyse de pertinence CV/offre par Gemini, mise en cache (None en cas d'échec)"""
+    prompt = generer_prompt_pertinence(cv_dict, offre_dict)
+    response = await interroger_gemini(prompt, api_key, priorite)
+    if response:
+        await cache_reponses_llm.set_async(cle_reponse_llm("analyse", VERSION_PROMPT_PERTINENCE, cv_dict, offre_dict), response)
+    return response
+
+def lancer_analyse_speculative(user_data, api_key=None):
+    """
+    Prépare en arrière-plan (basse priorité) l'analyse de compatibilité de l'offre sélectionnée
+    pour que /analyser_cv_offre réponde immédiatement. L'analyse d'une offre précédemment
+    sélectionnée est annulée. Retourne True si une analyse est en cours ou déjà disponible.
+    """
+    precedente = user_data.analyse_speculative
+    user_data.analyse_speculative = None
+    if not isinstance(user_data.cv_structured, dict) or not user_data.cv_structured or not user_data.job_offer:
+        annuler_speculation(precedente and precedente["tache"])
+        return False
+
+    cv_dict, offre = user_data.cv_structured, user_data.job_offer
+    cle_cache = cle_reponse_llm("analyse", VERSION_PROMPT_PERTINENCE, cv_dict, offre)
+    if precedente and precedente["cle"] == cle_cache and not precedente["tache"].cancelled():
+        # Même offre sélectionnée à nouveau : l'analyse en cours reste valable
+        user_data.analyse_speculative = precedente
+        return True
+    annuler_speculation(precedente and precedente["tache"])
+
+    # Offre écartée par le pré-filtre : /analyser_cv_offre ne lancerait pas l'analyse non plus
+    prefiltre = score_local(cv_dict, offre)
+    if prefiltre and prefiltre["decision"] == DECISION_REJET:
+        return False
+
+    async def preparer():
+        # Vérification faite dans la tâche (hors de la boucle asyncio) et sans fausser les
+        # compteurs du cache : /analyser_cv_offre lira l'analyse déjà enregistrée
+        if await cache_reponses_llm.contient_async(cle_cache):
+            return None
+        return await analyser_pertinence(cv_dict, offre, api_key, PRIORITE_ARRIERE_PLAN)
+
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    tache = lancer_speculation("analyse", preparer(), "gemini", "gemini-1.5-pro", api_key)
+    if tache is None:
+        return False
+
+    def conserver(t):
+        # Résultat gardé dans la session tant que l'utilisateur n'a pas changé d'offre
+        if not t.cancelled() and t.exception() is None and t.result():
+            user_data.analysis_results = {"cle": cle_cache, "reponse": t.result()}
+
+    tache.add_done_callback(conserver)
+    user_data.analyse_speculative = {"cle": cle_cache, "tache": tache}
+    print(f"🔮 Analyse spéculative lancée pour {user_data.user_id} : {offre.get('titre', 'offre sans titre')}")
+    return True
+
+async def recuperer_analyse_speculative(user_data, cle_cache, interaction, prefiltre):
+    """Réponse de l'analyse préparée à la sélection de l'offre (attendue si elle est en cours), None sinon"""
+    if user_data.analysis_results and user_data.analysis_results["cle"] == cle_cache:
+        return user_data.analysis_results["reponse"]
+
+    speculative = user_data.analyse_speculative
+    if not speculative or speculative["cle"] != cle_cache or speculative["tache"].cancelled():
+        return None
+    user_data.analyse_speculative = None
+    if not speculative["tache"].done():
+        message = "🔍 Analyse détaillée déjà en cours depuis la sélection de l'offre..."
+        await interaction.followup.send(f"{formater_prefiltre(prefiltre)}\n{message}" if prefiltre else message)
+    response = await attendre_speculation(speculative["tache"])
+    if response:
+        print(f"🔮 Analyse spéculative utilisée pour {user_data.user_id}")
+    return response
+
+def lettre_vers_docx(lettre, nom):
+    """Met en forme la lettre dans un document Word et retourne son contenu binaire"""
+    doc = Document()
+    
+    # Ajouter un en-tête
+    doc.add_heading(f"Lettre de motivation - {nom}", 0)
+    
+    # Ajouter le contenu de la lettre
+    for ligne in lettre.split('\n'):
+        if ligne.strip():
+            doc.add_paragraph(ligne)
+    
+    # Sauvegarder en mémoire
+    with io.BytesIO() as file:
+        doc.save(file)
+        return file.getvalue()
+
+async def generer_lettre(cv_dict, offre_dict, infos_perso, api_key, regenerer=False):
+    """Lettre de motivation pour une offre (réponse mise en cache), None en cas d'échec"""
+    cle_cache = cle_reponse_llm("lettre", VERSION_PROMPT_LETTRE, cv_dict, offre_dict, infos_perso)
+    lettre = None if regenerer else await cache_reponses_llm.get_async(cle_cache)
+    if lettre is None:
+        lettre = await interroger_gemini(generer_prompt_lettre(cv_dict, offre_dict, infos_perso), api_key)
+        if lettre:
+            await cache_reponses_llm.set_async(cle_cache, lettre)
+    return lettre
+
+def choisir_offres_lettres(user_data, numeros=None, nombre=5):
+    """
+    Offres de la dernière recherche pour lesquelles générer une lettre : les numéros du menu
+    de sélection (« 1,3,4 »), sinon les `nombre` meilleures du dernier criblage, sinon les premières.
+    Au plus LETTRES_MAX offres sont retenues.
+    Retourne la liste des couples (numéro, offre) et le nombre d'offres demandées écartées par cette limite.
+    """
+    offres = list(enumerate(user_data.job_offers or [], start=1))
+    if numeros:
+        demandes = {int(n) for n in numeros.replace(";", ",").split(",") if n.strip().isdigit()}
+        choisies = [(numero, offre) for numero, offre in offres if numero in demandes]
+    elif user_data.scores_offres and len(user_data.scores_offres) == len(offres):
+        scores = user_data.scores_offres
+        choisies = sorted((element for element in offres if scores[element[0] - 1]),
+                          key=lambda element: scores[element[0] - 1]["score"], reverse=True)
+    else:
+        choisies = offres
+    if not numeros:
+        choisies = choisies[:nombre]
+    return choisies[:LETTRES_MAX], max(0, len(choisies) - LETTRES_MAX)
+
+def verrou_lettres(user_id):
+    """Sémaphore limitant le nombre de lettres générées simultanément pour un utilisateur"""
+    if user_id not in _verrous_lettres:
+        _verrous_lettres[user_id] = asyncio.Semaphore(LETTRES_SIMULTANEES_PAR_UTILISATEUR)
+    return _verrous_lettres[user_id]
+
+def nom_fichier_lettre(numero, offre_dict):
+    """Nom du fichier .docx d'une lettre dans l'archive (caractères sûrs uniquement)"""
+    entreprise = "".join(c if c.isalnum() else "_" for c in str(offre_dict.get("entreprise") or "entreprise"))
+    return f"{numero:02d}_Lettre_Motivation_{entreprise[:40]}.docx"
+
 def setup_gemini_commands(bot, api_key):
     """Configure les commandes liées à PartieLLM pour le bot Discord"""
     
     # Commande pour comparer le CV avec une offre
     @bot.tree.command(name="analyser_cv_offre", description="Analyse la compatibilité entre votre CV et l'offre d'emploi sélectionnée")
-    async def analyser_cv_offre(interaction: discord.Interaction):
+    async def analyser_cv_offre(interaction: discord.Interaction, regenerer: bool = False, forcer: bool = False):
         await interaction.response.defer(thinking=True)
         
         # Vérifier que l'utilisateur a téléchargé un CV et sélectionné une offre
@@ -224,15 +574,38 @@ def setup_gemini_commands(bot, api_key):
                 await interaction.followup.send("❌ Votre CV n'a pas été analysé de manière structurée. Utilisez d'abord la commande `/extraire_cv` pour l'analyser.", ephemeral=True)
                 return
                 
-            # Générer le prompt pour l'analyse de pertinence
-            prompt = generer_prompt_pertinence(user_data.cv_structured, user_data.job_offer)
+            # Score local instantané, calculé sans appel au modèle
+            prefiltre = score_local(user_data.cv_structured, user_data.job_offer)
             
-            # Interroger Gemini
-            response = await interroger_gemini(prompt, api_key)
+            # Réutiliser l'analyse précédente si ni le CV ni l'offre n'ont changé
+            cle_cache = cle_reponse_llm("analyse", VERSION_PROMPT_PERTINENCE, user_data.cv_structured, user_data.job_offer)
+            response = None if regenerer else await cache_reponses_llm.get_async(cle_cache)
+            if response is None and not regenerer:
+                response = await recuperer_analyse_speculative(user_data, cle_cache, interaction, prefiltre)
             
-            if not response:
-                await interaction.followup.send("❌ Une erreur s'est produite lors de l'analyse avec Gemini.", ephemeral=True)
-                return
+            if response is None:
+                priorite = PRIORITE_INTERACTIVE
+                if prefiltre:
+                    # Offre sous le seuil de rejet (PREFILTRE_SEUIL_REJET) : pas d'appel LLM, sauf demande explicite
+                    if prefiltre["decision"] == DECISION_REJET and not forcer:
+                        await interaction.followup.send(
+                            f"{formater_prefiltre(prefiltre)}\n"
+                            "⛔ Trop peu de compétences de votre CV apparaissent dans cette offre, l'analyse détaillée n'a pas été lancée. "
+                            "Utilisez `/analyser_cv_offre forcer:True` pour la lancer quand même."
+                        )
+                        return
+                    if prefiltre["decision"] == DECISION_BASSE_PRIORITE:
+                        priorite = PRIORITE_ARRIERE_PLAN
+                    await interaction.followup.send(f"{formater_prefiltre(prefiltre)}\n🔍 Analyse détaillée en cours...")
+                
+                # Interroger Gemini (la réponse est mise en cache)
+                response = await analyser_pertinence(user_data.cv_structured, user_data.job_offer, api_key, priorite)
+                
+                if not response:
+                    await interaction.followup.send("❌ Une erreur s'est produite lors de l'analyse avec Gemini.", ephemeral=True)
+                    return
+            
+            user_data.analysis_results = {"cle": cle_cache, "reponse": response}
                 
             # Analyse de la réponse pour en tirer les informations clés
             lines = response.split('\n')
@@ -261,6 +634,9 @@ def setup_gemini_commands(bot, api_key):
                 color=color
             )
             
+            if prefiltre:
+                embed.add_field(name="⚡ Score local", value=f"{prefiltre['score']}/100", inline=True)
+            
             if strengths:
                 embed.add_field(name="📈 Points forts", value="\n".join([f"✅ {s}" for s in strengths[:5]]), inline=False)
             
@@ -281,6 +657,66 @@ def setup_gemini_commands(bot, api_key):
             print(f"Erreur lors de l'analyse CV/offre: {e}")
             await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
     
+    # Commande pour évaluer toutes les offres de la dernière recherche en quelques appels
+    @bot.tree.command(name="cribler_offres", description="Évalue la compatibilité de votre CV avec toutes les offres de votre dernière recherche")
+    async def cribler_offres_commande(interaction: discord.Interaction, regenerer: bool = False, forcer: bool = False):
+        await interaction.response.defer(thinking=True)
+        
+        error_message = check_user_prerequisites(interaction.user.id, need_cv=True)
+        if error_message:
+            await interaction.followup.send(error_message, ephemeral=True)
+            return
+        
+        try:
+            user_data = get_user_data(interaction.user.id)
+            
+            if not isinstance(user_data.cv_structured, dict) or not user_data.cv_structured:
+                await interaction.followup.send("❌ Votre CV n'a pas été analysé de manière structurée. Utilisez d'abord la commande `/extraire_cv` pour l'analyser.", ephemeral=True)
+                return
+            
+            if not user_data.job_offers:
+                await interaction.followup.send("❌ Vous devez d'abord rechercher des offres avec la commande `/scrape` ou `/scrape_stage`.", ephemeral=True)
+                return
+            
+            offres = user_data.job_offers
+            scores, appels = await cribler_offres(user_data.cv_structured, offres, api_key, regenerer=regenerer, prefiltrer=not forcer)
+            user_data.scores_offres = scores
+            
+            evaluees = [(numero, offre, score) for numero, (offre, score) in enumerate(zip(offres, scores), start=1) if score]
+            if not evaluees:
+                await interaction.followup.send("❌ Une erreur s'est produite lors du criblage des offres avec Gemini.", ephemeral=True)
+                return
+            
+            # Offres classées par score décroissant (les numéros sont ceux du menu de sélection)
+            evaluees.sort(key=lambda element: element[2]["score"], reverse=True)
+            pertinentes = sum(1 for _, _, score in evaluees if score["pertinent"])
+            
+            embed = discord.Embed(
+                title="📊 Criblage des offres",
+                description=f"**{pertinentes}** offre(s) sur {len(offres)} correspondent à votre profil (score ≥ {SEUIL_PERTINENCE}).",
+                color=discord.Color.green() if pertinentes else discord.Color.orange()
+            )
+            
+            for numero, offre, score in evaluees[:25]:
+                icone = "🟢" if score["pertinent"] else "🔴"
+                nom = f"{icone} {score['score']}/100 — {numero}. {offre.get('titre', 'Sans titre')} - {offre.get('entreprise', 'N/A')}"
+                embed.add_field(name=nom[:256], value=(score["raison"] or "—")[:1024], inline=False)
+            
+            non_evaluees = len(offres) - len(evaluees)
+            pied = f"{len(offres)} offres criblées en {appels} appel(s)"
+            ecartees = sum(1 for score in scores if score and score.get("local"))
+            if ecartees:
+                pied += f" • {ecartees} écartée(s) par le pré-filtre local (option forcer pour les évaluer)"
+            if non_evaluees:
+                pied += f" • ⚠️ {non_evaluees} offre(s) non évaluée(s)"
+            embed.set_footer(text=pied)
+            
+            await interaction.followup.send(embed=embed)
+            
+        except Exception as e:
+            print(f"Erreur lors du criblage des offres: {e}")
+            await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
+    
     # Commande pour collecter des informations supplémentaires pour la lettre
     @bot.tree.command(name="infos_lettre_g5", description="Fournir des informations supplémentaires pour personnaliser votre lettre de motivation")
     async def infos_lettre_g5(interaction: discord.Interaction):
@@ -340,7 +776,7 @@ def setup_gemini_commands(bot, api_key):
     
     # Commande pour générer la lettre de motivation
     @bot.tree.command(name="generer_lettre_g5", description="Générer une lettre de motivation basée sur votre CV et l'offre d'emploi avec Gemini")
-    async def generer_lettre_g5(interaction: discord.Interaction):
+    async def generer_lettre_g5(interaction: discord.Interaction, regenerer: bool = False, streaming: bool = True):
         await interaction.response.defer(thinking=True)
         
         # Vérifier que l'utilisateur a téléchargé un CV et sélectionné une offre
@@ -360,41 +796,46 @@ def setup_gemini_commands(bot, api_key):
             # Récupérer les infos supplémentaires si elles existent
             infos_perso = getattr(user_data, "lettre_infos", {"motivation": "", "lien_entreprise": "", "contraintes": ""})
             
-            # Générer le prompt pour la lettre
-            prompt = generer_prompt_lettre(user_data.cv_structured, user_data.job_offer, infos_perso)
+            # Réutiliser la lettre précédente si le CV, l'offre et les infos n'ont pas changé
+            cle_cache = cle_reponse_llm("lettre", VERSION_PROMPT_LETTRE, user_data.cv_structured, user_data.job_offer, infos_perso)
+            lettre = None if regenerer else await cache_reponses_llm.get_async(cle_cache)
             
-            # Interroger Gemini
-            lettre = await interroger_gemini(prompt, api_key)
-            
-            if not lettre:
-                await interaction.followup.send("❌ Une erreur s'est produite lors de la génération de la lettre avec Gemini.", ephemeral=True)
-                return
+            if lettre is None:
+                # Interroger Gemini (en streaming, la lettre s'affiche au fur et à mesure) ;
+                # si le flux échoue ou si Gemini est en panne, la génération classique
+                # (generer_lettre, avec bascule vers Mistral) prend le relais
+                message = None
+                if streaming and fournisseur_disponible("gemini", "gemini-1.5-pro"):
+                    prompt = generer_prompt_lettre(user_data.cv_structured, user_data.job_offer, infos_perso)
+                    message = await interaction.followup.send(apercu_lettre(""), wait=True)
+                    lettre = await interroger_gemini_en_direct(prompt, api_key, message)
+                    if lettre:
+                        await cache_reponses_llm.set_async(cle_cache, lettre)
+                    else:
+                        print("↩️ Streaming Gemini interrompu : génération classique de la lettre")
+                        await editer_message(message, "✍️ **Rédaction en cours...**\nFlux interrompu, nouvelle tentative...")
+                
+                if not lettre:
+                    lettre = await generer_lettre(user_data.cv_structured, user_data.job_offer, infos_perso, api_key, regenerer=True)
+                    if lettre and message is not None:
+                        await editer_message(message, apercu_lettre(lettre, en_cours=False))
+                
+                if not lettre:
+                    await interaction.followup.send("❌ Une erreur s'est produite lors de la génération de la lettre avec Gemini.", ephemeral=True)
+                    return
             
             # Créer un document Word avec la lettre
-            doc = Document()
-            
-            # Ajouter un en-tête
             nom = user_data.cv_structured.get("prenom_nom", "")
-            doc.add_heading(f"Lettre de motivation - {nom}", 0)
-            
-            # Ajouter le contenu de la lettre
-            for ligne in lettre.split('\n'):
-                if ligne.strip():
-                    doc.add_paragraph(ligne)
-            
-            # Sauvegarder en mémoire
-            with io.BytesIO() as file:
-                doc.save(file)
-                file.seek(0)
-                
+            with io.BytesIO(lettre_vers_docx(lettre, nom)) as file:
                 # Préparer le fichier pour Discord
                 entreprise = user_data.job_offer.get("entreprise", "entreprise").replace(" ", "_")
                 file_discord = discord.File(file, filename=f"Lettre_Motivation_{nom.replace(' ', '_')}_{entreprise}.docx")
                 
                 # Créer un embed pour la présentation
+                nom_entreprise = user_data.job_offer.get('entreprise', "l'entreprise")
                 embed = discord.Embed(
                     title=f"📝 Lettre de motivation pour {user_data.job_offer.get('titre', 'le poste')}",
-                    description=f"Votre lettre de motivation personnalisée pour {user_data.job_offer.get('entreprise', 'l\'entreprise')} est prête!",
+                    description=f"Votre lettre de motivation personnalisée pour {nom_entreprise} est prête!",
                     color=discord.Color.blue()
                 )
                 
@@ -411,6 +852,105 @@ def setup_gemini_commands(bot, api_key):
             print(f"Erreur lors de la génération de la lettre: {e}")
             await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
 
+    # Commande pour générer les lettres de plusieurs offres de la dernière recherche
+    @bot.tree.command(name="generer_lettres_g5", description="Générer en une fois les lettres de motivation de plusieurs offres de votre dernière recherche")
+    @app_commands.describe(
+        offres="Numéros des offres dans le menu de sélection, séparés par des virgules (ex. 1,3,4)",
+        nombre="Nombre de lettres si aucun numéro n'est donné (meilleurs scores de /cribler_offres, sinon premières offres)"
+    )
+    async def generer_lettres_g5(interaction: discord.Interaction, offres: str = None, nombre: int = 5, regenerer: bool = False):
+        await interaction.response.defer(thinking=True)
+        
+        error_message = check_user_prerequisites(interaction.user.id, need_cv=True)
+        if error_message:
+            await interaction.followup.send(error_message, ephemeral=True)
+            return
+        
+        try:
+            user_data = get_user_data(interaction.user.id)
+            
+            if not isinstance(user_data.cv_structured, dict) or not user_data.cv_structured:
+                await interaction.followup.send("❌ Votre CV n'a pas été analysé de manière structurée. Utilisez d'abord la commande `/extraire_cv` pour l'analyser.", ephemeral=True)
+                return
+            
+            if not user_data.job_offers:
+                await interaction.followup.send("❌ Vous devez d'abord rechercher des offres avec la commande `/scrape` ou `/scrape_stage`.", ephemeral=True)
+                return
+            
+            if nombre < 1:
+                await interaction.followup.send("❌ Le nombre de lettres doit être au moins 1.", ephemeral=True)
+                return
+            
+            choisies, ecartees = choisir_offres_lettres(user_data, offres, nombre)
+            if not choisies:
+                await interaction.followup.send(f"❌ Aucune offre ne correspond à ces numéros (1 à {len(user_data.job_offers)}).", ephemeral=True)
+                return
+            
+            cv_dict = user_data.cv_structured
+            infos_perso = user_data.lettre_infos
+            nom = cv_dict.get("prenom_nom", "")
+            verrou = verrou_lettres(interaction.user.id)
+            
+            # Suivi de la progression, mis à jour à chaque lettre terminée
+            etats = {numero: "⏳" for numero, _ in choisies}
+            limite = f"\n⚠️ Limite de {LETTRES_MAX} lettres par commande : {ecartees} offre(s) demandée(s) ignorée(s)." if ecartees else ""
+            
+            def progression():
+                lignes = [
+                    f"{etats[numero]} {numero}. {offre.get('titre', 'Sans titre')} - {offre.get('entreprise', 'N/A')}"[:150]
+                    for numero, offre in choisies
+                ]
+                terminees = sum(1 for etat in etats.values() if etat != "⏳")
+                return f"✍️ **Lettres de motivation : {terminees}/{len(choisies)}**{limite}\n" + "\n".join(lignes)
+            
+            message = await interaction.followup.send(progression(), wait=True)
+            
+            async def produire(numero, offre):
+                async with verrou:
+                    lettre = await generer_lettre(cv_dict, offre, infos_perso, api_key, regenerer)
+                    # Rendu Word hors de la boucle d'événements
+                    contenu = await asyncio.to_thread(lettre_vers_docx, lettre, nom) if lettre else None
+                return numero, offre, contenu
+            
+            fichiers = []
+            for terminee in asyncio.as_completed([produire(numero, offre) for numero, offre in choisies]):
+                numero, offre, contenu = await terminee
+                etats[numero] = "✅" if contenu else "❌"
+                if contenu:
+                    fichiers.append((nom_fichier_lettre(numero, offre), contenu))
+                # Message de suivi supprimé ou plus modifiable : la génération continue sans lui
+                if message and not await editer_message(message, progression()):
+                    message = None
+            
+            if not fichiers:
+                await interaction.followup.send("❌ Aucune lettre n'a pu être générée avec Gemini.", ephemeral=True)
+                return
+            
+            # Archive unique (les .docx sont déjà compressés : stockage sans recompression)
+            with io.BytesIO() as archive:
+                with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zip_lettres:
+                    for nom_fichier, contenu in sorted(fichiers):
+                        zip_lettres.writestr(nom_fichier, contenu)
+                archive.seek(0)
+                
+                echecs = len(choisies) - len(fichiers)
+                embed = discord.Embed(
+                    title=f"📦 {len(fichiers)} lettre(s) de motivation",
+                    description="Vos lettres sont regroupées dans l'archive jointe."
+                                + (f"\n⚠️ {echecs} lettre(s) n'ont pas pu être générées." if echecs else ""),
+                    color=discord.Color.blue() if not echecs else discord.Color.orange()
+                )
+                embed.add_field(
+                    name="💡 Conseil",
+                    value="N'oubliez pas de relire et personnaliser davantage chaque lettre avant de l'envoyer.",
+                    inline=False
+                )
+                await interaction.followup.send(embed=embed, file=discord.File(archive, filename=f"Lettres_Motivation_{nom.replace(' ', '_')}.zip"))
+            
+        except Exception as e:
+            print(f"Erreur lors de la génération des lettres: {e}")
+            await interaction.followup.send(f"❌ Une erreur s'est produite: {str(e)}", ephemeral=True)
+
 # Fonction d'initialisation pour être importée dans bot.py
 def setup_partillm_commands(bot, api_key):
     setup_gemini_commands(bot, api_key)
\ No newline at end of file
@@ -6,6 +6,7 @@ import traceback
 from utils.helper import get_user_data
 from scrape_jobs_g3 import scrape_indeed
 from scrape_stages import scrape_stages_indeed
+from partieLLM_discord import lancer_analyse_speculative
 
 # Configuration du logging
 logging.basicConfig(
@@ -68,6 +69,10 @@ class OffreSelect(discord.ui.Select):
             
             # Journalisation de la sélection d'offre
             logging.info(f"Offre sélectionnée par {interaction.user.name}: {offre['titre']} - {offre['entreprise']}")
+            
+            # Préparer l'analyse de compatibilité si le CV est déjà structuré
+            # (l'analyse d'une offre sélectionnée précédemment est annulée)
+            analyse_preparee = lancer_analyse_speculative(user)
 
             embed = discord.Embed(
                 title="Offre sélectionnée",
@@ -79,6 +84,13 @@ class OffreSelect(discord.ui.Select):
                 color=discord.Color.green()
             )
             
+            if analyse_preparee:
+                embed.add_field(
+                    name="🔮 Analyse de compatibilité",
+                    value="Déjà en préparation : `/analyser_cv_offre` affichera le résultat sans attente",
+                    inline=False
+                )
+            
             # Ajouter l'URL si disponible
             if "url" in offre and offre["url"]:
                 embed.add_field(name="Lien vers l'annonce", value=f"[Voir l'offre]({offre['url']})", inline=False)
@@ -182,6 +194,11 @@ def setup_scrape_command(bot):
             if max_fields < len(offres):
                 embed.set_footer(text=f"⚠️ {len(offres) - max_fields} offres non affichées (limite Discord atteinte)")
 
+            # Conserver les offres affichées pour /cribler_offres (mêmes numéros que le menu)
+            user = get_user_data(interaction.user.id)
+            user.job_offers = offres[:max_fields]
+            user.scores_offres = None
+
             view = OffreSelectionView(offres[:max_fields])
             await interaction.followup.send(embed=embed, view=view)
 
@@ -263,6 +280,11 @@ def setup_scrape_command(bot):
             if max_fields < len(offres_dict):
                 embed.set_footer(text=f"⚠️ {len(offres_dict) - max_fields} offres non affichées (limite Discord atteinte)")
 
+            # Conserver les offres affichées pour /cribler_offres (mêmes numéros que le menu)
+            user = get_user_data(interaction.user.id)
+            user.job_offers = offres_dict[:max_fields]
+            user.scores_offres = None
+
             view = OffreSelectionView(offres_dict[:max_fields])
             await interaction.followup.send(embed=embed, view=view)
 
@@ -0,0 +1,350 @@
+"""
+Serveur LLM local remplaçant les API Mistral et Gemini pour les tests et mesures de performance hors ligne.
+
+Points d'accès simulés (sous-ensemble utilisé par le bot) :
+- POST /v1/chat/completions                          (Mistral, avec ou sans "stream")
+- POST /v1beta/models/{modele}:generateContent       (Gemini)
+- POST /v1beta/models/{modele}:streamGenerateContent (Gemini, SSE avec alt=sse)
+- GET  /statistiques                                  (compteurs du serveur)
+
+Modes :
+- simulation    : réponses synthétiques (JSON plausible en mode JSON, texte sinon)
+- enregistrement: relaie les requêtes vers les vraies API et enregistre les réponses dans le dossier de fixtures
+- rejeu         : renvoie les réponses enregistrées (réponse synthétique si la requête n'a pas été enregistrée)
+
+Utilisation :
+    python serveur_llm_local.py --mode simulation --latence lognormale:0.7,0.5 --taux-erreur 0.05
+    MISTRAL_API_BASE=http://127.0.0.1:8089 GEMINI_API_BASE=http://127.0.0.1:8089 python ../bot.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+import aiohttp
+from aiohttp import web
+from utils.cache import empreinte
+from utils.texte import estimer_tokens
+
+# Vraies API, utilisées en mode enregistrement
+MISTRAL_API_REELLE = "https://api.mistral.ai"
+GEMINI_API_REELLE = "https://generativelanguage.googleapis.com"
+
+MODES = ("simulation", "enregistrement", "rejeu")
+
+# Numéros des offres d'un prompt de criblage (« [3] Titre – Entreprise ... »)
+MOTIF_OFFRE_NUMEROTEE = re.compile(r"^\[(\d+)\] ", re.MULTILINE)
+
+MOTS_SYNTHETIQUES = (
+    "profil", "expérience", "compétences", "entreprise", "mission", "analyse", "données", "projet",
+    "équipe", "candidat", "poste", "formation", "motivation", "développement", "outils", "résultats"
+)
+
+
+class DistributionLatence:
+    """
+    Latence simulée d'une réponse, décrite par « loi:paramètres » :
+    fixe:0.5, uniforme:0.2,1.5, normale:1,0.3 ou lognormale:mu,sigma (secondes)
+    """
+
+    def __init__(self, description: str):
+        loi, _, parametres = description.partition(":")
+        self.loi = loi
+        self.parametres = [float(p) for p in parametres.split(",") if p]
+        tirages = {
+            "fixe": lambda p: p[0],
+            "uniforme": lambda p: random.uniform(p[0], p[1]),
+            "normale": lambda p: random.gauss(p[0], p[1]),
+            "lognormale": lambda p: random.lognormvariate(p[0], p[1]),
+        }
+        if loi not in tirages:
+            raise ValueError(f"Loi de latence inconnue : {loi} (fixe, uniforme, normale, lognormale)")
+        self._tirer = tirages[loi]
+
+    def tirer(self) -> float:
+        return max(0.0, self._tirer(self.parametres))
+
+
+class ServeurLLMLocal:
+    """Application aiohttp simulant, enregistrant ou rejouant les réponses des fournisseurs LLM"""
+
+    def __init__(self, mode="simulation", dossier_fixtures="fixtures_llm", latence="fixe:0",
+                 taux_erreur=0.0, statuts_erreur=(429, 503), delai_fragment=0.05, mots_reponse=120, graine=None):
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu : {mode} ({', '.join(MODES)})")
+        self.mode = mode
+        self.dossier_fixtures = dossier_fixtures
+        self.latence = DistributionLatence(latence)
+        self.taux_erreur = taux_erreur
+        self.statuts_erreur = list(statuts_erreur)
+        self.delai_fragment = delai_fragment
+        self.mots_reponse = mots_reponse
+        self.aleatoire = random.Random(graine)
+        self.statistiques = Counter()
+        self._session = None
+
+        if mode != "simulation":
+            os.makedirs(dossier_fixtures, exist_ok=True)
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.mistral)
+        app.router.add_post("/v1beta/models/{appel}", self.gemini)
+        app.router.add_get("/statistiques", self.afficher_statistiques)
+        app.on_cleanup.append(self._fermer)
+        return app
+
+    async def _fermer(self, _app):
+        if self._session:
+            await self._session.close()
+
+    # ---------- Fixtures ----------
+
+    def _chemin_fixture(self, fournisseur, modele, corps, flux):
+        # La clé API ne fait pas partie de l'empreinte : les fixtures sont partageables
+        return os.path.join(self.dossier_fixtures, f"{fournisseur}-{empreinte(fournisseur, modele, flux, corps)[:24]}.json")
+
+    def _lire_fixture(self, chemin):
+        if not os.path.exists(chemin):
+            return None
+        with open(chemin, encoding="utf-8") as fichier:
+            return json.load(fichier)
+
+    def _ecrire_fixture(self, chemin, fixture):
+        with open(chemin, "w", encoding="utf-8") as fichier:
+            json.dump(fixture, fichier, ensure_ascii=False, indent=2)
+
+    # ---------- Simulation ----------
+
+    def _erreur_injectee(self):
+        """Réponse d'erreur tirée au hasard selon le taux configuré (None sinon)"""
+        if not self.statuts_erreur or self.aleatoire.random() >= self.taux_erreur:
+            return None
+        statut = self.aleatoire.choice(self.statuts_erreur)
+        self.statistiques[f"erreur {statut}"] += 1
+        en_tetes = {"Retry-After": "1"} if statut == 429 else {}
+        return web.json_response({"error": {"code": statut, "message": "Erreur injectée par le serveur local"}},
+                                 status=statut, headers=en_tetes)
+
+    def _texte_synthetique(self, prompt, format_json):
+        """Réponse plausible : tableau de scores pour un criblage, CV structuré en mode JSON, texte sinon"""
+        graine = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        aleatoire = random.Random(graine)  # Même prompt, même réponse
+
+        if format_json:
+            numeros = MOTIF_OFFRE_NUMEROTEE.findall(prompt)
+            if numeros:
+                return json.dumps([
+                    {"numero": int(numero), "score": aleatoire.randint(0, 100), "raison": "Réponse simulée."}
+                    for numero in numeros
+                ], ensure_ascii=False)
+            return json.dumps({
+                "prenom_nom": "Candidat Simulé",
+                "email": "candidat.simule@example.com",
+                "telephone": "06 00 00 00 00",
+                "linkedin": "",
+                "github": "",
+                "formation": [{"titre": "Master", "etablissement": "Université", "periode": "2023-2025", "details": []}],
+                "experience": [{"titre": "Stagiaire", "entreprise": "Entreprise", "lieu": "Strasbourg",
+                                "periode": "2024", "details": ["Mission simulée"]}],
+                "competences_techniques": ["Python", "SQL", "Excel"],
+                "soft_skills": ["Autonomie"],
+                "langues": ["Français (natif)", "Anglais (B2)"],
+                "certifications": []
+            }, ensure_ascii=False)
+
+        mots = [aleatoire.choice(MOTS_SYNTHETIQUES) for _ in range(self.mots_reponse)]
+        return " ".join(mots).capitalize() + "."
+
+    def _fragments(self, texte):
+        """Découpe une réponse en fragments de quelques mots pour le streaming"""
+        mots = texte.split(" ")
+        return [" ".join(mots[i:i + 8]) + (" " if i + 8 < len(mots) else "") for i in range(0, len(mots), 8)]
+
+    # ---------- Mistral ----------
+
+    async def mistral(self, request: web.Request):
+        corps = await request.json()
+        modele = corps.get("model", "")
+        flux = bool(corps.get("stream"))
+        self.statistiques["mistral"] += 1
+
+        if self.mode == "enregistrement":
+            return await self._relayer(request, "mistral", modele, corps, flux,
+                                       f"{MISTRAL_API_REELLE}/v1/chat/completions", {})
+        if self.mode == "rejeu":
+            fixture = self._lire_fixture(self._chemin_fixture("mistral", modele, corps, flux))
+            if fixture:
+                return await self._rejouer(request, fixture)
+            self.statistiques["fixture absente"] += 1
+
+        await asyncio.sleep(self.latence.tirer())
+        erreur = self._erreur_injectee()
+        if erreur:
+            return erreur
+
+        prompt = "\n".join(str(message.get("content", "")) for message in corps.get("messages", []))
+        format_json = (corps.get("response_format") or {}).get("type") == "json_object"
+        texte = self._texte_synthetique(prompt, format_json)
+        usage = {"prompt_tokens": estimer_tokens(prompt), "completion_tokens": estimer_tokens(texte)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not flux:
+            return web.json_response({
+                "id": "local", "object": "chat.completion", "model": modele, "usage": usage,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": texte}}]
+            })
+
+        evenements = [
+            {"id": "local", "model": modele, "choices": [{"index": 0, "delta": {"content": fragment}}]}
+            for fragment in self._fragments(texte)
+        ]
+        evenements[-1]["choices"][0]["finish_reason"] = "stop"
+        evenements[-1]["usage"] = usage
+        return await self._envoyer_sse(request, [json.dumps(e, ensure_ascii=False) for e in evenements] + ["[DONE]"])
+
+    # ---------- Gemini ----------
+
+    async def gemini(self, request: web.Request):
+        modele, _, action = request.match_info["appel"].partition(":")
+        if action not in ("generateContent", "streamGenerateContent"):
+            return web.json_response({"error": {"code": 404, "message": f"Action inconnue : {action}"}}, status=404)
+        corps = await request.json()
+        flux = action == "streamGenerateContent"
+        self.statistiques["gemini"] += 1
+
+        if self.mode == "enregistrement":
+            params = {k: v for k, v in request.query.items()}
+            return await self._relayer(request, "gemini", modele, corps, flux,
+                                       f"{GEMINI_API_REELLE}/v1beta/models/{modele}:{action}", params)
+        if self.mode == "rejeu":
+            fixture = self._lire_fixture(self._chemin_fixture("gemini", modele, corps, flux))
+            if fixture:
+                return await self._rejouer(request, fixture)
+            self.statistiques["fixture absente"] += 1
+
+        await asyncio.sleep(self.latence.tirer())
+        erreur = self._erreur_injectee()
+        if erreur:
+            return erreur
+
+        prompt = "\n".join(
+            str(partie.get("text", "")) for contenu in corps.get("contents", []) for partie in contenu.get("parts", [])
+        )
+        format_json = (corps.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        texte = self._texte_synthetique(prompt, format_json)
+        usage = {"promptTokenCount": estimer_tokens(prompt), "candidatesTokenCount": estimer_tokens(texte)}
+        usage["totalTokenCount"] = usage["promptTokenCount"] + usage["candidatesTokenCount"]
+
+        if not flux:
+            return web.json_response({
+                "candidates": [{"content": {"role": "model", "parts": [{"text": texte}]}, "finishReason": "STOP"}],
+                "usageMetadata": usage, "modelVersion": modele
+            })
+
+        evenements = [
+            {"candidates": [{"content": {"role": "model", "parts": [{"text": fragment}]}}]}
+            for fragment in self._fragments(texte)
+        ]
+        evenements[-1]["candidates"][0]["finishReason"] = "STOP"
+        evenements[-1]["usageMetadata"] = usage
+        return await self._envoyer_sse(request, [json.dumps(e, ensure_ascii=False) for e in evenements])
+
+    # ---------- Envoi, relais et rejeu ----------
+
+    async def _envoyer_sse(self, request, donnees, delais=None):
+        """Envoie des événements SSE, espacés de `delai_fragment` secondes (ou des délais enregistrés)"""
+        reponse = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await reponse.prepare(request)
+        for i, donnee in enumerate(donnees):
+            if i:
+                await asyncio.sleep(delais[i] if delais else self.delai_fragment)
+            await reponse.write(f"data: {donnee}\n\n".encode("utf-8"))
+        await reponse.write_eof()
+        return reponse
+
+    async def _relayer(self, request, fournisseur, modele, corps, flux, url, params):
+        """
+        Transmet la requête à la vraie API et enregistre la réponse (statut, corps ou événements SSE
+        avec leurs délais). Un flux est renvoyé au client une fois complet.
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+        en_tetes = {"Authorization": request.headers["Authorization"]} if "Authorization" in request.headers else {}
+        chemin = self._chemin_fixture(fournisseur, modele, corps, flux)
+
+        debut = time.monotonic()
+        async with self._session.post(url, params=params, headers=en_tetes, json=corps) as reponse:
+            statut = reponse.status
+            if statut != 200 or not flux:
+                texte = await reponse.text()
+                latence = time.monotonic() - debut
+                self._ecrire_fixture(chemin, {"statut": statut, "latence": latence, "corps": texte})
+                self.statistiques["enregistrées"] += 1
+                return web.Response(status=statut, text=texte, content_type="application/json")
+
+            donnees, delais, precedent = [], [], debut
+            async for ligne in reponse.content:
+                ligne = ligne.decode("utf-8").strip()
+                if ligne.startswith("data:"):
+                    donnees.append(ligne[len("data:"):].strip())
+                    delais.append(time.monotonic() - precedent)
+                    precedent = time.monotonic()
+
+        self._ecrire_fixture(chemin, {"statut": 200, "latence": delais[0] if delais else 0.0,
+                                      "evenements": donnees, "delais": delais})
+        self.statistiques["enregistrées"] += 1
+        return await self._envoyer_sse(request, donnees, [0.0] * len(donnees))
+
+    async def _rejouer(self, request, fixture):
+        """Renvoie une réponse enregistrée en reproduisant sa latence d'origine"""
+        self.statistiques["rejouées"] += 1
+        await asyncio.sleep(fixture.get("latence", 0.0))
+        if "evenements" in fixture:
+            delais = fixture.get("delais") or []
+            return await self._envoyer_sse(request, fixture["evenements"], [0.0] + delais[1:] if delais else None)
+        return web.Response(status=fixture["statut"], text=fixture["corps"], content_type="application/json")
+
+    async def afficher_statistiques(self, _request):
+        return web.json_response({"mode": self.mode, **self.statistiques})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur LLM local (Mistral / Gemini) pour les tests hors ligne")
+    parser.add_argument("--hote", default=os.getenv("LLM_LOCAL_HOTE", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("LLM_LOCAL_PORT", "8089")))
+    parser.add_argument("--mode", choices=MODES, default=os.getenv("LLM_LOCAL_MODE", "simulation"))
+    parser.add_argument("--fixtures", default=os.getenv("LLM_LOCAL_FIXTURES", "fixtures_llm"),
+                        help="Dossier des réponses enregistrées")
+    parser.add_argument("--latence", default=os.getenv("LLM_LOCAL_LATENCE", "lognormale:0,0.5"),
+                        help="Loi de latence : fixe:s, uniforme:min,max, normale:moy,ecart, lognormale:mu,sigma")
+    parser.add_argument("--taux-erreur", type=float, default=float(os.getenv("LLM_LOCAL_TAUX_ERREUR", "0")),
+                        help="Proportion de réponses en erreur (0 à 1)")
+    parser.add_argument("--statuts-erreur", default=os.getenv("LLM_LOCAL_STATUTS_ERREUR", "429,503"),
+                        help="Statuts HTTP des erreurs injectées, séparés par des virgules")
+    parser.add_argument("--delai-fragment", type=float, default=0.05, help="Secondes entre deux fragments en streaming")
+    parser.add_argument("--mots", type=int, default=120, help="Longueur des réponses texte simulées (mots)")
+    parser.add_argument("--graine", type=int, default=None, help="Graine de l'injection d'erreurs (reproductibilité)")
+    args = parser.parse_args()
+
+    serveur = ServeurLLMLocal(
+        mode=args.mode,
+        dossier_fixtures=args.fixtures,
+        latence=args.latence,
+        taux_erreur=args.taux_erreur,
+        statuts_erreur=[int(s) for s in args.statuts_erreur.split(",") if s.strip()],
+        delai_fragment=args.delai_fragment,
+        mots_reponse=args.mots,
+        graine=args.graine,
+    )
+    print(f"🧪 Serveur LLM local en mode {args.mode} sur http://{args.hote}:{args.port}")
+    print(f"   MISTRAL_API_BASE=http://{args.hote}:{args.port} GEMINI_API_BASE=http://{args.hote}:{args.port}")
+    web.run_app(serveur.application(), host=args.hote, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
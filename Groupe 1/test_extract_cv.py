@@ -0,0 +1,148 @@
+# test_extract_cv.py
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("aiohttp")
+import extract_cv
+from llm_client import LLMError
+from utils.cache import CacheSQLite
+from utils.helper import UserData
+from utils.rate_limiter import PRIORITE_ARRIERE_PLAN
+
+CV_COURT = "Jean Dupont\njean.dupont@mail.fr\nCompétences : Python, Docker"
+
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    """Cache vide et appels LLM remplacés : enregistre les appels, répond un CV JSON"""
+    appels = []
+
+    async def appeler_gemini_en_course(prompt, modeles, valider=None, **options):
+        appels.append(("course", tuple(modeles)))
+        return valider('{"prenom_nom": "Jean Dupont"}'), modeles[-1], 0.1
+
+    async def appeler_llm(prompt, fournisseur, model=None, **options):
+        appels.append(("appel", fournisseur))
+        return '{"prenom_nom": "Jean Dupont"}', fournisseur, model
+
+    monkeypatch.setattr(extract_cv, "cache_extractions_cv", CacheSQLite("test", str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(extract_cv, "appeler_gemini_en_course", appeler_gemini_en_course)
+    monkeypatch.setattr(extract_cv, "appeler_llm", appeler_llm)
+    monkeypatch.setattr(extract_cv, "MODELES_COURSE_GEMINI", ["gemini-1.5-pro", "gemini-1.5-flash"])
+    return appels
+
+
+def test_extraction_gemini_interactive_en_course(llm):
+    cv_data, utilise, format_ok = asyncio.run(extract_cv.extraire_cv_structure(CV_COURT, "gemini", "cle"))
+    assert llm == [("course", ("gemini-1.5-pro", "gemini-1.5-flash"))]
+    assert (utilise, format_ok) == ("gemini", True)
+    assert cv_data["prenom_nom"] == "Jean Dupont"
+    assert cv_data["email"] == "jean.dupont@mail.fr"
+
+
+def test_extraction_d_arriere_plan_sans_course(llm):
+    asyncio.run(extract_cv.extraire_cv_structure(CV_COURT, "gemini", "cle", PRIORITE_ARRIERE_PLAN))
+    assert llm == [("appel", "gemini")]
+
+
+def test_extraction_mistral_sans_course(llm):
+    asyncio.run(extract_cv.extraire_cv_structure(CV_COURT, "mistral", "cle"))
+    assert llm == [("appel", "mistral")]
+
+
+def test_echec_de_la_course_appel_classique(llm, monkeypatch):
+    async def course_perdue(prompt, modeles, valider=None, **options):
+        llm.append(("course", tuple(modeles)))
+        return None, None, 1.0
+
+    monkeypatch.setattr(extract_cv, "appeler_gemini_en_course", course_perdue)
+    cv_data, utilise, format_ok = asyncio.run(extract_cv.extraire_cv_structure(CV_COURT, "gemini", "cle"))
+    assert [appel[0] for appel in llm] == ["course", "appel"]
+    assert format_ok
+
+
+def utilisateur_avec_speculation(fournisseur, tache):
+    user_data = UserData("test")
+    user_data.cv_raw = CV_COURT
+    user_data.extraction_speculative = {"cv_raw": CV_COURT, "fournisseur": fournisseur, "tache": tache}
+    return user_data
+
+
+def test_extraction_speculative_adoptee(llm):
+    async def scenario():
+        tache = asyncio.create_task(extract_cv.extraire_cv_structure(CV_COURT, "mistral", "cle", PRIORITE_ARRIERE_PLAN))
+        user_data = utilisateur_avec_speculation("mistral", tache)
+        cv_data, utilise, format_ok = await extract_cv.obtenir_extraction(user_data, "mistral", "cle")
+        assert (cv_data["prenom_nom"], utilise, format_ok) == ("Jean Dupont", "mistral", True)
+        assert user_data.extraction_speculative is None
+
+    asyncio.run(scenario())
+    assert llm == [("appel", "mistral")]
+
+
+def test_extraction_speculative_autre_fournisseur_annulee(llm):
+    async def scenario():
+        tache = asyncio.create_task(asyncio.sleep(10))
+        await asyncio.sleep(0)
+        user_data = utilisateur_avec_speculation("mistral", tache)
+        await extract_cv.obtenir_extraction(user_data, "gemini", "cle")
+        await asyncio.sleep(0)
+        assert tache.cancelled()
+
+    asyncio.run(scenario())
+    assert [appel[0] for appel in llm] == ["course"]
+
+
+def test_extraction_speculative_annulee_relancee(llm):
+    async def scenario():
+        tache = asyncio.create_task(asyncio.sleep(10))
+        await asyncio.sleep(0)
+        tache.cancel()
+        await asyncio.wait([tache])
+        user_data = utilisateur_avec_speculation("mistral", tache)
+        cv_data, _, _ = await extract_cv.obtenir_extraction(user_data, "mistral", "cle")
+        assert cv_data["prenom_nom"] == "Jean Dupont"
+
+    asyncio.run(scenario())
+    assert llm == [("appel", "mistral")]
+
+
+def test_extraction_speculative_en_echec_relancee(llm):
+    async def echec():
+        raise LLMError("mistral", 503, "indisponible")
+
+    async def scenario():
+        tache = asyncio.create_task(echec())
+        user_data = utilisateur_avec_speculation("mistral", tache)
+        cv_data, _, _ = await extract_cv.obtenir_extraction(user_data, "mistral", "cle")
+        assert cv_data["prenom_nom"] == "Jean Dupont"
+
+    asyncio.run(scenario())
+    assert llm == [("appel", "mistral")]
+
+
+def test_titre_de_section_non_reconnu(llm, monkeypatch):
+    # « Technical Skills » n'est pas un titre reconnu : son texte est rattaché à l'expérience
+    cv = ("Jean Dupont\njean.dupont@mail.fr\nFormation\nMaster MIAGE\nExpériences\nStage data chez ACME\n"
+          "Technical Skills\nZorglub, Quarkus")
+    prompts = []
+
+    async def appeler_llm(prompt, fournisseur, model=None, **options):
+        prompts.append(prompt)
+        reponse = {}
+        if "- competences_techniques:" in prompt and "Zorglub" in prompt:
+            reponse["competences_techniques"] = ["Zorglub", "Quarkus"]
+        if "- experience:" in prompt:
+            reponse["experience"] = [{"titre": "Stage data", "entreprise": "ACME"}]
+        return json.dumps(reponse), fournisseur, model
+
+    monkeypatch.setattr(extract_cv, "appeler_llm", appeler_llm)
+    monkeypatch.setattr(extract_cv, "SEUIL_EXTRACTION_SECTIONS", 1)
+    cv_data, _, format_ok = asyncio.run(extract_cv.extraire_cv_structure(cv, "mistral", "cle"))
+    assert format_ok
+    assert cv_data["competences_techniques"] == ["Zorglub", "Quarkus"]
+    assert cv_data["experience"][0]["entreprise"] == "ACME"
+    # Contact, formation, expérience, et un appel sur le CV complet pour les champs sans section
+    assert len(prompts) == 4
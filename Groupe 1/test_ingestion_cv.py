@@ -0,0 +1,99 @@
+# test_ingestion_cv.py
+import asyncio
+import json
+import os
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("aiohttp")
+import ingestion_cv
+from ingestion_cv import Ingestion, charger_reprise
+from utils.documents import DocumentCV
+
+
+@pytest.fixture
+def dossier(tmp_path):
+    cvs = tmp_path / "cvs"
+    (cvs / "promo").mkdir(parents=True)
+    (cvs / "dupont.txt").write_text("Jean Dupont", encoding="utf-8")
+    (cvs / "promo" / "martin.txt").write_text("Alice Martin", encoding="utf-8")
+    (cvs / "illisible.txt").write_text("ILLISIBLE", encoding="utf-8")
+    (cvs / "notes.md").write_text("Pas un CV", encoding="utf-8")
+    return cvs
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Lecture et structuration remplacées : retourne les textes envoyés à l'extraction"""
+    textes = []
+
+    async def charger_document(nom_fichier, contenu):
+        return DocumentCV(nom_fichier, "empreinte", contenu.decode("utf-8"), None)
+
+    async def extraire_cv_structure(texte, fournisseur, api_key, priorite):
+        textes.append(texte)
+        if texte == "ILLISIBLE":
+            return {"prenom_nom": ""}, fournisseur, False
+        return {"prenom_nom": texte}, fournisseur, True
+
+    async def fermer_sessions():
+        pass
+
+    monkeypatch.setattr(ingestion_cv, "charger_document", charger_document)
+    monkeypatch.setattr(ingestion_cv, "extraire_cv_structure", extraire_cv_structure)
+    monkeypatch.setattr(ingestion_cv, "fermer_sessions", fermer_sessions)
+    monkeypatch.setattr(ingestion_cv, "fermer_pool_documents", lambda attendre=False: None)
+    return textes
+
+
+def lire_jsonl(chemin):
+    with open(chemin, encoding="utf-8") as f:
+        return [json.loads(ligne) for ligne in f]
+
+
+def test_ligne_tronquee_ignoree_a_la_reprise(tmp_path):
+    sortie = tmp_path / "sortie.jsonl"
+    sortie.write_text('{"fichier": "a.txt", "empreinte": "e1", "cv": {}}\n{"fichier": "b.txt", "empr', encoding="utf-8")
+    assert charger_reprise(str(sortie)) == {("a.txt", "e1")}
+    assert charger_reprise(str(tmp_path / "absente.jsonl")) == set()
+
+
+def test_ingestion_puis_reprise(dossier, extractions, tmp_path):
+    sortie = tmp_path / "sortie.jsonl"
+    erreurs = tmp_path / "sortie.erreurs.jsonl"
+
+    asyncio.run(Ingestion(str(dossier), str(sortie), "mistral", 2).executer())
+    reussis = lire_jsonl(sortie)
+    assert sorted(entree["fichier"] for entree in reussis) == ["dupont.txt", os.path.join("promo", "martin.txt")]
+    assert {entree["cv"]["prenom_nom"] for entree in reussis} == {"Jean Dupont", "Alice Martin"}
+    # Réponse au JSON inexploitable : consignée, pas écrite dans la sortie
+    echecs = lire_jsonl(erreurs)
+    assert [(echec["fichier"], echec["erreur"]) for echec in echecs] == [
+        ("illisible.txt", "réponse mistral au format JSON inexploitable")
+    ]
+
+    # Relance : seuls les fichiers absents de la sortie sont retraités
+    extractions.clear()
+    (dossier / "dupont.txt").write_text("Jean Dupont (mis à jour)", encoding="utf-8")
+    ingestion = Ingestion(str(dossier), str(sortie), "mistral", 2)
+    asyncio.run(ingestion.executer())
+    assert sorted(extractions) == ["ILLISIBLE", "Jean Dupont (mis à jour)"]
+    assert ingestion.compteurs["repris"] == 1
+    assert len(lire_jsonl(sortie)) == 3
+    assert len(lire_jsonl(erreurs)) == 2
+
+
+def test_exception_consignee_et_lot_poursuivi(dossier, extractions, monkeypatch, tmp_path):
+    async def charger_document(nom_fichier, contenu):
+        if nom_fichier == "dupont.txt":
+            raise ingestion_cv.ErreurDocument("Impossible de lire le fichier dupont.txt")
+        return DocumentCV(nom_fichier, "empreinte", contenu.decode("utf-8"), None)
+
+    monkeypatch.setattr(ingestion_cv, "charger_document", charger_document)
+    sortie = tmp_path / "sortie.jsonl"
+    ingestion = Ingestion(str(dossier), str(sortie), "mistral", 2)
+    asyncio.run(ingestion.executer())
+    assert ingestion.compteurs["reussis"] == 1
+    assert ingestion.compteurs["erreurs"] == 2
+    erreurs = {echec["fichier"]: echec["erreur"] for echec in lire_jsonl(tmp_path / "sortie.erreurs.jsonl")}
+    assert erreurs["dupont.txt"] == "Impossible de lire le fichier dupont.txt"
@@ -0,0 +1,143 @@
+# test_llm_client.py
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("dotenv")
+import llm_client
+from llm_client import _coalescer, requetes_en_cours
+
+
+def test_requetes_identiques_regroupees():
+    async def scenario():
+        appels = []
+
+        async def requete():
+            appels.append(1)
+            await asyncio.sleep(0.05)
+            return "réponse"
+
+        resultats = await asyncio.gather(*(_coalescer("cle", requete) for _ in range(3)))
+        assert resultats == ["réponse"] * 3
+        assert len(appels) == 1
+        assert requetes_en_cours() == 0
+
+    asyncio.run(scenario())
+
+
+def test_requetes_differentes_separees():
+    async def scenario():
+        appels = []
+
+        async def requete():
+            appels.append(1)
+            await asyncio.sleep(0.01)
+            return len(appels)
+
+        await asyncio.gather(_coalescer("a", requete), _coalescer("b", requete))
+        assert len(appels) == 2
+
+    asyncio.run(scenario())
+
+
+def test_erreur_transmise_a_tous_les_appelants():
+    async def scenario():
+        async def requete():
+            await asyncio.sleep(0.01)
+            raise llm_client.LLMError("mistral", 503, "indisponible")
+
+        resultats = await asyncio.gather(*(_coalescer("cle", requete) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(r, llm_client.LLMError) for r in resultats)
+        assert requetes_en_cours() == 0
+
+    asyncio.run(scenario())
+
+
+def test_annulation_d_un_appelant_n_annule_pas_les_autres():
+    async def scenario():
+        async def requete():
+            await asyncio.sleep(0.05)
+            return "réponse"
+
+        premier = asyncio.create_task(_coalescer("cle", requete))
+        second = asyncio.create_task(_coalescer("cle", requete))
+        await asyncio.sleep(0.01)
+        premier.cancel()
+        assert await second == "réponse"
+        assert premier.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_requete_annulee_quand_tous_les_appelants_abandonnent():
+    async def scenario():
+        annulee = asyncio.Event()
+
+        async def requete():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                annulee.set()
+                raise
+
+        appelants = [asyncio.create_task(_coalescer("cle", requete)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for appelant in appelants:
+            appelant.cancel()
+        await asyncio.wait_for(annulee.wait(), 1)
+        await asyncio.sleep(0)
+        assert requetes_en_cours() == 0
+
+    asyncio.run(scenario())
+
+
+def reponses_gemini(monkeypatch, comportements):
+    """Remplace l'envoi HTTP à Gemini : modèle -> (délai, texte ou statut d'erreur) ; retourne les appels"""
+    appels = []
+
+    async def requete_gemini(prompt, model, api_key, generation_config):
+        appels.append(model)
+        delai, reponse = comportements[model]
+        await asyncio.sleep(delai)
+        if isinstance(reponse, int):
+            raise llm_client.LLMError("Gemini", reponse, "erreur simulée")
+        return reponse, {}
+
+    monkeypatch.setattr(llm_client, "_requete_gemini", requete_gemini)
+    return appels
+
+
+def test_course_echec_passe_au_suivant_sans_reessai(monkeypatch):
+    appels = reponses_gemini(monkeypatch, {"course-a1": (0, 503), "course-a2": (0, '{"ok": 1}')})
+    resultat, modele, duree = asyncio.run(llm_client.appeler_gemini_en_course(
+        "prompt", ["course-a1", "course-a2"], delai_hedge=30, api_key="cle-test"
+    ))
+    assert (resultat, modele) == ('{"ok": 1}', "course-a2")
+    # Le 503 n'est pas réessayé : le second modèle part aussitôt
+    assert appels == ["course-a1", "course-a2"]
+    assert duree < 1
+
+
+def test_course_modele_lent_depasse(monkeypatch):
+    appels = reponses_gemini(monkeypatch, {"course-b1": (5, "lent"), "course-b2": (0, "rapide")})
+    resultat, modele, _ = asyncio.run(llm_client.appeler_gemini_en_course(
+        "prompt", ["course-b1", "course-b2"], delai_hedge=0.05, api_key="cle-test"
+    ))
+    assert (resultat, modele) == ("rapide", "course-b2")
+    assert appels == ["course-b1", "course-b2"]
+
+
+def test_course_reponse_invalide_rejetee(monkeypatch):
+    reponses_gemini(monkeypatch, {"course-c1": (0, "pas du JSON"), "course-c2": (0, '{"nom": "Dupont"}')})
+    resultat, modele, _ = asyncio.run(llm_client.appeler_gemini_en_course(
+        "prompt", ["course-c1", "course-c2"], valider=json.loads, delai_hedge=30, api_key="cle-test"
+    ))
+    assert (resultat, modele) == ({"nom": "Dupont"}, "course-c2")
+
+
+def test_course_tous_les_modeles_echouent(monkeypatch):
+    reponses_gemini(monkeypatch, {"course-d1": (0, 500), "course-d2": (0, 400)})
+    assert asyncio.run(llm_client.appeler_gemini_en_course(
+        "prompt", ["course-d1", "course-d2"], delai_hedge=30, api_key="cle-test"
+    ))[:2] == (None, None)
@@ -0,0 +1,75 @@
+# test_parse_cv_commands.py
+import asyncio
+import types
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("aiohttp")
+import parse_cv_commands
+from utils.cache import CacheSQLite
+from utils.documents import DocumentCV
+
+
+class BotFactice:
+    """Enregistre les commandes déclarées par setup_parse_cv_commands"""
+
+    def __init__(self):
+        self.commandes = {}
+        self.tree = self
+
+    def command(self, name, **options):
+        def enregistrer(fonction):
+            self.commandes[name] = fonction
+            return fonction
+        return enregistrer
+
+
+class InteractionFactice:
+    def __init__(self):
+        self.envois = []
+        self.user = types.SimpleNamespace(id=123)
+        self.response = types.SimpleNamespace(defer=self._rien)
+        self.followup = types.SimpleNamespace(send=self._envoyer)
+
+    async def _rien(self, **options):
+        pass
+
+    async def _envoyer(self, content=None, **options):
+        self.envois.append(content)
+
+
+@pytest.fixture
+def commandes(tmp_path, monkeypatch):
+    async def charger_document(nom, contenu):
+        return DocumentCV(nom, "empreinte", "Jean Dupont\nPython", 1)
+
+    monkeypatch.setattr(parse_cv_commands, "cache_extractions_cv", CacheSQLite("test", str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(parse_cv_commands, "charger_document", charger_document)
+    monkeypatch.setenv("GEMINI_API_KEY", "cle")
+    monkeypatch.setenv("MISTRAL_API_KEY", "cle")
+    bot = BotFactice()
+    parse_cv_commands.setup_parse_cv_commands(bot)
+    return bot.commandes
+
+
+@pytest.mark.parametrize("commande, demande, repondu, avis", [
+    ("parse_cv_gemini", "gemini", "mistral", "Gemini indisponible, analyse réalisée par Mistral"),
+    ("parse_cv_mistral", "mistral", "gemini", "Mistral indisponible, analyse réalisée par Gemini"),
+])
+def test_bascule_de_fournisseur_annoncee(commandes, monkeypatch, commande, demande, repondu, avis):
+    async def appeler_llm(prompt, fournisseur, model=None, **options):
+        assert fournisseur == demande
+        return '{"prenom_nom": "Jean Dupont"}', repondu, "modele"
+
+    monkeypatch.setattr(parse_cv_commands, "appeler_llm", appeler_llm)
+    interaction = InteractionFactice()
+    fichier = types.SimpleNamespace(filename="cv.pdf", read=lambda: asyncio.sleep(0, b"%PDF"))
+    asyncio.run(commandes[commande](interaction, fichier))
+    assert avis in interaction.envois[-1]
+    assert "Voici le fichier JSON généré" in interaction.envois[-1]
+
+
+def test_message_resultat_signale_la_troncature():
+    document = DocumentCV("cv.pdf", "empreinte", "texte", 40, troncature="Seules les 30 premières pages ont été lues.")
+    assert parse_cv_commands.message_resultat(document, "✅ Terminé") == "✅ Terminé\n✂️ Seules les 30 premières pages ont été lues."
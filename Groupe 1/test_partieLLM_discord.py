@@ -0,0 +1,262 @@
+# test_partieLLM_discord.py
+import asyncio
+import types
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("docx")
+import partieLLM_discord
+from partieLLM_discord import SEUIL_PERTINENCE, lire_scores_criblage
+from utils import helper
+from utils.cache import CacheSQLite, cle_reponse_llm
+from utils.helper import UserData
+from utils.rate_limiter import PRIORITE_ARRIERE_PLAN, PRIORITE_INTERACTIVE
+
+CV = {"prenom_nom": "Jean Dupont", "competences_techniques": ["Python", "SQL"]}
+OFFRE = {"titre": "Data analyst", "entreprise": "ACME", "description": "SQL et Python"}
+INFOS = {"motivation": "Passion pour la data", "lien_entreprise": "", "contraintes": ""}
+
+
+@pytest.fixture
+def appels_gemini(tmp_path, monkeypatch):
+    """Cache vide dans un fichier temporaire et Gemini remplacé par une réponse numérotée"""
+    appels = []
+
+    async def interroger_gemini(prompt, api_key, priorite=None):
+        appels.append(prompt)
+        return f"Lettre {len(appels)}"
+
+    monkeypatch.setattr(partieLLM_discord, "cache_reponses_llm", CacheSQLite("test", str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(partieLLM_discord, "interroger_gemini", interroger_gemini)
+    return appels
+
+
+def test_lettre_mise_en_cache(appels_gemini):
+    async def scenario():
+        premiere = await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle")
+        seconde = await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle")
+        assert premiere == seconde == "Lettre 1"
+        assert len(appels_gemini) == 1
+
+    asyncio.run(scenario())
+
+
+def test_regenerer_remplace_la_lettre_en_cache(appels_gemini):
+    async def scenario():
+        await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle")
+        assert await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle", regenerer=True) == "Lettre 2"
+        assert await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle") == "Lettre 2"
+        assert len(appels_gemini) == 2
+
+    asyncio.run(scenario())
+
+
+def test_autre_offre_autre_lettre(appels_gemini):
+    async def scenario():
+        await partieLLM_discord.generer_lettre(CV, OFFRE, INFOS, "cle")
+        await partieLLM_discord.generer_lettre(CV, dict(OFFRE, entreprise="Globex"), INFOS, "cle")
+        assert len(appels_gemini) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cle_reponse_llm():
+    cle = cle_reponse_llm("analyse", "v1", CV, OFFRE)
+    assert cle == cle_reponse_llm("analyse", "v1", dict(reversed(list(CV.items()))), OFFRE)
+    assert cle != cle_reponse_llm("lettre", "v1", CV, OFFRE)
+    assert cle != cle_reponse_llm("analyse", "v2", CV, OFFRE)
+
+
+def test_tableau_de_scores():
+    reponse = '[{"numero": 1, "score": 85, "raison": " Profil data "}, {"numero": 2, "score": "40"}]'
+    assert lire_scores_criblage(reponse, {1, 2}) == {
+        1: {"score": 85, "pertinent": True, "raison": "Profil data"},
+        2: {"score": 40, "pertinent": False, "raison": ""},
+    }
+
+
+def test_tableau_dans_un_objet():
+    # Le mode JSON de Mistral impose un objet
+    reponse = '{"scores": [{"numero": 3, "score": 150}]}'
+    assert lire_scores_criblage(reponse, {3}) == {3: {"score": 100, "pertinent": True, "raison": ""}}
+
+
+def test_numeros_non_demandes_ignores():
+    assert lire_scores_criblage('[{"numero": 9, "score": 90}]', {1}) == {}
+
+
+def test_element_sans_score_non_evalue():
+    # Réponse tronquée : l'offre 2 n'a pas de score et ne doit pas compter comme 0
+    reponse = '[{"numero": 1, "score": 75}, {"numero": 2, "score": 8'
+    assert lire_scores_criblage(reponse, {1, 2}) == {1: {"score": 75, "pertinent": 75 >= SEUIL_PERTINENCE, "raison": ""}}
+
+
+@pytest.mark.parametrize("reponse", ['42', '"aucune offre"', 'Je ne peux pas répondre.'])
+def test_reponse_sans_tableau(reponse):
+    with pytest.raises(ValueError):
+        lire_scores_criblage(reponse, {1})
+
+
+def test_criblage_offre_sans_terme_commun_evaluee_en_dernier(monkeypatch):
+    lots = []
+
+    async def cribler_lot(cv_dict, lot, api_key, regenerer, priorite):
+        lots.append(([numero for numero, _ in lot], priorite))
+        return {numero: {"score": 50, "pertinent": False, "raison": ""} for numero, _ in lot}, True
+
+    monkeypatch.setattr(partieLLM_discord, "_cribler_lot", cribler_lot)
+    offres = [{"titre": "Chargé d'études", "description": "Analyse statistique"},
+              {"titre": "Data analyst", "description": "Python et SQL"}]
+    scores, appels = asyncio.run(partieLLM_discord.cribler_offres(CV, offres, "cle", taille_lot=1))
+    assert lots == [([2], PRIORITE_INTERACTIVE), ([1], PRIORITE_ARRIERE_PLAN)]
+    assert all(score is not None for score in scores)
+    assert appels == 2
+
+
+def utilisateur_avec_offre(offre):
+    user_data = UserData("test")
+    user_data.cv_structured = CV
+    user_data.job_offer = offre
+    return user_data
+
+
+def test_analyse_speculative_conservee_dans_la_session(appels_gemini):
+    async def scenario():
+        user_data = utilisateur_avec_offre(OFFRE)
+        assert partieLLM_discord.lancer_analyse_speculative(user_data, "cle")
+        await user_data.analyse_speculative["tache"]
+        await asyncio.sleep(0)
+        assert user_data.analysis_results["reponse"] == "Lettre 1"
+
+    asyncio.run(scenario())
+
+
+def test_analyse_speculative_deja_en_cache(appels_gemini):
+    cache = partieLLM_discord.cache_reponses_llm
+    cache.set(cle_reponse_llm("analyse", partieLLM_discord.VERSION_PROMPT_PERTINENCE, CV, OFFRE), "Analyse")
+
+    async def scenario():
+        user_data = utilisateur_avec_offre(OFFRE)
+        assert partieLLM_discord.lancer_analyse_speculative(user_data, "cle")
+        assert await user_data.analyse_speculative["tache"] is None
+
+    asyncio.run(scenario())
+    assert appels_gemini == []
+    # La vérification ne fausse pas les compteurs du cache
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_analyse_speculative_annulee_au_changement_d_offre(appels_gemini, monkeypatch):
+    async def interroger_lentement(prompt, api_key, priorite=None):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(partieLLM_discord, "interroger_gemini", interroger_lentement)
+
+    async def scenario():
+        user_data = utilisateur_avec_offre(OFFRE)
+        partieLLM_discord.lancer_analyse_speculative(user_data, "cle")
+        premiere = user_data.analyse_speculative["tache"]
+        await asyncio.sleep(0.01)
+        user_data.job_offer = {**OFFRE, "titre": "Data engineer"}
+        partieLLM_discord.lancer_analyse_speculative(user_data, "cle")
+        await asyncio.wait([premiere])
+        assert premiere.cancelled()
+        assert user_data.analyse_speculative["tache"] is not premiere
+        partieLLM_discord.annuler_speculation(user_data.analyse_speculative["tache"])
+
+    asyncio.run(scenario())
+
+
+def utilisateur_avec_offres(nombre_offres, user_id="test"):
+    user_data = UserData(user_id)
+    user_data.job_offers = [{"titre": f"Offre {i}", "entreprise": "ACME"} for i in range(1, nombre_offres + 1)]
+    return user_data
+
+
+def test_offres_explicites_limitees_par_lettres_max_seulement(monkeypatch):
+    monkeypatch.setattr(partieLLM_discord, "LETTRES_MAX", 3)
+    choisies, ecartees = partieLLM_discord.choisir_offres_lettres(utilisateur_avec_offres(6), "1, 2;4,5,6,9", nombre=2)
+    assert [numero for numero, _ in choisies] == [1, 2, 4]
+    assert ecartees == 2
+
+
+def test_meilleures_offres_du_criblage():
+    user_data = utilisateur_avec_offres(4)
+    user_data.scores_offres = [{"score": 40}, None, {"score": 90}, {"score": 70}]
+    choisies, ecartees = partieLLM_discord.choisir_offres_lettres(user_data, nombre=2)
+    assert [numero for numero, _ in choisies] == [3, 4]
+    assert ecartees == 0
+
+
+def test_nombre_limite_par_lettres_max(monkeypatch):
+    monkeypatch.setattr(partieLLM_discord, "LETTRES_MAX", 2)
+    choisies, ecartees = partieLLM_discord.choisir_offres_lettres(utilisateur_avec_offres(5), nombre=4)
+    assert [numero for numero, _ in choisies] == [1, 2]
+    assert ecartees == 2
+
+
+class BotFactice:
+    """Enregistre les commandes déclarées par setup_gemini_commands"""
+
+    def __init__(self):
+        self.commandes = {}
+        self.tree = self
+
+    def command(self, name, **options):
+        def enregistrer(fonction):
+            self.commandes[name] = fonction
+            return fonction
+        return enregistrer
+
+
+class MessageSupprime:
+    async def edit(self, **options):
+        raise partieLLM_discord.discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+
+
+class InteractionFactice:
+    def __init__(self, user_id):
+        self.envois = []
+        self.user = types.SimpleNamespace(id=user_id)
+        self.response = types.SimpleNamespace(defer=self._rien)
+        self.followup = types.SimpleNamespace(send=self._envoyer)
+
+    async def _rien(self, **options):
+        pass
+
+    async def _envoyer(self, content=None, **options):
+        self.envois.append(content if content is not None else options)
+        return MessageSupprime()
+
+
+@pytest.fixture
+def generer_lettres(appels_gemini):
+    bot = BotFactice()
+    partieLLM_discord.setup_gemini_commands(bot, "cle")
+    user_data = utilisateur_avec_offres(3, "test_lettres")
+    user_data.cv_raw = "Jean Dupont"
+    user_data.cv_structured = CV
+    helper.user_data["test_lettres"] = user_data
+    yield bot.commandes["generer_lettres_g5"]
+    del helper.user_data["test_lettres"]
+
+
+def test_lettres_generees_malgre_un_message_de_suivi_supprime(generer_lettres):
+    interaction = InteractionFactice("test_lettres")
+    asyncio.run(generer_lettres(interaction, offres="1,3"))
+    archive = interaction.envois[-1]
+    assert archive["embed"].title == "📦 2 lettre(s) de motivation"
+
+
+def test_limite_de_lettres_annoncee(generer_lettres, monkeypatch):
+    monkeypatch.setattr(partieLLM_discord, "LETTRES_MAX", 2)
+    interaction = InteractionFactice("test_lettres")
+    asyncio.run(generer_lettres(interaction, offres="1,2,3"))
+    assert "1 offre(s) demandée(s) ignorée(s)" in interaction.envois[0]
+    assert interaction.envois[-1]["embed"].title == "📦 2 lettre(s) de motivation"
+
+
+def test_nombre_de_lettres_invalide(generer_lettres):
+    interaction = InteractionFactice("test_lettres")
+    asyncio.run(generer_lettres(interaction, nombre=0))
+    assert interaction.envois == ["❌ Le nombre de lettres doit être au moins 1."]
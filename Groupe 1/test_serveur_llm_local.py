@@ -0,0 +1,99 @@
+# test_serveur_llm_local.py
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+from serveur_llm_local import DistributionLatence, ServeurLLMLocal
+
+CORPS_MISTRAL = {"model": "mistral-small-latest", "messages": [{"role": "user", "content": "Bonjour"}]}
+
+
+def executer(serveur, scenario):
+    """Démarre l'application du serveur sur un port libre et exécute le scénario avec un client HTTP"""
+    async def lancer():
+        async with TestClient(TestServer(serveur.application())) as client:
+            return await scenario(client)
+
+    return asyncio.run(lancer())
+
+
+def test_distribution_latence():
+    assert DistributionLatence("fixe:0.5").tirer() == 0.5
+    assert 0.2 <= DistributionLatence("uniforme:0.2,0.3").tirer() <= 0.3
+    assert DistributionLatence("normale:-5,0").tirer() == 0.0
+    with pytest.raises(ValueError):
+        DistributionLatence("poisson:1")
+
+
+def test_simulation_criblage_json():
+    async def scenario(client):
+        corps = {**CORPS_MISTRAL, "response_format": {"type": "json_object"},
+                 "messages": [{"role": "user", "content": "[3] Data analyst – ACME\n[7] Développeur – Beta"}]}
+        reponse = await client.post("/v1/chat/completions", json=corps)
+        return reponse.status, await reponse.json()
+
+    statut, donnees = executer(ServeurLLMLocal(), scenario)
+    assert statut == 200
+    scores = json.loads(donnees["choices"][0]["message"]["content"])
+    assert [s["numero"] for s in scores] == [3, 7]
+    assert donnees["usage"]["total_tokens"] > 0
+
+
+def test_simulation_gemini_en_streaming():
+    async def scenario(client):
+        corps = {"contents": [{"parts": [{"text": "Rédige une lettre"}]}]}
+        reponse = await client.post("/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse", json=corps)
+        return await reponse.text()
+
+    texte = executer(ServeurLLMLocal(delai_fragment=0, mots_reponse=20), scenario)
+    evenements = [json.loads(ligne[len("data: "):]) for ligne in texte.splitlines() if ligne.startswith("data: ")]
+    assert len(evenements) == 3
+    assert evenements[-1]["candidates"][0]["finishReason"] == "STOP"
+
+
+def test_erreurs_injectees():
+    async def scenario(client):
+        reponse = await client.post("/v1/chat/completions", json=CORPS_MISTRAL)
+        return reponse.status, reponse.headers.get("Retry-After")
+
+    assert executer(ServeurLLMLocal(taux_erreur=1.0, statuts_erreur=[429]), scenario) == (429, "1")
+
+
+def test_rejeu_d_une_reponse_enregistree(tmp_path):
+    serveur = ServeurLLMLocal(mode="rejeu", dossier_fixtures=str(tmp_path))
+    enregistree = {"choices": [{"message": {"content": "Réponse enregistrée"}}]}
+    serveur._ecrire_fixture(
+        serveur._chemin_fixture("mistral", "mistral-small-latest", CORPS_MISTRAL, False),
+        {"statut": 200, "latence": 0.0, "corps": json.dumps(enregistree)},
+    )
+
+    async def scenario(client):
+        rejouee = await (await client.post("/v1/chat/completions", json=CORPS_MISTRAL)).json()
+        autre = {**CORPS_MISTRAL, "messages": [{"role": "user", "content": "Jamais enregistré"}]}
+        synthetique = await client.post("/v1/chat/completions", json=autre)
+        statistiques = await (await client.get("/statistiques")).json()
+        return rejouee, synthetique.status, statistiques
+
+    rejouee, statut, statistiques = executer(serveur, scenario)
+    assert rejouee == enregistree
+    # Requête absente des fixtures : réponse synthétique
+    assert statut == 200
+    assert statistiques == {"mode": "rejeu", "mistral": 2, "rejouées": 1, "fixture absente": 1}
+
+
+def test_rejeu_d_un_flux_enregistre(tmp_path):
+    serveur = ServeurLLMLocal(mode="rejeu", dossier_fixtures=str(tmp_path))
+    corps = {"contents": [{"parts": [{"text": "Bonjour"}]}]}
+    evenements = [json.dumps({"candidates": [{"content": {"parts": [{"text": mot}]}}]}) for mot in ("Bon", "jour")]
+    serveur._ecrire_fixture(
+        serveur._chemin_fixture("gemini", "gemini-1.5-pro", corps, True),
+        {"statut": 200, "latence": 0.0, "evenements": evenements, "delais": [0.0, 0.0]},
+    )
+
+    async def scenario(client):
+        reponse = await client.post("/v1beta/models/gemini-1.5-pro:streamGenerateContent?alt=sse", json=corps)
+        return await reponse.text()
+
+    assert [l[len("data: "):] for l in executer(serveur, scenario).splitlines() if l] == evenements
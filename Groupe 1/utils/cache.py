@@ -0,0 +1,182 @@
+# utils/cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+# Fichier SQLite partagé par tous les caches du bot, à côté des modules (Groupe 1/) quel que soit
+# le répertoire de lancement : bot.py à la racine et Groupe 1/bot.py partagent le même cache
+DOSSIER_CACHE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHEMIN_CACHE = os.getenv("CACHE_DB_PATH", os.path.join(DOSSIER_CACHE, "cache_llm.sqlite3"))
+
+
+def normaliser_texte(texte: str) -> str:
+    """Normalise un texte (Unicode NFC, espaces compactés) avant calcul d'empreinte"""
+    texte = unicodedata.normalize("NFC", texte or "")
+    return " ".join(texte.split())
+
+
+def empreinte(*elements: Any) -> str:
+    """
+    Calcule une empreinte SHA-256 stable d'un ensemble d'éléments sérialisables en JSON.
+    L'ordre des clés des dictionnaires n'a pas d'influence sur le résultat.
+    """
+    contenu = json.dumps(elements, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+
+class CacheSQLite:
+    """
+    Cache clé -> JSON persistant sur disque (SQLite).
+    - Éviction LRU au-delà de `max_entrees`
+    - Expiration optionnelle des entrées après `ttl` secondes
+    - Compteurs de succès (hits) et d'échecs (misses)
+    Depuis la boucle asyncio, utiliser get_async / set_async / statistiques_async :
+    les accès SQLite (et l'attente du verrou) se font alors dans un thread.
+    """
+
+    def __init__(self, nom_table: str, chemin: Optional[str] = None, max_entrees: int = 1000, ttl: Optional[float] = None):
+        self.nom_table = nom_table
+        self.chemin = chemin or CHEMIN_CACHE
+        self.max_entrees = max_entrees
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._connexion = None
+        self._verrou = threading.Lock()
+
+    def _get_connexion(self) -> sqlite3.Connection:
+        # Ouverture paresseuse pour ne pas créer de fichier à l'import du module
+        if self._connexion is None:
+            self._connexion = sqlite3.connect(self.chemin, check_same_thread=False)
+            self._connexion.execute(
+                f"""CREATE TABLE IF NOT EXISTS {self.nom_table} (
+                    cle TEXT PRIMARY KEY,
+                    valeur TEXT NOT NULL,
+                    cree_le REAL NOT NULL,
+                    dernier_acces REAL NOT NULL
+                )"""
+            )
+            self._connexion.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.nom_table}_acces ON {self.nom_table} (dernier_acces)"
+            )
+            self._connexion.commit()
+        return self._connexion
+
+    def get(self, cle: str) -> Optional[Any]:
+        """Retourne la valeur associée à la clé, ou None si absente ou expirée"""
+        maintenant = time.time()
+        with self._verrou:
+            connexion = self._get_connexion()
+            ligne = connexion.execute(
+                f"SELECT valeur, cree_le FROM {self.nom_table} WHERE cle = ?", (cle,)
+            ).fetchone()
+
+            if ligne is None:
+                self.misses += 1
+                return None
+
+            valeur, cree_le = ligne
+            if self.ttl is not None and maintenant - cree_le > self.ttl:
+                connexion.execute(f"DELETE FROM {self.nom_table} WHERE cle = ?", (cle,))
+                connexion.commit()
+                self.misses += 1
+                return None
+
+            connexion.execute(
+                f"UPDATE {self.nom_table} SET dernier_acces = ? WHERE cle = ?", (maintenant, cle)
+            )
+            connexion.commit()
+            self.hits += 1
+            return json.loads(valeur)
+
+    def contient(self, cle: str) -> bool:
+        """
+        Indique si une entrée valide existe, sans compter de succès ni d'échec
+        et sans la rafraîchir pour l'éviction LRU (vérifications des travaux spéculatifs)
+        """
+        with self._verrou:
+            ligne = self._get_connexion().execute(
+                f"SELECT cree_le FROM {self.nom_table} WHERE cle = ?", (cle,)
+            ).fetchone()
+        return ligne is not None and (self.ttl is None or time.time() - ligne[0] <= self.ttl)
+
+    def set(self, cle: str, valeur: Any) -> None:
+        """Enregistre une valeur puis applique la limite de taille"""
+        maintenant = time.time()
+        with self._verrou:
+            connexion = self._get_connexion()
+            connexion.execute(
+                f"INSERT OR REPLACE INTO {self.nom_table} (cle, valeur, cree_le, dernier_acces) VALUES (?, ?, ?, ?)",
+                (cle, json.dumps(valeur, ensure_ascii=False), maintenant, maintenant)
+            )
+            # Éviction des entrées les moins récemment utilisées
+            connexion.execute(
+                f"""DELETE FROM {self.nom_table} WHERE cle IN (
+                    SELECT cle FROM {self.nom_table} ORDER BY dernier_acces DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entrees,)
+            )
+            connexion.commit()
+
+    def supprimer(self, cle: str) -> None:
+        """Supprime une entrée du cache"""
+        with self._verrou:
+            connexion = self._get_connexion()
+            connexion.execute(f"DELETE FROM {self.nom_table} WHERE cle = ?", (cle,))
+            connexion.commit()
+
+    async def get_async(self, cle: str) -> Optional[Any]:
+        """get() exécuté hors de la boucle asyncio"""
+        return await asyncio.to_thread(self.get, cle)
+
+    async def contient_async(self, cle: str) -> bool:
+        """contient() exécuté hors de la boucle asyncio"""
+        return await asyncio.to_thread(self.contient, cle)
+
+    async def set_async(self, cle: str, valeur: Any) -> None:
+        """set() exécuté hors de la boucle asyncio"""
+        await asyncio.to_thread(self.set, cle, valeur)
+
+    async def statistiques_async(self) -> Dict[str, Any]:
+        """statistiques() exécuté hors de la boucle asyncio"""
+        return await asyncio.to_thread(self.statistiques)
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Retourne les compteurs du cache (succès, échecs, taux de succès, nombre d'entrées)"""
+        with self._verrou:
+            entrees = self._get_connexion().execute(f"SELECT COUNT(*) FROM {self.nom_table}").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_succes": self.hits / total if total else 0.0,
+            "entrees": entrees
+        }
+
+
+# Cache des extractions structurées de CV (JSON stocké dans user_data.cv_structured)
+cache_extractions_cv = CacheSQLite("extractions_cv", max_entrees=int(os.getenv("CV_CACHE_MAX_ENTREES", "500")))
+
+
+def cle_extraction_cv(texte_cv: str, fournisseur: str, modele: str, version_prompt: str) -> str:
+    """Clé d'une extraction de CV : texte normalisé + fournisseur + modèle + version du prompt"""
+    return empreinte(normaliser_texte(texte_cv), fournisseur, modele, version_prompt)
+
+
+# Cache des réponses d'analyse de compatibilité et des lettres générées
+cache_reponses_llm = CacheSQLite(
+    "reponses_llm",
+    max_entrees=int(os.getenv("REPONSES_CACHE_MAX_ENTREES", "1000")),
+    ttl=float(os.getenv("REPONSES_CACHE_TTL", "86400"))
+)
+
+
+def cle_reponse_llm(type_reponse: str, version_prompt: str, *entrees: Any) -> str:
+    """Clé d'une réponse LLM : type (analyse, lettre...) + version du prompt + entrées (CV, offre, infos)"""
+    return empreinte(type_reponse, version_prompt, *entrees)
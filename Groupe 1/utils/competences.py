@@ -0,0 +1,171 @@
+# utils/competences.py
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from utils.sections_cv import section_du_titre
+
+# Catalogue des compétences reconnues dans les CV : catégorie -> forme canonique -> variantes.
+# La forme canonique est celle enregistrée dans le CV structuré.
+CATALOGUE_COMPETENCES = {
+    "competences_techniques": {
+        # Langages de programmation
+        "Python": (), "R": (), "Java": (), "C": (), "C++": (), "C#": (), "JavaScript": ("JS",),
+        "TypeScript": (), "PHP": (), "Ruby": (), "Swift": (), "Kotlin": (), "Go": ("Golang",), "Rust": (),
+        "SQL": (), "Scala": (), "Perl": (), "Shell": (), "Bash": (), "PowerShell": (), "MATLAB": (), "VBA": (),
+        # Data Science et ML (outils uniquement)
+        "TensorFlow": (), "PyTorch": (), "Keras": (), "Scikit-learn": ("sklearn",), "Pandas": (), "NumPy": (),
+        "SciPy": (), "NLTK": (), "spaCy": (), "Matplotlib": (), "Seaborn": (),
+        # Web et Frontend
+        "HTML": ("HTML5",), "CSS": ("CSS3",), "Bootstrap": (), "React": ("React.js", "ReactJS"), "Angular": (),
+        "Vue.js": ("VueJS",), "jQuery": (), "REST API": ("API REST",), "GraphQL": (), "Node.js": ("NodeJS",),
+        "Express": ("Express.js",),
+        # Bases de données
+        "MySQL": (), "PostgreSQL": ("Postgres",), "SQLite": (), "Oracle": (), "MongoDB": (), "Redis": (),
+        "Elasticsearch": (), "NoSQL": (), "SQL Server": ("MS SQL Server",), "MariaDB": (),
+        # DevOps et Cloud
+        "AWS": ("Amazon Web Services",), "Azure": ("Microsoft Azure",), "GCP": ("Google Cloud Platform",),
+        "Docker": (), "Kubernetes": ("K8s",), "Git": (), "GitHub": (), "GitLab": (), "CI/CD": (), "Jenkins": (),
+        "Linux": (), "Unix": (), "Windows": (), "MacOS": ("Mac OS",),
+        # Bureautique et outils
+        "Microsoft Office": ("MS Office", "Suite Office", "Pack Office", "Office"),
+        "Microsoft 365": ("Office 365", "M365", "O365"),
+        "Excel": ("MS Excel", "Microsoft Excel"), "Word": ("MS Word", "Microsoft Word"),
+        "PowerPoint": ("PPT", "Microsoft PowerPoint"), "Access": ("MS Access",), "Outlook": (), "OneNote": (),
+        "SharePoint": (), "OneDrive": (), "Microsoft Teams": ("Teams", "MS Teams"), "Tableau": (),
+        "Power BI": ("PowerBI",), "SAP": (), "Salesforce": (), "Jira": (), "Confluence": (), "Trello": (),
+        "MS Project": ("Microsoft Project",),
+        # Autres outils techniques (Orange, homonyme de l'opérateur, est laissé au LLM)
+        "LaTeX": (), "RStudio": (), "Jupyter": ("Jupyter Notebook",), "SAS": (), "SPSS": (),
+    },
+    "soft_skills": {
+        "Communication": (), "Leadership": (), "Travail d'équipe": ("travail en équipe", "esprit d'équipe", "teamwork"),
+        "Résolution de problèmes": ("problem solving",), "Gestion de projet": ("project management",),
+        "Organisation": (), "Autonomie": (), "Adaptabilité": (), "Créativité": (), "Esprit critique": (),
+        "Négociation": (), "Intelligence émotionnelle": (), "Gestion du temps": (), "Gestion du stress": (),
+        "Écoute active": (), "Empathie": (), "Flexibilité": (), "Prise de décision": (), "Persuasion": (),
+        "Présentation": (), "Prise de parole en public": (),
+    },
+    "certifications": {
+        "Permis B": ("permis de conduire B",), "Permis BVA": (), "TOEIC": (), "TOEFL": (),
+        "IELTS": (), "Cambridge Certificate": (), "DELF": (), "DALF": (), "HSK": (), "PIX": (),
+        "Google Analytics": (), "Certification Microsoft": (), "Certification AWS": (), "Certification Azure": (),
+        "ITIL": (), "PMP": (), "PRINCE2": (),
+    },
+}
+
+# Noms qui sont aussi des mots courants, des sigles ou des initiales (« SAS Dupont », « 8 Go de RAM »,
+# « Office de tourisme », « Word of mouth », « R. Martin », « vitamine C ») : reconnus avec leur casse exacte,
+# comme élément entier d'une liste (« Python, R et SQL »), dans la section compétences du CV ou sur une
+# ligne citant une autre compétence du catalogue. Ailleurs, c'est au LLM d'en juger.
+HOMONYMES = {"R", "C", "Go", "Swift", "Shell", "Rust", "Express", "Oracle", "Word", "Access", "Tableau",
+             "Office", "Teams", "SAS"}
+
+# Sigles reconnus uniquement avec leur casse exacte
+CASSE_EXACTE = {"JS", "Git", "PPT"} | HOMONYMES
+
+# Ce qui sépare deux éléments d'une liste : ponctuation, puces et conjonctions
+SEPARATEURS_LISTE = set(",;/|•·●▪■◦○:()–—")
+MOTS_LIAISON = {"et", "and", "ou", "or", "&"}
+# Mots pouvant précéder le premier élément d'une liste (« Maîtrise de Word, Excel »)
+MOTS_INTRODUCTEURS = MOTS_LIAISON | {"de", "d", "en", "sur", "sous", "avec", "with", "in"}
+
+# Jetons du texte : « C++ », « C# », « Node.js » et « R&D » restent d'un seul tenant ;
+# tirets, barres obliques et apostrophes séparent (« Scikit-learn », « CI/CD », « d'Excel »)
+MOTIF_JETON = re.compile(r"[\w+#.&]+")
+
+
+def _cle(jeton: str) -> str:
+    """Jeton sans casse ni accents"""
+    if not jeton.isascii():
+        jeton = "".join(c for c in unicodedata.normalize("NFD", jeton) if not unicodedata.combining(c))
+    return jeton.casefold()
+
+
+def _jetons(texte: str) -> List[str]:
+    jetons = (jeton.strip(".") for jeton in MOTIF_JETON.findall(texte))
+    return [jeton for jeton in jetons if jeton]
+
+
+def _separe(intervalle: str) -> bool:
+    """Le texte entre deux jetons sépare-t-il deux éléments de liste ? (« , », « • », « - » entouré d'espaces)"""
+    return any(c in SEPARATEURS_LISTE for c in intervalle) or (intervalle.strip() == "-" and intervalle != "-")
+
+
+class DetecteurCompetences:
+    """
+    Reconnaît en un seul passage toutes les compétences d'un catalogue dans un texte.
+    Les variantes sont indexées par suite de jetons à la construction : la détection consulte
+    un dictionnaire par position et par longueur, quelle que soit la taille du catalogue.
+    Les HOMONYMES ne sont retenus que dans un contexte de liste de compétences.
+    """
+
+    def __init__(self, catalogue: Dict[str, Dict[str, Tuple[str, ...]]]):
+        self.categories = tuple(catalogue)
+        self._exactes = {}  # suite de jetons exacte -> (catégorie, forme canonique, homonyme)
+        self._insensibles = {}  # suite de jetons sans casse ni accents -> (catégorie, forme canonique, homonyme)
+        self.longueur_max = 1
+        for categorie, competences in catalogue.items():
+            for canonique, variantes in competences.items():
+                for variante in (canonique,) + tuple(variantes):
+                    jetons = _jetons(variante)
+                    self.longueur_max = max(self.longueur_max, len(jetons))
+                    if variante in CASSE_EXACTE:
+                        self._exactes[tuple(jetons)] = (categorie, canonique, variante in HOMONYMES)
+                    else:
+                        self._insensibles[tuple(_cle(j) for j in jetons)] = (categorie, canonique, False)
+
+    def forme_canonique(self, nom: str) -> Optional[str]:
+        """
+        Forme canonique d'un nom de compétence (« MS Excel », « excel » -> « Excel »), None s'il est inconnu.
+        Le nom est un élément de liste entier : les homonymes sont reconnus.
+        """
+        jetons = _jetons(nom or "")
+        competence = self._exactes.get(tuple(jetons)) or self._insensibles.get(tuple(_cle(j) for j in jetons))
+        return competence[1] if competence else None
+
+    def detecter(self, texte: str) -> Dict[str, List[str]]:
+        """Formes canoniques des compétences présentes dans le texte, par catégorie (ordre d'apparition)"""
+        trouvees = {categorie: [] for categorie in self.categories}
+        section = None
+        for ligne in (texte or "").split("\n"):
+            section = section_du_titre(ligne.strip()) or section
+            positions, jetons = [], []
+            for correspondance in MOTIF_JETON.finditer(ligne):
+                jeton = correspondance.group().strip(".")
+                if jeton:
+                    positions.append(correspondance.span())
+                    jetons.append(jeton)
+            cles = [_cle(jeton) for jeton in jetons]
+
+            detectees = []  # (premier jeton, nombre de jetons, (catégorie, forme canonique, homonyme))
+            i = 0
+            while i < len(jetons):
+                # Variante la plus longue d'abord : « SQL Server » plutôt que « SQL »
+                for n in range(min(self.longueur_max, len(jetons) - i), 0, -1):
+                    competence = self._exactes.get(tuple(jetons[i:i + n])) or self._insensibles.get(tuple(cles[i:i + n]))
+                    if competence:
+                        detectees.append((i, n, competence))
+                        i += n
+                        break
+                else:
+                    i += 1
+
+            liste_de_competences = section == "competences" or any(not homonyme for _, _, (_, _, homonyme) in detectees)
+            for i, n, (categorie, canonique, homonyme) in detectees:
+                if homonyme and not (liste_de_competences and self._element_entier(ligne, positions, cles, i, n)):
+                    continue
+                if canonique not in trouvees[categorie]:
+                    trouvees[categorie].append(canonique)
+        return trouvees
+
+    @staticmethod
+    def _element_entier(ligne: str, positions, cles: List[str], i: int, n: int) -> bool:
+        """Les jetons i à i + n - 1 forment-ils un élément de liste entier (« Python, R et SQL ») ?"""
+        avant = i == 0 or cles[i - 1] in MOTS_INTRODUCTEURS or _separe(ligne[positions[i - 1][1]:positions[i][0]])
+        fin = i + n
+        apres = fin == len(cles) or cles[fin] in MOTS_LIAISON or _separe(ligne[positions[fin - 1][1]:positions[fin][0]])
+        return avant and apres
+
+
+# Construit une seule fois au chargement du module
+detecteur_competences = DetecteurCompetences(CATALOGUE_COMPETENCES)
@@ -0,0 +1,109 @@
+# utils/disjoncteur.py
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# États du disjoncteur
+ETAT_FERME = "fermé"  # Trafic normal
+ETAT_OUVERT = "ouvert"  # Fournisseur considéré hors service : les appels échouent immédiatement
+ETAT_SEMI_OUVERT = "semi-ouvert"  # Un appel de test est autorisé pour vérifier le rétablissement
+
+# Paramètres (surchargeables par variables d'environnement)
+TAILLE_FENETRE = int(os.getenv("DISJONCTEUR_FENETRE", "20"))  # Derniers appels pris en compte
+APPELS_MIN = int(os.getenv("DISJONCTEUR_APPELS_MIN", "4"))  # Appels nécessaires avant de pouvoir ouvrir
+TAUX_ERREUR_MAX = float(os.getenv("DISJONCTEUR_TAUX_ERREUR", "0.5"))  # Taux d'échec déclenchant l'ouverture
+LATENCE_LENTE = float(os.getenv("DISJONCTEUR_LATENCE_LENTE", "45"))  # Un appel plus lent compte comme un échec
+DUREE_OUVERTURE = float(os.getenv("DISJONCTEUR_DUREE_OUVERTURE", "30"))  # Secondes avant l'appel de test
+
+
+class Disjoncteur:
+    """
+    Disjoncteur d'un couple fournisseur/modèle : suit le taux d'échec et la latence
+    des derniers appels, coupe le trafic quand le fournisseur se dégrade, puis laisse
+    passer un appel de test après DUREE_OUVERTURE secondes.
+    """
+
+    def __init__(self, nom: str):
+        self.nom = nom
+        self.etat_interne = ETAT_FERME
+        self._resultats = deque(maxlen=TAILLE_FENETRE)
+        self._ouvert_le = 0.0
+        self._sonde_en_cours = False
+
+    @property
+    def etat(self) -> str:
+        if self.etat_interne == ETAT_OUVERT and self.reste() <= 0:
+            self.etat_interne = ETAT_SEMI_OUVERT
+            self._sonde_en_cours = False
+        return self.etat_interne
+
+    def reste(self) -> float:
+        """Secondes restantes avant l'appel de test (0 si le circuit n'est pas ouvert)"""
+        if self.etat_interne != ETAT_OUVERT:
+            return 0.0
+        return max(0.0, self._ouvert_le + DUREE_OUVERTURE - time.monotonic())
+
+    def disponible(self) -> bool:
+        """Indique si un appel a une chance d'être accepté (sans réserver l'appel de test)"""
+        etat = self.etat
+        return etat == ETAT_FERME or (etat == ETAT_SEMI_OUVERT and not self._sonde_en_cours)
+
+    def autoriser(self) -> bool:
+        """Réserve le droit d'effectuer un appel ; en semi-ouvert, un seul appel de test à la fois"""
+        etat = self.etat
+        if etat == ETAT_FERME:
+            return True
+        if etat == ETAT_SEMI_OUVERT and not self._sonde_en_cours:
+            self._sonde_en_cours = True
+            return True
+        return False
+
+    def enregistrer(self, succes: bool, latence: float) -> None:
+        """Enregistre le résultat d'un appel autorisé"""
+        if succes and latence > LATENCE_LENTE:
+            succes = False
+
+        if self.etat_interne == ETAT_SEMI_OUVERT:
+            if succes:
+                print(f"✅ Disjoncteur {self.nom} refermé, le fournisseur répond à nouveau")
+                self.etat_interne = ETAT_FERME
+                self._resultats.clear()
+            else:
+                self._ouvrir()
+            self._sonde_en_cours = False
+            return
+
+        self._resultats.append(succes)
+        echecs = self._resultats.count(False)
+        if (self.etat_interne == ETAT_FERME and len(self._resultats) >= APPELS_MIN
+                and echecs / len(self._resultats) >= TAUX_ERREUR_MAX):
+            self._ouvrir()
+
+    def abandonner(self) -> None:
+        """Libère l'appel de test quand la requête a été annulée avant d'aboutir"""
+        if self.etat_interne == ETAT_SEMI_OUVERT:
+            self._sonde_en_cours = False
+
+    def _ouvrir(self) -> None:
+        print(f"🔌 Disjoncteur {self.nom} ouvert : appels suspendus pendant {DUREE_OUVERTURE:.0f}s")
+        self.etat_interne = ETAT_OUVERT
+        self._ouvert_le = time.monotonic()
+        self._resultats.clear()
+
+
+# Disjoncteurs partagés par tout le processus : (fournisseur, modèle) -> disjoncteur
+_disjoncteurs: Dict[tuple, Disjoncteur] = {}
+
+
+def get_disjoncteur(fournisseur: str, modele: Optional[str] = None) -> Disjoncteur:
+    """Récupère (ou crée) le disjoncteur associé à un fournisseur et un modèle"""
+    cle = (fournisseur, modele)
+    if cle not in _disjoncteurs:
+        _disjoncteurs[cle] = Disjoncteur(f"{fournisseur}:{modele}")
+    return _disjoncteurs[cle]
+
+
+def etats_disjoncteurs() -> Dict[str, str]:
+    """État de chaque disjoncteur"""
+    return {disjoncteur.nom: disjoncteur.etat for disjoncteur in _disjoncteurs.values()}
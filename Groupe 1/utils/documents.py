@@ -0,0 +1,348 @@
+# utils/documents.py
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterator, Optional, Tuple
+import docx
+import PyPDF2
+from utils.texte import SAUT_DE_PAGE
+
+# Limites de lecture des documents (surchargeables par variables d'environnement)
+TAILLE_MAX_DOCUMENT = int(os.getenv("DOCUMENT_TAILLE_MAX", str(10 * 1024 * 1024)))  # Octets
+# Budgets de lecture : au-delà, le reste du document n'est pas lu (les prompts n'en utiliseraient rien)
+PAGES_MAX_DOCUMENT = int(os.getenv("DOCUMENT_PAGES_MAX", "30"))
+CARACTERES_MAX_DOCUMENT = int(os.getenv("DOCUMENT_CARACTERES_MAX", "40000"))  # ≈ 10 000 tokens
+DELAI_MAX_DOCUMENT = float(os.getenv("DOCUMENT_DELAI_MAX", "20"))  # Secondes par document
+PROCESSUS_DOCUMENTS = int(os.getenv("DOCUMENT_PROCESSUS", "2"))
+
+EXTENSIONS_SUPPORTEES = (".pdf", ".docx", ".txt")
+
+# Moteur d'extraction du texte des PDF : pypdf2 (par défaut), pypdfium2 ou pdfminer (dépendances optionnelles)
+MOTEUR_PDF = os.getenv("DOCUMENT_MOTEUR_PDF", "pypdf2").lower()
+
+# Démarrage des processus de lecture : forkserver (Linux, macOS) ou spawn (Windows). Contrairement à fork,
+# ils ne copient ni les threads ni les connexions du bot ; seul _boucle_lecteur et ses imports sont chargés
+METHODE_LANCEMENT = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Processus de lecture (créés au premier document) : tous, et ceux qui attendent un document
+_lecteurs = set()
+_lecteurs_libres = []
+_places = None  # asyncio.Semaphore(PROCESSUS_DOCUMENTS) : lectures simultanées
+
+# Derniers documents lus : (empreinte, extension) -> (texte, pages, troncature)
+DOCUMENTS_CONSERVES = int(os.getenv("DOCUMENTS_CONSERVES", "32"))
+_documents_lus = OrderedDict()
+
+
+class ErreurDocument(Exception):
+    """Document refusé (trop volumineux, trop long) ou illisible ; le message est destiné à l'utilisateur"""
+
+
+class DocumentCV:
+    """
+    Document lu une seule fois puis transmis à toutes les étapes de l'analyse :
+    empreinte du contenu, texte extrait, nombre de pages et CV structuré (JSON).
+    """
+
+    def __init__(self, nom_fichier: str, empreinte: str, texte: str, pages: Optional[int],
+                 troncature: Optional[str] = None):
+        self.nom_fichier = nom_fichier
+        self.empreinte = empreinte  # SHA-256 du fichier
+        self.texte = texte
+        self.pages = pages  # None pour les DOCX et TXT
+        self.troncature = troncature  # Message pour l'utilisateur si le document n'a été lu qu'en partie
+        self.structure = None  # CV structuré, rempli par l'analyse LLM
+
+    def json_octets(self) -> bytes:
+        """CV structuré sérialisé, prêt à être envoyé depuis un tampon mémoire"""
+        return json.dumps(self.structure, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def pages_pypdf2(contenu: bytes, pages_max: int) -> Tuple[int, Iterator[str]]:
+    """Nombre de pages d'un PDF et texte de ses `pages_max` premières pages, extrait page par page (PyPDF2)"""
+    lecteur = PyPDF2.PdfReader(io.BytesIO(contenu))
+
+    def pages():
+        for numero in range(min(len(lecteur.pages), pages_max)):
+            yield (lecteur.pages[numero].extract_text() or "") + "\n"
+
+    return len(lecteur.pages), pages()
+
+
+def pages_pypdfium2(contenu: bytes, pages_max: int) -> Tuple[int, Iterator[str]]:
+    """Comme pages_pypdf2, avec pypdfium2 (PDFium, bien plus rapide sur les mises en page complexes)"""
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(contenu)
+
+    def pages():
+        try:
+            for numero in range(min(len(pdf), pages_max)):
+                page = pdf[numero]
+                texte_page = page.get_textpage()
+                yield texte_page.get_text_range() + "\n"
+                texte_page.close()
+                page.close()
+        finally:
+            pdf.close()
+
+    return len(pdf), pages()
+
+
+def pages_pdfminer(contenu: bytes, pages_max: int) -> Tuple[int, Iterator[str]]:
+    """Comme pages_pypdf2, avec pdfminer.six (plus lent, meilleur respect de l'ordre de lecture)"""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    # Le contenu des pages n'est interprété qu'au moment où elles sont lues
+    liste_pages = list(PDFPage.get_pages(io.BytesIO(contenu)))
+
+    def pages():
+        ressources = PDFResourceManager()
+        for page in liste_pages[:pages_max]:
+            sortie = io.StringIO()
+            convertisseur = TextConverter(ressources, sortie, laparams=LAParams())
+            PDFPageInterpreter(ressources, convertisseur).process_page(page)
+            convertisseur.close()
+            yield sortie.getvalue().replace("\f", "") + "\n"
+
+    return len(liste_pages), pages()
+
+
+# Moteurs disponibles : nom -> (module requis, fonction d'extraction)
+MOTEURS_PDF = {
+    "pypdf2": ("PyPDF2", pages_pypdf2),
+    "pypdfium2": ("pypdfium2", pages_pypdfium2),
+    "pdfminer": ("pdfminer", pages_pdfminer),
+}
+
+
+@lru_cache(maxsize=None)
+def moteur_pdf(nom: Optional[str] = None) -> Callable:
+    """Fonction d'extraction du moteur demandé (PyPDF2 si le moteur est inconnu ou non installé)"""
+    nom = nom or MOTEUR_PDF
+    if nom not in MOTEURS_PDF:
+        print(f"⚠️ Moteur PDF {nom} inconnu ({', '.join(MOTEURS_PDF)}), utilisation de PyPDF2")
+        nom = "pypdf2"
+    module, extraction = MOTEURS_PDF[nom]
+    if nom != "pypdf2" and importlib.util.find_spec(module) is None:
+        print(f"⚠️ Moteur PDF {nom} non installé (module {module} absent), utilisation de PyPDF2")
+        return pages_pypdf2
+    return extraction
+
+
+def lire_dans_budget(morceaux: Iterator[str]) -> Tuple[str, bool]:
+    """
+    Assemble les morceaux de texte (pages, paragraphes) jusqu'à CARACTERES_MAX_DOCUMENT caractères :
+    les morceaux suivants ne sont jamais extraits. Retourne (texte, tronqué).
+    """
+    lus, restant = [], CARACTERES_MAX_DOCUMENT
+    for morceau in morceaux:
+        if len(morceau) > restant:
+            lus.append(morceau[:restant])
+            return "".join(lus), True
+        lus.append(morceau)
+        restant -= len(morceau)
+    return "".join(lus), False
+
+
+def lire_document(nom_fichier: str, contenu: bytes,
+                  moteur: Optional[str] = None) -> Tuple[str, Optional[int], Optional[str]]:
+    """
+    Extrait le texte d'un document PDF, DOCX ou TXT dans la limite des budgets de lecture
+    (PDF lus avec `moteur`, DOCUMENT_MOTEUR_PDF par défaut).
+    Fonction synchrone exécutée dans un processus du pool (ou directement par les scripts).
+    Retourne (texte, nombre de pages (PDF uniquement), message de troncature ou None).
+
+    Raises:
+        ErreurDocument: si le document ne peut pas être lu.
+    """
+    extension = os.path.splitext(nom_fichier.lower())[1]
+    pages = None
+    try:
+        if extension == ".pdf":
+            pages, texte_pages = moteur_pdf(moteur)(contenu, PAGES_MAX_DOCUMENT)
+            # Pages séparées par un saut de page : compacter_texte_cv y repère les en-têtes et pieds de page
+            texte, tronque = lire_dans_budget(texte_page + SAUT_DE_PAGE for texte_page in texte_pages)
+        elif extension == ".docx":
+            document = docx.Document(io.BytesIO(contenu))
+            texte, tronque = lire_dans_budget(paragraphe.text + "\n" for paragraphe in document.paragraphs)
+        elif extension == ".txt":
+            texte, tronque = lire_dans_budget(iter([contenu.decode("utf-8")]))
+        else:
+            raise ErreurDocument("Format non supporté. Veuillez télécharger un fichier PDF, DOCX ou TXT.")
+    except ErreurDocument:
+        raise
+    except Exception as e:
+        raise ErreurDocument(f"Impossible de lire le fichier {nom_fichier} : {e}")
+
+    if tronque:
+        troncature = f"Document trop long : seuls les {CARACTERES_MAX_DOCUMENT} premiers caractères ont été lus."
+    elif pages is not None and pages > PAGES_MAX_DOCUMENT:
+        troncature = f"Document trop long : seules les {PAGES_MAX_DOCUMENT} premières pages sur {pages} ont été lues."
+    else:
+        return texte, pages, None
+    print(f"✂️ {nom_fichier} : {troncature}")
+    return texte, pages, troncature
+
+
+def texte_document(nom_fichier: str, contenu: bytes) -> str:
+    """Texte d'un document, lu dans le processus courant (scripts synchrones)"""
+    return lire_document(nom_fichier, contenu)[0]
+
+
+def _boucle_lecteur(connexion) -> None:
+    """Corps d'un processus de lecture : lit les documents reçus un par un jusqu'à recevoir None"""
+    while True:
+        try:
+            message = connexion.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        nom_fichier, contenu = message
+        try:
+            connexion.send((True, lire_document(nom_fichier, contenu)))
+        except ErreurDocument as e:
+            connexion.send((False, e))
+        except Exception as e:
+            connexion.send((False, ErreurDocument(f"Impossible de lire le fichier {nom_fichier} : {e}")))
+
+
+class _Lecteur:
+    """
+    Processus de lecture dédié, qui traite un document à la fois. Contrairement à un ProcessPoolExecutor,
+    un lecteur bloqué peut être arrêté seul : les lectures des autres utilisateurs continuent.
+    """
+
+    def __init__(self):
+        # Le script principal est réimporté par le processus : bot.py ne démarre le bot que s'il est exécuté
+        contexte = multiprocessing.get_context(METHODE_LANCEMENT)
+        self.connexion, connexion_lecteur = contexte.Pipe()
+        self.processus = contexte.Process(target=_boucle_lecteur, args=(connexion_lecteur,), daemon=True)
+        self.processus.start()
+        connexion_lecteur.close()
+
+    def lire(self, nom_fichier: str, contenu: bytes, delai: float) -> Tuple[str, Optional[int], Optional[str]]:
+        """
+        Exécuté dans un thread : envoie le document au processus et attend le résultat de lire_document.
+
+        Raises:
+            TimeoutError: aucun résultat après `delai` secondes.
+            EOFError: le processus s'est arrêté (mémoire saturée, arrêt du bot...).
+        """
+        self.connexion.send((nom_fichier, contenu))
+        if not self.connexion.poll(delai):
+            raise TimeoutError
+        reussi, resultat = self.connexion.recv()
+        if not reussi:
+            raise resultat
+        return resultat
+
+    def arreter(self, attendre: bool = False) -> None:
+        """Arrête le processus : immédiatement, ou avec `attendre` une fois sa lecture en cours terminée"""
+        if attendre:
+            # Fin de la boucle de lecture, après le document en cours
+            try:
+                self.connexion.send(None)
+            except OSError:
+                pass
+        else:
+            self.processus.terminate()
+        self.processus.join()
+        self.connexion.close()
+
+
+def fermer_pool_documents(attendre: bool = False) -> None:
+    """
+    Arrête les processus de lecture (un document bloqué ne rend jamais son processus).
+    Avec `attendre`, les lectures en cours se terminent et les processus s'arrêtent normalement.
+    """
+    global _places
+    lecteurs = list(_lecteurs)
+    _lecteurs.clear()
+    _lecteurs_libres.clear()
+    _places = None
+    for lecteur in lecteurs:
+        lecteur.arreter(attendre)
+
+
+async def _lire_dans_un_processus(nom_fichier: str, contenu: bytes) -> Tuple[str, Optional[int], Optional[str]]:
+    """lire_document dans un processus de lecture libre ; seul ce processus est remplacé s'il dépasse le délai"""
+    global _places
+    if _places is None:
+        _places = asyncio.Semaphore(PROCESSUS_DOCUMENTS)
+    async with _places:
+        if _lecteurs_libres:
+            lecteur = _lecteurs_libres.pop()
+        else:
+            lecteur = _Lecteur()
+            _lecteurs.add(lecteur)
+        try:
+            resultat = await asyncio.to_thread(lecteur.lire, nom_fichier, contenu, DELAI_MAX_DOCUMENT)
+        except ErreurDocument:
+            _lecteurs_libres.append(lecteur)
+            raise
+        except TimeoutError:
+            print(f"⏱️ Lecture de {nom_fichier} interrompue après {DELAI_MAX_DOCUMENT:.0f}s, processus de lecture remplacé")
+            _remplacer(lecteur)
+            raise ErreurDocument(f"La lecture du document a dépassé {DELAI_MAX_DOCUMENT:.0f} secondes.")
+        except (EOFError, OSError):
+            # Processus arrêté (mémoire saturée, arrêt du bot...)
+            _remplacer(lecteur)
+            raise ErreurDocument("La lecture du document a été interrompue, veuillez réessayer.")
+        except BaseException:
+            # Commande annulée : le lecteur est peut-être encore occupé, il n'est pas réutilisé
+            _remplacer(lecteur)
+            raise
+        if lecteur in _lecteurs:
+            _lecteurs_libres.append(lecteur)
+        return resultat
+
+
+def _remplacer(lecteur: _Lecteur) -> None:
+    """Arrête un lecteur ; le suivant sera créé à la prochaine lecture"""
+    _lecteurs.discard(lecteur)
+    lecteur.arreter()
+
+
+async def charger_document(nom_fichier: str, contenu: bytes) -> DocumentCV:
+    """
+    Lit un document dans un processus de lecture (la boucle d'événements ne fait qu'attendre le résultat,
+    dans la limite de DELAI_MAX_DOCUMENT secondes) et des budgets de pages et de caractères. Un fichier déjà lu n'est pas relu :
+    les derniers documents sont conservés en mémoire par empreinte de contenu.
+
+    Raises:
+        ErreurDocument: document trop volumineux, illisible ou trop lent à lire.
+    """
+    if len(contenu) > TAILLE_MAX_DOCUMENT:
+        raise ErreurDocument(
+            f"Fichier trop volumineux ({len(contenu) / 1e6:.1f} Mo, maximum {TAILLE_MAX_DOCUMENT / 1e6:.0f} Mo)."
+        )
+
+    empreinte = hashlib.sha256(contenu).hexdigest()
+    cle = (empreinte, os.path.splitext(nom_fichier.lower())[1])
+    if cle in _documents_lus:
+        _documents_lus.move_to_end(cle)
+        texte, pages, troncature = _documents_lus[cle]
+        print(f"♻️ Document {nom_fichier} déjà lu, texte réutilisé")
+        return DocumentCV(nom_fichier, empreinte, texte, pages, troncature)
+
+    texte, pages, troncature = await _lire_dans_un_processus(nom_fichier, contenu)
+    _documents_lus[cle] = (texte, pages, troncature)
+    if len(_documents_lus) > DOCUMENTS_CONSERVES:
+        _documents_lus.popitem(last=False)
+    return DocumentCV(nom_fichier, empreinte, texte, pages, troncature)
+
+
+async def extraire_texte_document(nom_fichier: str, contenu: bytes) -> str:
+    """Texte d'un document lu dans le pool de processus (voir charger_document)"""
+    return (await charger_document(nom_fichier, contenu)).texte
@@ -0,0 +1,78 @@
+# utils/extraction_locale.py
+import re
+from typing import Any, Dict, List
+from utils.competences import detecteur_competences
+
+# Champs du CV structuré extraits localement (sans appel LLM) : les prompts ne les demandent plus.
+# Les compétences techniques restent demandées au LLM (outils absents du catalogue) ; les outils
+# du catalogue détectés localement les complètent (voir fusionner_champs_locaux).
+CHAMPS_LOCAUX = ("email", "telephone", "linkedin", "github")
+
+MOTIF_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}", re.IGNORECASE)
+
+# Numéros commençant par 0 ou par un indicatif (+33 6 12 34 56 78, 06.12.34.56.78, +377 98 76 54 32)
+MOTIF_TELEPHONE = re.compile(r"(?<![\w+])(?:\+\d{1,3}[\s.-]?(?:\(0\)[\s.-]?)?|0)\d(?:[\s.-]?\d){7,11}(?!\d)")
+
+# URL complète, ou nom d'icône suivi de l'identifiant dans le texte extrait des PDF (« /linkedin-innom »)
+MOTIFS_LINKEDIN = (
+    re.compile(r"linkedin\.com/in/([\w-]+)", re.IGNORECASE),
+    re.compile(r"/linkedin-in\s*([\w-]+)", re.IGNORECASE),
+)
+MOTIFS_GITHUB = (
+    re.compile(r"github\.com/([\w-]+)", re.IGNORECASE),
+    re.compile(r"/github\s*([\w-]+)", re.IGNORECASE),
+)
+
+
+def competences_outils(texte: str) -> List[str]:
+    """Outils et langages du catalogue (utils/competences.py) mentionnés dans le texte, sous leur forme canonique"""
+    return detecteur_competences.detecter(texte)["competences_techniques"]
+
+
+def _premier_identifiant(motifs, texte: str) -> str:
+    for motif in motifs:
+        trouve = motif.search(texte)
+        if trouve:
+            return trouve.group(1)
+    return ""
+
+
+def extraire_champs_locaux(texte: str) -> Dict[str, Any]:
+    """
+    Extrait sans LLM l'email, le téléphone, les identifiants LinkedIn et GitHub
+    (nom d'utilisateur seul, sans l'URL) et les compétences techniques du catalogue.
+    """
+    texte = texte or ""
+    email = MOTIF_EMAIL.search(texte)
+    telephone = MOTIF_TELEPHONE.search(texte)
+    return {
+        "email": email.group(0) if email else "",
+        "telephone": " ".join(telephone.group(0).split()) if telephone else "",
+        "linkedin": _premier_identifiant(MOTIFS_LINKEDIN, texte),
+        "github": _premier_identifiant(MOTIFS_GITHUB, texte),
+        "competences_techniques": competences_outils(texte),
+    }
+
+
+def fusionner_champs_locaux(cv_data: Dict[str, Any], locaux: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Complète le CV structuré renvoyé par le LLM avec les champs extraits localement.
+    Une valeur locale remplace celle du LLM. Pour les listes (compétences, certifications), les éléments
+    du catalogue détectés localement viennent en tête, suivis de ceux du LLM absents du catalogue ;
+    les noms du LLM connus du catalogue sont ramenés à leur forme canonique (« MS Excel » -> « Excel »).
+    """
+    for champ, valeur in locaux.items():
+        if isinstance(valeur, list):
+            fusion = list(valeur)
+            deja = {element.casefold() for element in fusion}
+            for element in cv_data.get(champ) or []:
+                if not isinstance(element, str) or not element.strip():
+                    continue
+                element = detecteur_competences.forme_canonique(element) or element.strip()
+                if element.casefold() not in deja:
+                    deja.add(element.casefold())
+                    fusion.append(element)
+            cv_data[champ] = fusion
+        else:
+            cv_data[champ] = valeur or cv_data.get(champ) or ""
+    return cv_data
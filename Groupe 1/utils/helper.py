@@ -12,7 +12,10 @@ class UserData:
         self.job_offers = []  # Liste des offres d'emploi
         self.job_offer = None  # Offre d'emploi sélectionnée
         self.lettre_infos = None  # Informations supplémentaires pour la lettre
-        self.analysis_results = None  # Résultats d'analyse CV/offre
+        self.analysis_results = None  # Résultats d'analyse CV/offre ({"cle", "reponse"})
+        self.scores_offres = None  # Scores de pertinence des offres (criblage par lot)
+        self.extraction_speculative = None  # Extraction du CV lancée en arrière-plan après /telecharger_cv
+        self.analyse_speculative = None  # Analyse CV/offre lancée en arrière-plan à la sélection d'une offre
 
 # Dictionnaire pour stocker les instances UserData par ID utilisateur
 user_data = {}
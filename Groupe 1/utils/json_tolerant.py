@@ -0,0 +1,161 @@
+# utils/json_tolerant.py
+import json
+import re
+from typing import Any
+
+# Bloc de code Markdown (la balise fermante peut manquer si la réponse a été tronquée)
+MOTIF_BLOC_CODE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+
+# Guillemets typographiques acceptés comme délimiteurs de chaîne
+GUILLEMETS_TYPOGRAPHIQUES = "“”„"
+
+
+def _debut_json(texte: str) -> int:
+    """Position du premier '{' ou '[' du texte, -1 s'il n'y en a pas"""
+    positions = [p for p in (texte.find("{"), texte.find("[")) if p != -1]
+    return min(positions) if positions else -1
+
+
+# Début d'une clé d'objet (« "nom": »), éventuellement coupée par la fin de la fenêtre examinée
+MOTIF_CLE = re.compile(r'["“”„][^"“”„\n]*(?:["“”„]\s*:|$)')
+# Début d'une valeur de tableau
+MOTIF_VALEUR = re.compile(r'["“”„{\[\-\d]|(?:true|false|null)\b')
+
+
+def _ferme_chaine(suite: str, pile) -> bool:
+    """
+    Indique si un guillemet suivi de `suite` ferme la chaîne en cours ou s'il s'agit d'une citation
+    dans le texte (« le "meilleur" produit », « Projet "Data", analyse »). Après une virgule,
+    la chaîne n'est fermée que si la suite est bien l'élément suivant (clé d'objet ou valeur de tableau).
+    """
+    suite = suite.lstrip()
+    if not suite or suite[0] in ":}]":
+        return True
+    if suite[0] != ",":
+        return False
+    reste = suite[1:].lstrip()
+    if not reste:
+        return True
+    motif = MOTIF_CLE if pile and pile[-1] == "}" else MOTIF_VALEUR
+    return motif.match(reste) is not None
+
+
+def _terminer(morceaux, pile) -> str:
+    """Referme une sortie tronquée : retire la virgule pendante puis ferme les structures ouvertes"""
+    texte = "".join(morceaux).rstrip()
+    if texte.endswith(","):
+        texte = texte[:-1]
+    elif texte.endswith(":"):
+        texte += " null"
+    return texte + "".join(reversed(pile))
+
+
+def reparer_json(texte: str) -> str:
+    """
+    Répare le JSON produit par un LLM : supprime le texte autour, remplace les guillemets
+    typographiques délimitant les chaînes, échappe les guillemets et retours à la ligne dans les chaînes,
+    retire les virgules finales et referme les tableaux/objets d'une réponse tronquée.
+
+    Raises:
+        ValueError: si le texte ne contient aucun objet ni tableau JSON.
+    """
+    debut = _debut_json(texte)
+    if debut == -1:
+        raise ValueError("aucun objet ni tableau JSON dans la réponse")
+
+    sortie = []
+    pile = []  # Caractères fermants attendus
+    coupures = []  # (longueur de la sortie, pile) à chaque virgule : points de repli en cas de troncature
+    dans_chaine = False
+    echappe = False
+
+    for i in range(debut, len(texte)):
+        c = texte[i]
+        if dans_chaine:
+            if echappe:
+                echappe = False
+            elif c == "\\":
+                echappe = True
+            elif c == '"' or c in GUILLEMETS_TYPOGRAPHIQUES:
+                # Un guillemet ne ferme la chaîne que s'il est suivi d'un séparateur
+                # et de l'élément suivant ; sinon c'est une citation dans le texte
+                if _ferme_chaine(texte[i + 1:i + 80], pile):
+                    dans_chaine = False
+                    c = '"'
+                elif c == '"':
+                    c = '\\"'
+            elif c == "\n":
+                c = "\\n"
+            sortie.append(c)
+            continue
+
+        if c == '"' or c in GUILLEMETS_TYPOGRAPHIQUES:
+            dans_chaine = True
+            sortie.append('"')
+        elif c in "{[":
+            pile.append("}" if c == "{" else "]")
+            sortie.append(c)
+        elif c in "}]":
+            # Virgule finale avant la fermeture
+            while sortie and sortie[-1].isspace():
+                sortie.pop()
+            if sortie and sortie[-1] == ",":
+                sortie.pop()
+            if pile:
+                pile.pop()
+            sortie.append(c)
+            if not pile:
+                # Fin de la valeur de premier niveau : le texte qui suit est ignoré
+                return "".join(sortie)
+        elif c == ",":
+            coupures.append((len(sortie), list(pile)))
+            sortie.append(c)
+        else:
+            sortie.append(c)
+
+    # Réponse tronquée : fermer la chaîne en cours puis les structures ouvertes.
+    # Un nombre ou un littéral coupé (« 8 » pour « 80 ») n'est pas conservé.
+    if dans_chaine:
+        if echappe:
+            sortie.pop()
+        sortie.append('"')
+    fin = "".join(sortie[-20:]).rstrip()
+    if fin and fin[-1] in '"]},:[{':
+        candidat = _terminer(sortie, pile)
+        try:
+            json.loads(candidat, strict=False)
+            return candidat
+        except ValueError:
+            pass
+
+    # Sinon revenir au dernier élément complet (clé sans valeur, nombre coupé...)
+    for longueur, pile_coupure in reversed(coupures):
+        candidat = _terminer(sortie[:longueur], pile_coupure)
+        try:
+            json.loads(candidat, strict=False)
+            return candidat
+        except ValueError:
+            continue
+    raise ValueError("JSON irréparable")
+
+
+def charger_json(texte: str) -> Any:
+    """
+    Charge le JSON d'une réponse LLM (mode JSON natif, bloc de code Markdown ou texte libre),
+    en le réparant si nécessaire.
+
+    Raises:
+        ValueError: si aucun JSON exploitable n'a pu être extrait.
+    """
+    texte = (texte or "").strip()
+    bloc = MOTIF_BLOC_CODE.search(texte)
+    if bloc and _debut_json(bloc.group(1)) != -1:
+        texte = bloc.group(1).strip()
+
+    # Cas courant (mode JSON natif) : aucune réparation nécessaire
+    try:
+        return json.loads(texte, strict=False)
+    except ValueError:
+        pass
+
+    return json.loads(reparer_json(texte), strict=False)
@@ -0,0 +1,172 @@
+# utils/metriques.py
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Commande Discord en cours d'exécution (propagée aux tâches asyncio créées par la commande)
+commande_courante = contextvars.ContextVar("commande_courante", default="hors_commande")
+
+# Fenêtre glissante du résumé (secondes) et nombre maximal d'appels conservés
+FENETRE_METRIQUES = float(os.getenv("METRIQUES_FENETRE", "3600"))
+APPELS_CONSERVES = int(os.getenv("METRIQUES_APPELS_CONSERVES", "5000"))
+
+# Bornes des classes de l'histogramme de latence (secondes)
+LIMITES_LATENCE = (0.5, 1, 2, 5, 10, 20, 30, 60, float("inf"))
+
+# Prix indicatifs en dollars par million de tokens (entrée, sortie)
+PRIX_PAR_MILLION = {
+    "mistral-small-latest": (0.2, 0.6),
+    "mistral-large-latest": (2.0, 6.0),
+    "gemini-1.5-pro": (1.25, 5.0),
+    "gemini-1.5-flash": (0.075, 0.3),
+    "gemini-2.0-flash": (0.1, 0.4),
+}
+
+# Résultats d'un appel
+RESULTAT_SUCCES = "succès"
+RESULTAT_ANNULE = "annulé"
+
+_verrou = threading.Lock()
+_appels = deque(maxlen=APPELS_CONSERVES)  # Derniers appels (fenêtre glissante)
+_cumuls: Dict[tuple, Dict[str, Any]] = {}  # Compteurs depuis le démarrage, par (commande, fournisseur, modèle)
+
+
+def definir_commande(nom: Optional[str]) -> None:
+    """Associe les appels LLM suivants (dans la tâche courante) à une commande"""
+    commande_courante.set(nom or "hors_commande")
+
+
+def cout_estime(modele: str, tokens_prompt: int, tokens_reponse: int) -> float:
+    """Coût indicatif d'un appel en dollars (0 si le modèle n'est pas tarifé)"""
+    prix = PRIX_PAR_MILLION.get(modele)
+    if prix is None:
+        # Variantes « -latest », « -001 »... : prix du modèle de base
+        prix = next((p for nom, p in PRIX_PAR_MILLION.items() if modele.startswith(nom.replace("-latest", ""))), (0.0, 0.0))
+    return (tokens_prompt * prix[0] + tokens_reponse * prix[1]) / 1_000_000
+
+
+def enregistrer_appel(fournisseur: str, modele: str, latence: float, resultat: str = RESULTAT_SUCCES,
+                      tokens_prompt: int = 0, tokens_reponse: int = 0, reessais: int = 0,
+                      commande: Optional[str] = None) -> None:
+    """Enregistre un appel LLM (coût constant : aucune agrégation n'est faite ici)"""
+    commande = commande or commande_courante.get()
+    tokens_prompt = tokens_prompt or 0
+    tokens_reponse = tokens_reponse or 0
+    cout = cout_estime(modele, tokens_prompt, tokens_reponse)
+    classe = bisect.bisect_left(LIMITES_LATENCE, latence)
+
+    with _verrou:
+        _appels.append((time.time(), commande, fournisseur, modele, tokens_prompt, tokens_reponse, latence, reessais, resultat, cout))
+
+        cle = (commande, fournisseur, modele)
+        cumul = _cumuls.get(cle)
+        if cumul is None:
+            cumul = _cumuls[cle] = {
+                "resultats": {}, "tokens_prompt": 0, "tokens_reponse": 0, "reessais": 0,
+                "cout": 0.0, "somme_latence": 0.0, "classes": [0] * len(LIMITES_LATENCE)
+            }
+        cumul["resultats"][resultat] = cumul["resultats"].get(resultat, 0) + 1
+        cumul["tokens_prompt"] += tokens_prompt
+        cumul["tokens_reponse"] += tokens_reponse
+        cumul["reessais"] += reessais
+        cumul["cout"] += cout
+        cumul["somme_latence"] += latence
+        cumul["classes"][classe] += 1
+
+
+def _centile(valeurs_triees, centile: float) -> float:
+    if not valeurs_triees:
+        return 0.0
+    return valeurs_triees[min(len(valeurs_triees) - 1, int(centile * len(valeurs_triees)))]
+
+
+def resume_metriques(fenetre: float = FENETRE_METRIQUES) -> Dict[str, Dict[str, Any]]:
+    """
+    Résumé par commande des appels des `fenetre` dernières secondes : nombre d'appels,
+    erreurs, réessais, tokens, coût, latences médiane/p95 et histogramme de latence.
+    """
+    limite = time.time() - fenetre
+    with _verrou:
+        appels = [appel for appel in _appels if appel[0] >= limite]
+
+    resume = {}
+    for _, commande, fournisseur, modele, tokens_prompt, tokens_reponse, latence, reessais, resultat, cout in appels:
+        stats = resume.setdefault(commande, {
+            "appels": 0, "erreurs": 0, "reessais": 0, "tokens_prompt": 0, "tokens_reponse": 0,
+            "cout": 0.0, "latences": [], "modeles": set(), "classes": [0] * len(LIMITES_LATENCE)
+        })
+        stats["appels"] += 1
+        stats["erreurs"] += resultat != RESULTAT_SUCCES
+        stats["reessais"] += reessais
+        stats["tokens_prompt"] += tokens_prompt
+        stats["tokens_reponse"] += tokens_reponse
+        stats["cout"] += cout
+        stats["latences"].append(latence)
+        stats["modeles"].add(f"{fournisseur}:{modele}")
+        stats["classes"][bisect.bisect_left(LIMITES_LATENCE, latence)] += 1
+
+    for stats in resume.values():
+        latences = sorted(stats.pop("latences"))
+        stats["latence_p50"] = _centile(latences, 0.5)
+        stats["latence_p95"] = _centile(latences, 0.95)
+        stats["modeles"] = sorted(stats["modeles"])
+    return resume
+
+
+def totaux_commande(commande: str) -> Dict[str, Any]:
+    """
+    Totaux depuis le démarrage des appels d'une commande, tous fournisseurs et modèles confondus
+    (contrairement à resume_metriques, sans limite de durée : deux relevés encadrent un traitement long).
+    """
+    totaux = {"appels": 0, "erreurs": 0, "reessais": 0, "tokens_prompt": 0, "tokens_reponse": 0, "cout": 0.0}
+    with _verrou:
+        for (nom, _, _), cumul in _cumuls.items():
+            if nom != commande:
+                continue
+            appels = sum(cumul["resultats"].values())
+            totaux["appels"] += appels
+            totaux["erreurs"] += appels - cumul["resultats"].get(RESULTAT_SUCCES, 0)
+            for champ in ("reessais", "tokens_prompt", "tokens_reponse", "cout"):
+                totaux[champ] += cumul[champ]
+    return totaux
+
+
+def texte_metriques() -> str:
+    """Export texte des compteurs cumulés (format d'exposition Prometheus)"""
+    lignes = [
+        "# TYPE llm_appels_total counter",
+        "# TYPE llm_tokens_total counter",
+        "# TYPE llm_reessais_total counter",
+        "# TYPE llm_cout_dollars_total counter",
+        "# TYPE llm_latence_secondes histogram",
+    ]
+    with _verrou:
+        cumuls = {cle: dict(valeur, resultats=dict(valeur["resultats"]), classes=list(valeur["classes"]))
+                  for cle, valeur in _cumuls.items()}
+
+    for (commande, fournisseur, modele), cumul in sorted(cumuls.items()):
+        etiquettes = f'commande="{commande}",fournisseur="{fournisseur}",modele="{modele}"'
+        for resultat, nombre in sorted(cumul["resultats"].items()):
+            lignes.append(f'llm_appels_total{{{etiquettes},resultat="{resultat}"}} {nombre}')
+        lignes.append(f'llm_tokens_total{{{etiquettes},type="prompt"}} {cumul["tokens_prompt"]}')
+        lignes.append(f'llm_tokens_total{{{etiquettes},type="reponse"}} {cumul["tokens_reponse"]}')
+        lignes.append(f'llm_reessais_total{{{etiquettes}}} {cumul["reessais"]}')
+        lignes.append(f'llm_cout_dollars_total{{{etiquettes}}} {cumul["cout"]:.6f}')
+        cumul_classes = 0
+        for borne, nombre in zip(LIMITES_LATENCE, cumul["classes"]):
+            cumul_classes += nombre
+            le = "+Inf" if borne == float("inf") else f"{borne:g}"
+            lignes.append(f'llm_latence_secondes_bucket{{{etiquettes},le="{le}"}} {cumul_classes}')
+        lignes.append(f'llm_latence_secondes_sum{{{etiquettes}}} {cumul["somme_latence"]:.3f}')
+        lignes.append(f'llm_latence_secondes_count{{{etiquettes}}} {cumul_classes}')
+    return "\n".join(lignes) + "\n"
+
+
+def ecrire_metriques(chemin: str) -> None:
+    """Écrit l'export texte des métriques dans un fichier"""
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        fichier.write(texte_metriques())
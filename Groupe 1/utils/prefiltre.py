@@ -0,0 +1,76 @@
+# utils/prefiltre.py
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+# Seuils du pré-filtre local (score sur 100). Aucune offre n'est écartée par défaut : un CV et une offre
+# sans terme commun peuvent formuler autrement les mêmes compétences (« Analyse de données » / « data analysis »)
+SEUIL_REJET = int(os.getenv("PREFILTRE_SEUIL_REJET", "0"))  # En dessous : l'appel LLM est évité
+SEUIL_PRIORITE = int(os.getenv("PREFILTRE_SEUIL_PRIORITE", "40"))  # En dessous : l'appel LLM passe en basse priorité
+SATURATION = int(os.getenv("PREFILTRE_SATURATION", "5"))  # Nombre de termes communs donnant un score de 100
+
+# Décisions du pré-filtre
+DECISION_REJET = "rejet"
+DECISION_BASSE_PRIORITE = "basse_priorite"
+DECISION_NORMALE = "normale"
+
+# Champs de l'offre comparés au CV (France Travail n'a qu'une description)
+CHAMPS_OFFRE = ("titre", "missions", "profil_recherche", "description")
+
+# Mots (C++, C#, Node.js, Power BI...) et niveaux de langue entre parenthèses
+MOTIF_MOT = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9]+)*")
+MOTIF_PARENTHESES = re.compile(r"\([^)]*\)")
+# Libellé regroupant plusieurs compétences (« Python, SQL », « Excel ; Word »)
+MOTIF_SEPARATEURS_LIBELLE = re.compile(r"[,;|]")
+
+
+def normaliser(texte: str) -> str:
+    """Minuscules sans accents, réduit à une suite de mots séparés par des espaces"""
+    texte = str(texte).lower()
+    if not texte.isascii():
+        # Décomposition puis suppression des accents ; œ et æ n'ont pas de décomposition
+        texte = texte.replace("œ", "oe").replace("æ", "ae")
+        texte = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode("ascii")
+    return " ".join(MOTIF_MOT.findall(texte))
+
+
+def termes_cv(cv_dict: Dict[str, Any]) -> Dict[str, str]:
+    """Termes du CV comparés aux offres : terme normalisé -> libellé d'origine"""
+    termes = {}
+    for champ in ("competences_techniques", "langues", "certifications"):
+        for libelle in cv_dict.get(champ) or []:
+            for partie in MOTIF_SEPARATEURS_LIBELLE.split(MOTIF_PARENTHESES.sub("", str(libelle))):
+                partie = partie.strip()
+                terme = normaliser(partie)
+                if terme:
+                    termes.setdefault(terme, partie)
+    return termes
+
+
+def score_local(cv_dict: Dict[str, Any], offre: Dict[str, Any], termes: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Score déterministe de compatibilité (0-100) calculé sans appel LLM, à partir des
+    compétences, langues et certifications du CV retrouvées dans le texte de l'offre.
+    Un score faible, même nul, passe en basse priorité ; seuls les scores sous SEUIL_REJET sont écartés.
+    `termes` (résultat de termes_cv) évite de les recalculer pour chaque offre d'une liste.
+    Retourne None si le CV ne contient aucun terme exploitable.
+    """
+    if termes is None:
+        termes = termes_cv(cv_dict)
+    if not termes:
+        return None
+
+    # Espaces de bordure : un terme n'est trouvé que s'il correspond à des mots entiers
+    texte = f" {normaliser(' '.join(str(offre.get(champ) or '') for champ in CHAMPS_OFFRE))} "
+    communs = [libelle for terme, libelle in termes.items() if f" {terme} " in texte]
+
+    score = min(100, 100 * len(communs) // SATURATION)
+    if score < SEUIL_REJET:
+        decision = DECISION_REJET
+    elif score < SEUIL_PRIORITE:
+        decision = DECISION_BASSE_PRIORITE
+    else:
+        decision = DECISION_NORMALE
+
+    return {"score": score, "communs": communs, "decision": decision}
@@ -0,0 +1,122 @@
+# utils/rate_limiter.py
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import time
+from typing import Dict, Optional
+
+# Priorités des requêtes (plus la valeur est petite, plus la requête passe tôt)
+PRIORITE_INTERACTIVE = 0  # Commandes lancées par un utilisateur qui attend la réponse
+PRIORITE_ARRIERE_PLAN = 10  # Travaux en tâche de fond (pré-calculs, traitements par lots)
+
+# Quotas par défaut (requêtes et tokens par minute), surchargeables par variables d'environnement
+QUOTAS_PAR_DEFAUT = {
+    "mistral": {"rpm": 60, "tpm": 500000},
+    "gemini": {"rpm": 60, "tpm": 1000000},
+}
+
+
+class LimiteurDebit:
+    """
+    Limiteur de débit à double seau à jetons (requêtes/minute et tokens/minute)
+    avec file d'attente par priorité.
+    """
+
+    def __init__(self, nom: str, requetes_par_minute: float, tokens_par_minute: float):
+        self.nom = nom
+        self.capacite_requetes = float(requetes_par_minute)
+        self.capacite_tokens = float(tokens_par_minute)
+        self.requetes = self.capacite_requetes
+        self.tokens = self.capacite_tokens
+        self._derniere_maj = time.monotonic()
+        self._pause_jusqua = 0.0
+        self._file = []
+        self._ordre = itertools.count()
+        self._reveil = None
+
+    @property
+    def profondeur(self) -> int:
+        """Nombre de requêtes en attente d'un créneau"""
+        return sum(1 for _, _, future, _ in self._file if not future.done())
+
+    def _recharger(self) -> None:
+        maintenant = time.monotonic()
+        ecoule = maintenant - self._derniere_maj
+        self._derniere_maj = maintenant
+        self.requetes = min(self.capacite_requetes, self.requetes + ecoule * self.capacite_requetes / 60)
+        self.tokens = min(self.capacite_tokens, self.tokens + ecoule * self.capacite_tokens / 60)
+
+    async def acquerir(self, tokens_estimes: int = 0, priorite: int = PRIORITE_INTERACTIVE) -> None:
+        """Attend qu'un créneau soit disponible pour une requête de `tokens_estimes` tokens"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._file, (priorite, next(self._ordre), future, tokens_estimes))
+        self._traiter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # La requête annulée est ignorée par _traiter ; on relance le traitement de la file
+            self._traiter()
+            raise
+
+    def _traiter(self) -> None:
+        """Libère les requêtes en tête de file tant que les seaux le permettent"""
+        if self._reveil is not None:
+            self._reveil.cancel()
+            self._reveil = None
+
+        self._recharger()
+        while self._file:
+            _, _, future, tokens_estimes = self._file[0]
+            if future.done():
+                heapq.heappop(self._file)
+                continue
+
+            attente = self._pause_jusqua - time.monotonic()
+            if attente <= 0:
+                # Une requête plus grosse que le seau ne doit pas bloquer la file indéfiniment
+                cout = min(tokens_estimes, self.capacite_tokens)
+                if self.requetes >= 1 and self.tokens >= cout:
+                    self.requetes -= 1
+                    self.tokens -= cout
+                    heapq.heappop(self._file)
+                    future.set_result(None)
+                    continue
+                attente = max(
+                    (1 - self.requetes) * 60 / self.capacite_requetes,
+                    (cout - self.tokens) * 60 / self.capacite_tokens,
+                )
+
+            self._reveil = asyncio.get_running_loop().call_later(max(attente, 0.01), self._traiter)
+            return
+
+    def signaler_limite(self, delai: float) -> None:
+        """Suspend toutes les requêtes pendant `delai` secondes (réponse 429 du fournisseur)"""
+        self._pause_jusqua = max(self._pause_jusqua, time.monotonic() + delai)
+        self.requetes = 0.0
+
+    def ajuster_tokens(self, tokens_reels: int, tokens_estimes: int) -> None:
+        """Corrige le seau de tokens avec la consommation réelle renvoyée par l'API"""
+        self.tokens -= tokens_reels - tokens_estimes
+
+
+# Limiteurs partagés par tout le processus : (fournisseur, empreinte de la clé API) -> limiteur
+_limiteurs: Dict[tuple, LimiteurDebit] = {}
+
+
+def get_limiteur(fournisseur: str, api_key: Optional[str] = None) -> LimiteurDebit:
+    """Récupère (ou crée) le limiteur associé à un fournisseur et une clé API"""
+    empreinte_cle = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+    cle = (fournisseur, empreinte_cle)
+    if cle not in _limiteurs:
+        quotas = QUOTAS_PAR_DEFAUT.get(fournisseur, {"rpm": 60, "tpm": 100000})
+        rpm = float(os.getenv(f"{fournisseur.upper()}_RPM", quotas["rpm"]))
+        tpm = float(os.getenv(f"{fournisseur.upper()}_TPM", quotas["tpm"]))
+        _limiteurs[cle] = LimiteurDebit(f"{fournisseur}:{empreinte_cle}", rpm, tpm)
+    return _limiteurs[cle]
+
+
+def profondeur_files() -> Dict[str, int]:
+    """Nombre de requêtes en attente pour chaque limiteur"""
+    return {limiteur.nom: limiteur.profondeur for limiteur in _limiteurs.values()}
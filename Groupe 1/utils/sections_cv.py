@@ -0,0 +1,61 @@
+# utils/sections_cv.py
+import re
+from typing import Dict
+from utils.prefiltre import normaliser
+
+# Sections extraites séparément et champs du CV structuré dont chacune a la charge
+CHAMPS_SECTIONS = {
+    "contact": ("prenom_nom", "email", "telephone", "linkedin", "github"),
+    "formation": ("formation",),
+    "experience": ("experience",),
+    "competences": ("competences_techniques", "soft_skills", "certifications"),
+    "langues": ("langues",),
+}
+
+# Titres de section reconnus (texte normalisé : minuscules sans accents).
+# Projets et publications sont rattachés à l'expérience, centres d'intérêt et qualités aux compétences.
+MOTIFS_TITRES = {
+    "formation": re.compile(r"^(formations?|education|etudes|cursus|diplomes?|parcours (academique|universitaire|scolaire))\b"),
+    "experience": re.compile(r"^(experiences?|parcours professionnel|emplois?|stages?|projets?|publications?|work experience|employment)\b"),
+    "competences": re.compile(r"^(competences?|skills|outils|logiciels|informatique|savoir faire|qualites|certifications?|centres? d interet|interets|loisirs|hobbies)\b"),
+    "langues": re.compile(r"^(langues?|languages?)\b"),
+    "contact": re.compile(r"^(contact|coordonnees|informations personnelles|profil)\b"),
+}
+
+# Un titre de section est une ligne courte
+MOTS_MAX_TITRE = 5
+LIGNES_CONTACT_PAR_DEFAUT = 8  # Début du CV envoyé comme section contact si aucune n'est détectée
+
+
+def section_du_titre(ligne: str):
+    """Section annoncée par une ligne de titre, None si la ligne n'est pas un titre"""
+    if len(ligne) > 60:
+        return None
+    normalisee = normaliser(ligne)
+    if not normalisee or len(normalisee.split()) > MOTS_MAX_TITRE:
+        return None
+    for section, motif in MOTIFS_TITRES.items():
+        if motif.match(normalisee):
+            return section
+    return None
+
+
+def decouper_sections(texte: str) -> Dict[str, str]:
+    """
+    Découpe le texte d'un CV selon ses titres de section (contact, formation, expérience,
+    compétences, langues). Le texte précédant le premier titre est rattaché au contact.
+    Retourne section -> texte (sections absentes omises).
+    """
+    lignes_par_section = {}
+    courante = "contact"
+    for ligne in texte.split("\n"):
+        section = section_du_titre(ligne.strip())
+        if section:
+            courante = section
+        lignes_par_section.setdefault(courante, []).append(ligne)
+
+    sections = {section: "\n".join(lignes).strip() for section, lignes in lignes_par_section.items()}
+    if not sections.get("contact"):
+        # Nom et coordonnées figurent presque toujours en tête du CV
+        sections["contact"] = "\n".join(texte.strip().split("\n")[:LIGNES_CONTACT_PAR_DEFAUT])
+    return {section: contenu for section, contenu in sections.items() if contenu}
@@ -0,0 +1,80 @@
+# utils/speculation.py
+import asyncio
+import os
+from collections import Counter
+from typing import Awaitable, Optional
+from utils.disjoncteur import get_disjoncteur
+from utils.metriques import definir_commande
+from utils.rate_limiter import get_limiteur
+
+# Budget des travaux spéculatifs (lancés avant que l'utilisateur ne les demande)
+SPECULATION_ACTIVE = os.getenv("SPECULATION_ACTIVE", "1") != "0"  # 0 : aucun travail spéculatif
+SPECULATIONS_MAX = int(os.getenv("SPECULATIONS_MAX", "4"))  # Tâches spéculatives simultanées
+FILE_MAX_SPECULATION = int(os.getenv("SPECULATION_FILE_MAX", "3"))  # Requêtes en attente au-delà desquelles le fournisseur est jugé chargé
+
+# Tâches spéculatives en cours et compteurs (lancées, utilisées, annulées, refusées)
+_taches = set()
+statistiques = Counter()
+
+
+def refus_speculation(fournisseur: str, modele: str, api_key: Optional[str]) -> Optional[str]:
+    """Raison pour laquelle un travail spéculatif ne doit pas être lancé maintenant (None s'il peut l'être)"""
+    if not SPECULATION_ACTIVE:
+        return "spéculation désactivée"
+    if not api_key:
+        return f"clé API {fournisseur} absente"
+    if len(_taches) >= SPECULATIONS_MAX:
+        return "trop de travaux spéculatifs en cours"
+    if get_limiteur(fournisseur, api_key).profondeur > FILE_MAX_SPECULATION:
+        return f"file d'attente {fournisseur} chargée"
+    if not get_disjoncteur(fournisseur, modele).disponible():
+        return f"disjoncteur {fournisseur} ouvert"
+    return None
+
+
+def lancer_speculation(nom: str, travail: Awaitable, fournisseur: str, modele: str,
+                       api_key: Optional[str]) -> Optional[asyncio.Task]:
+    """
+    Lance `travail` en tâche de fond si le budget le permet (sinon le ferme et retourne None).
+    Les appels LLM de la tâche sont attribués à « spéculation_<nom> » dans les métriques.
+    """
+    raison = refus_speculation(fournisseur, modele, api_key)
+    if raison:
+        travail.close()
+        statistiques["refusées"] += 1
+        print(f"⏭️ Spéculation {nom} non lancée : {raison}")
+        return None
+
+    async def executer():
+        definir_commande(f"spéculation_{nom}")
+        return await travail
+
+    tache = asyncio.create_task(executer())
+    _taches.add(tache)
+    tache.add_done_callback(_terminer)
+    statistiques["lancées"] += 1
+    return tache
+
+
+def _terminer(tache: asyncio.Task) -> None:
+    _taches.discard(tache)
+    if tache.cancelled():
+        statistiques["annulées"] += 1
+    elif tache.exception() is not None:
+        # Récupérer l'exception évite l'avertissement « Task exception was never retrieved »
+        statistiques["échouées"] += 1
+
+
+async def attendre_speculation(tache: asyncio.Task):
+    """
+    Attend le résultat d'une tâche spéculative sans l'annuler si la commande qui l'attend est annulée.
+    Lève l'exception de la tâche si elle a échoué.
+    """
+    statistiques["utilisées"] += 1
+    return await asyncio.shield(tache)
+
+
+def annuler_speculation(tache: Optional[asyncio.Task]) -> None:
+    """Annule une tâche spéculative devenue inutile"""
+    if tache is not None and not tache.done():
+        tache.cancel()
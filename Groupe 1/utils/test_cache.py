@@ -0,0 +1,101 @@
+# utils/test_cache.py
+import asyncio
+import pytest
+from utils import cache
+from utils.cache import CacheSQLite, cle_extraction_cv, empreinte, normaliser_texte
+
+
+@pytest.fixture
+def chemin(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_lecture_ecriture_et_compteurs(chemin):
+    c = CacheSQLite("test", chemin)
+    assert c.get("cle") is None
+    c.set("cle", {"nom": "Dupont", "competences": ["Python"]})
+    assert c.get("cle") == {"nom": "Dupont", "competences": ["Python"]}
+    assert c.statistiques() == {"hits": 1, "misses": 1, "taux_succes": 0.5, "entrees": 1}
+
+
+def test_persistance_sur_disque(chemin):
+    CacheSQLite("test", chemin).set("cle", "lettre")
+    assert CacheSQLite("test", chemin).get("cle") == "lettre"
+
+
+def test_expiration(chemin, monkeypatch):
+    c = CacheSQLite("test", chemin, ttl=60)
+    c.set("cle", "analyse")
+    assert c.get("cle") == "analyse"
+    maintenant = cache.time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: maintenant + 61)
+    assert c.get("cle") is None
+    assert c.statistiques()["entrees"] == 0
+
+
+def test_eviction_lru(chemin, monkeypatch):
+    horloge = iter(range(1000))
+    monkeypatch.setattr(cache.time, "time", lambda: next(horloge))
+    c = CacheSQLite("test", chemin, max_entrees=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")  # « b » devient la moins récemment utilisée
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_remplacement_et_suppression(chemin):
+    c = CacheSQLite("test", chemin)
+    c.set("cle", 1)
+    c.set("cle", 2)
+    assert c.get("cle") == 2
+    c.supprimer("cle")
+    assert c.get("cle") is None
+
+
+def test_acces_asynchrones(chemin):
+    async def scenario():
+        c = CacheSQLite("test", chemin)
+        await c.set_async("cle", [1, 2])
+        assert await c.get_async("cle") == [1, 2]
+        assert (await c.statistiques_async())["entrees"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_empreinte_independante_de_l_ordre_des_cles():
+    assert empreinte({"a": 1, "b": 2}) == empreinte({"b": 2, "a": 1})
+    assert empreinte({"a": 1}) != empreinte({"a": 2})
+
+
+def test_cle_extraction_cv():
+    assert normaliser_texte(" Jean  Dupont\n\n") == "Jean Dupont"
+    cle = cle_extraction_cv("Jean  Dupont\nPython", "mistral", "mistral-small-latest", "v1")
+    assert cle == cle_extraction_cv("Jean Dupont Python", "mistral", "mistral-small-latest", "v1")
+    # Changer de modèle ou de prompt invalide l'entrée
+    assert cle != cle_extraction_cv("Jean Dupont Python", "gemini", "mistral-small-latest", "v1")
+    assert cle != cle_extraction_cv("Jean Dupont Python", "mistral", "mistral-small-latest", "v2")
+
+
+def test_contient_sans_compter_ni_rafraichir(chemin, monkeypatch):
+    horloge = iter(range(1000))
+    monkeypatch.setattr(cache.time, "time", lambda: next(horloge))
+    c = CacheSQLite("test", chemin, max_entrees=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.contient("a") and not c.contient("z")
+    assert (c.hits, c.misses) == (0, 0)
+    # « a » n'a pas été rafraîchie par contient() : elle reste la plus ancienne
+    c.set("c", 3)
+    assert not c.contient("a")
+    assert asyncio.run(c.contient_async("c"))
+
+
+def test_contient_entree_expiree(chemin, monkeypatch):
+    c = CacheSQLite("test", chemin, ttl=60)
+    c.set("cle", "analyse")
+    maintenant = cache.time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: maintenant + 61)
+    assert not c.contient("cle")
@@ -0,0 +1,61 @@
+# utils/test_competences.py
+import pytest
+from utils.competences import detecteur_competences
+
+
+def techniques(texte):
+    return detecteur_competences.detecter(texte)["competences_techniques"]
+
+
+def test_variantes_ramenees_a_la_forme_canonique():
+    assert techniques("Maîtrise de MS Excel, ReactJS et Postgres") == ["Excel", "React", "PostgreSQL"]
+
+
+def test_variante_la_plus_longue():
+    assert techniques("Bases : SQL Server, MySQL") == ["SQL Server", "MySQL"]
+
+
+def test_jetons_speciaux():
+    assert techniques("C++, C#, Node.js, CI/CD") == ["C++", "C#", "Node.js", "CI/CD"]
+
+
+def test_categories():
+    trouvees = detecteur_competences.detecter("Permis B, TOEIC 900, esprit d'équipe")
+    assert trouvees["certifications"] == ["Permis B", "TOEIC"]
+    assert trouvees["soft_skills"] == ["Travail d'équipe"]
+
+
+@pytest.mark.parametrize("texte", [
+    "Stage chez SAS Dupont",
+    "Ordinateur portable 8 Go de RAM",
+    "Accueil à l'Office de tourisme de Lyon",
+    "Word of mouth marketing",
+    "Access to the building",
+    "Recommandation : R. Martin",
+    "Complément en vitamine C",
+    "Envoyez votre C.V. à l'adresse",
+    "Rédaction d'un article sur le Go",
+])
+def test_homonymes_hors_contexte(texte):
+    assert techniques(texte) == []
+
+
+@pytest.mark.parametrize("texte, attendu", [
+    ("Python, R et SQL", ["Python", "R", "SQL"]),
+    ("Maîtrise de Word, Excel", ["Word", "Excel"]),
+    ("Langages : Python, C, Go, Rust", ["Python", "C", "Go", "Rust"]),
+])
+def test_homonymes_dans_une_liste(texte, attendu):
+    assert techniques(texte) == attendu
+
+
+def test_homonymes_dans_la_section_competences():
+    assert techniques("COMPÉTENCES\nTableau\nSAS") == ["Tableau", "SAS"]
+    assert techniques("EXPÉRIENCES\nTableau\nSAS") == []
+
+
+def test_forme_canonique():
+    assert detecteur_competences.forme_canonique("MS Excel") == "Excel"
+    assert detecteur_competences.forme_canonique("excel") == "Excel"
+    assert detecteur_competences.forme_canonique("R") == "R"
+    assert detecteur_competences.forme_canonique("Figma") is None
@@ -0,0 +1,78 @@
+# utils/test_disjoncteur.py
+from utils import disjoncteur
+from utils.disjoncteur import ETAT_FERME, ETAT_OUVERT, ETAT_SEMI_OUVERT, Disjoncteur
+
+
+def ouvrir(d):
+    for _ in range(disjoncteur.APPELS_MIN):
+        assert d.autoriser()
+        d.enregistrer(False, 1.0)
+
+
+def test_reste_ferme_sous_le_seuil():
+    d = Disjoncteur("test")
+    for succes in (True, True, True, False, True, False):
+        d.enregistrer(succes, 1.0)
+    assert d.etat == ETAT_FERME
+
+
+def test_ouverture_apres_echecs():
+    d = Disjoncteur("test")
+    ouvrir(d)
+    assert d.etat == ETAT_OUVERT
+    assert not d.disponible()
+    assert not d.autoriser()
+    assert d.reste() > 0
+
+
+def test_appel_lent_compte_comme_echec():
+    d = Disjoncteur("test")
+    for _ in range(disjoncteur.APPELS_MIN):
+        d.enregistrer(True, disjoncteur.LATENCE_LENTE + 1)
+    assert d.etat == ETAT_OUVERT
+
+
+def test_un_seul_appel_de_test(monkeypatch):
+    monkeypatch.setattr(disjoncteur, "DUREE_OUVERTURE", 0)
+    d = Disjoncteur("test")
+    ouvrir(d)
+    assert d.etat == ETAT_SEMI_OUVERT
+    assert d.autoriser()
+    assert not d.autoriser()
+    assert not d.disponible()
+
+
+def test_refermeture_apres_succes(monkeypatch):
+    monkeypatch.setattr(disjoncteur, "DUREE_OUVERTURE", 0)
+    d = Disjoncteur("test")
+    ouvrir(d)
+    assert d.autoriser()
+    d.enregistrer(True, 1.0)
+    assert d.etat == ETAT_FERME
+    # La fenêtre repart de zéro : un échec isolé ne rouvre pas le circuit
+    d.enregistrer(False, 1.0)
+    assert d.etat == ETAT_FERME
+
+
+def test_reouverture_apres_echec_de_l_appel_de_test(monkeypatch):
+    d = Disjoncteur("test")
+    monkeypatch.setattr(disjoncteur, "DUREE_OUVERTURE", 0)
+    ouvrir(d)
+    assert d.autoriser()
+    monkeypatch.setattr(disjoncteur, "DUREE_OUVERTURE", 30)
+    d.enregistrer(False, 1.0)
+    assert d.etat == ETAT_OUVERT
+
+
+def test_abandon_libere_l_appel_de_test(monkeypatch):
+    monkeypatch.setattr(disjoncteur, "DUREE_OUVERTURE", 0)
+    d = Disjoncteur("test")
+    ouvrir(d)
+    assert d.autoriser()
+    d.abandonner()
+    assert d.autoriser()
+
+
+def test_disjoncteur_partage_par_modele():
+    assert disjoncteur.get_disjoncteur("mistral", "test-a") is disjoncteur.get_disjoncteur("mistral", "test-a")
+    assert disjoncteur.get_disjoncteur("mistral", "test-a") is not disjoncteur.get_disjoncteur("mistral", "test-b")
@@ -0,0 +1,129 @@
+# utils/test_documents.py
+import asyncio
+import io
+import pytest
+
+pytest.importorskip("docx")
+PyPDF2 = pytest.importorskip("PyPDF2")
+import docx
+from utils import documents
+from utils.documents import ErreurDocument, charger_document, lire_document, moteur_pdf, pages_pypdf2
+
+
+@pytest.fixture(autouse=True)
+def lecteurs():
+    """Documents déjà lus oubliés et processus de lecture arrêtés après chaque test"""
+    documents._documents_lus.clear()
+    yield
+    documents.fermer_pool_documents()
+
+
+def pdf_vierge(pages):
+    redacteur = PyPDF2.PdfWriter()
+    for _ in range(pages):
+        redacteur.add_blank_page(width=595, height=842)
+    contenu = io.BytesIO()
+    redacteur.write(contenu)
+    return contenu.getvalue()
+
+
+def test_txt_dans_le_budget():
+    assert lire_document("cv.txt", "Jean Dupont\nPython".encode("utf-8")) == ("Jean Dupont\nPython", None, None)
+
+
+def test_budget_de_caracteres(monkeypatch):
+    monkeypatch.setattr(documents, "CARACTERES_MAX_DOCUMENT", 10)
+    texte, _, troncature = lire_document("cv.txt", b"a" * 25)
+    assert texte == "a" * 10
+    assert "10 premiers caractères" in troncature
+
+
+def test_docx_lu_par_paragraphes(monkeypatch):
+    document = docx.Document()
+    for i in range(5):
+        document.add_paragraph(f"Paragraphe {i}")
+    contenu = io.BytesIO()
+    document.save(contenu)
+
+    texte, pages, troncature = lire_document("cv.docx", contenu.getvalue())
+    assert texte.split("\n")[:2] == ["Paragraphe 0", "Paragraphe 1"]
+    assert (pages, troncature) == (None, None)
+    monkeypatch.setattr(documents, "CARACTERES_MAX_DOCUMENT", 20)
+    assert lire_document("cv.docx", contenu.getvalue())[0] == "Paragraphe 0\nParagra"
+
+
+def test_budget_de_pages(monkeypatch):
+    monkeypatch.setattr(documents, "PAGES_MAX_DOCUMENT", 2)
+    texte, pages, troncature = lire_document("cv.pdf", pdf_vierge(5))
+    assert pages == 5
+    assert texte.count(documents.SAUT_DE_PAGE) == 2
+    assert troncature == "Document trop long : seules les 2 premières pages sur 5 ont été lues."
+
+
+def test_pages_extraites_dans_la_limite():
+    nombre, pages = pages_pypdf2(pdf_vierge(3), 2)
+    assert nombre == 3
+    assert list(pages) == ["\n", "\n"]
+
+
+def test_moteur_pdf_inconnu_ou_absent(monkeypatch):
+    moteur_pdf.cache_clear()
+    monkeypatch.setitem(documents.MOTEURS_PDF, "absent", ("module_inexistant_pdf", None))
+    assert moteur_pdf("inconnu") is pages_pypdf2
+    assert moteur_pdf("absent") is pages_pypdf2
+    assert moteur_pdf("pypdf2") is pages_pypdf2
+    moteur_pdf.cache_clear()
+
+
+def test_format_non_supporte_ou_illisible():
+    with pytest.raises(ErreurDocument, match="Format non supporté"):
+        lire_document("cv.odt", b"contenu")
+    with pytest.raises(ErreurDocument, match="Impossible de lire le fichier cv.pdf"):
+        lire_document("cv.pdf", b"pas un PDF")
+
+
+def test_lecture_dans_un_processus_puis_document_reutilise(capsys):
+    async def scenario():
+        premier = await charger_document("cv.txt", "Jean Dupont".encode("utf-8"))
+        second = await charger_document("copie.txt", "Jean Dupont".encode("utf-8"))
+        return premier, second
+
+    premier, second = asyncio.run(scenario())
+    assert premier.texte == second.texte == "Jean Dupont"
+    assert premier.empreinte == second.empreinte
+    assert second.nom_fichier == "copie.txt"
+    assert "Document copie.txt déjà lu" in capsys.readouterr().out
+    assert len(documents._lecteurs) == 1
+
+
+def test_erreur_de_lecture_transmise_par_le_processus():
+    with pytest.raises(ErreurDocument, match="Impossible de lire le fichier cv.pdf"):
+        asyncio.run(charger_document("cv.pdf", b"pas un PDF"))
+    # Le lecteur reste disponible pour le document suivant
+    assert len(documents._lecteurs_libres) == 1
+
+
+def test_fichier_trop_volumineux(monkeypatch):
+    monkeypatch.setattr(documents, "TAILLE_MAX_DOCUMENT", 10)
+    with pytest.raises(ErreurDocument, match="trop volumineux"):
+        asyncio.run(charger_document("cv.txt", b"a" * 11))
+    assert not documents._lecteurs
+
+
+def test_lecteur_bloque_remplace(monkeypatch):
+    lire = documents._Lecteur.lire
+
+    def lecture_bloquee(lecteur, nom_fichier, contenu, delai):
+        raise TimeoutError
+
+    async def scenario():
+        monkeypatch.setattr(documents._Lecteur, "lire", lecture_bloquee)
+        with pytest.raises(ErreurDocument, match="a dépassé"):
+            await charger_document("lent.txt", b"lent")
+        assert not documents._lecteurs
+        # Lecture suivante dans un nouveau processus
+        monkeypatch.setattr(documents._Lecteur, "lire", lire)
+        return await charger_document("cv.txt", b"Jean Dupont")
+
+    assert asyncio.run(scenario()).texte == "Jean Dupont"
+    assert len(documents._lecteurs) == 1
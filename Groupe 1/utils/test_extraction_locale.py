@@ -0,0 +1,31 @@
+# utils/test_extraction_locale.py
+from utils.extraction_locale import extraire_champs_locaux, fusionner_champs_locaux
+
+
+def test_extraction_locale():
+    locaux = extraire_champs_locaux(
+        "Jean Dupont\njean.dupont@mail.fr • 06 12 34 56 78\nlinkedin.com/in/jean-dupont\nCompétences : Python, Docker"
+    )
+    assert locaux["email"] == "jean.dupont@mail.fr"
+    assert locaux["telephone"] == "06 12 34 56 78"
+    assert locaux["linkedin"] == "jean-dupont"
+    assert locaux["github"] == ""
+    assert locaux["competences_techniques"] == ["Python", "Docker"]
+
+
+def test_fusion_avec_les_competences_du_llm():
+    cv_data = {"email": "", "competences_techniques": ["MS Excel", "Figma", "python", " ", None]}
+    locaux = {"email": "jean@mail.fr", "competences_techniques": ["Python", "Excel"]}
+    assert fusionner_champs_locaux(cv_data, locaux) == {
+        "email": "jean@mail.fr",
+        "competences_techniques": ["Python", "Excel", "Figma"],
+    }
+
+
+def test_fusion_garde_la_valeur_du_llm_si_rien_en_local():
+    cv_data = {"telephone": "+33 6 12 34 56 78", "competences_techniques": ["Figma"]}
+    locaux = {"telephone": "", "competences_techniques": []}
+    assert fusionner_champs_locaux(cv_data, locaux) == {
+        "telephone": "+33 6 12 34 56 78",
+        "competences_techniques": ["Figma"],
+    }
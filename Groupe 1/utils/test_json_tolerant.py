@@ -0,0 +1,59 @@
+# utils/test_json_tolerant.py
+import pytest
+from utils.json_tolerant import charger_json, reparer_json
+
+
+def test_json_valide_inchange():
+    assert charger_json('{"nom": "Dupont", "age": 30}') == {"nom": "Dupont", "age": 30}
+
+
+def test_bloc_de_code_et_texte_autour():
+    reponse = 'Voici le résultat :\n```json\n{"score": 80}\n```\nBonne journée'
+    assert charger_json(reponse) == {"score": 80}
+
+
+def test_virgules_finales():
+    assert charger_json('{"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+
+
+def test_guillemets_typographiques():
+    assert charger_json('{“nom”: “Dupont”}') == {"nom": "Dupont"}
+
+
+def test_citation_dans_une_chaine():
+    assert charger_json('{"raison": "le "meilleur" produit"}') == {"raison": 'le "meilleur" produit'}
+
+
+def test_citation_suivie_d_une_virgule():
+    # Le guillemet fermant la citation est suivi d'une virgule mais pas d'une clé : la valeur continue
+    reponse = '{"experience": "Projet "Data", analyse des ventes", "ville": "Paris"}'
+    assert charger_json(reponse) == {"experience": 'Projet "Data", analyse des ventes', "ville": "Paris"}
+
+
+def test_citation_suivie_d_une_virgule_dans_un_tableau():
+    reponse = '["Projet "Data", analyse", "Python"]'
+    assert charger_json(reponse) == ['Projet "Data", analyse', "Python"]
+
+
+def test_retour_a_la_ligne_dans_une_chaine():
+    assert charger_json('{"texte": "ligne 1\nligne 2"}') == {"texte": "ligne 1\nligne 2"}
+
+
+def test_reponse_tronquee_dans_une_chaine():
+    assert charger_json('{"competences": ["Python", "SQ') == {"competences": ["Python", "SQ"]}
+
+
+def test_reponse_tronquee_apres_une_cle():
+    assert charger_json('{"nom": "Dupont", "age":') == {"nom": "Dupont", "age": None}
+
+
+def test_nombre_coupe_non_conserve():
+    # « 8 » peut être le début de « 80 » : l'élément incomplet est retiré
+    assert charger_json('[{"numero": 1, "score": 75}, {"numero": 2, "score": 8') == [
+        {"numero": 1, "score": 75}, {"numero": 2},
+    ]
+
+
+def test_texte_sans_json():
+    with pytest.raises(ValueError):
+        reparer_json("Je ne peux pas répondre.")
@@ -0,0 +1,70 @@
+# utils/test_metriques.py
+import asyncio
+import contextvars
+import pytest
+from utils.metriques import (
+    RESULTAT_SUCCES, cout_estime, definir_commande, ecrire_metriques, enregistrer_appel, resume_metriques,
+    texte_metriques, totaux_commande,
+)
+
+
+def test_cout_estime():
+    assert cout_estime("mistral-small-latest", 1_000_000, 1_000_000) == pytest.approx(0.8)
+    # Variante d'un modèle tarifé : prix du modèle de base
+    assert cout_estime("gemini-1.5-flash-latest", 1_000_000, 0) == pytest.approx(0.075)
+    assert cout_estime("modele-inconnu", 1000, 1000) == 0.0
+
+
+def test_commande_propagee_aux_taches():
+    async def commande():
+        definir_commande("test_propagation")
+        await asyncio.create_task(appel())
+
+    async def appel():
+        enregistrer_appel("gemini", "gemini-1.5-pro", 1.0, RESULTAT_SUCCES, 100, 50)
+
+    contextvars.copy_context().run(asyncio.run, commande())
+    assert totaux_commande("test_propagation")["appels"] == 1
+
+
+def test_resume_par_commande():
+    enregistrer_appel("mistral", "mistral-small-latest", 1.0, RESULTAT_SUCCES, 1000, 200, commande="test_resume")
+    enregistrer_appel("mistral", "mistral-small-latest", 3.0, "erreur 503", reessais=2, commande="test_resume")
+    stats = resume_metriques()["test_resume"]
+    assert (stats["appels"], stats["erreurs"], stats["reessais"]) == (2, 1, 2)
+    assert (stats["tokens_prompt"], stats["tokens_reponse"]) == (1000, 200)
+    assert stats["latence_p50"] == 3.0
+    assert stats["modeles"] == ["mistral:mistral-small-latest"]
+    assert sum(stats["classes"]) == 2
+
+
+def test_fenetre_glissante():
+    enregistrer_appel("gemini", "gemini-1.5-pro", 1.0, commande="test_fenetre")
+    assert "test_fenetre" in resume_metriques(fenetre=60)
+    assert "test_fenetre" not in resume_metriques(fenetre=-1)
+
+
+def test_totaux_cumules():
+    avant = totaux_commande("test_totaux")
+    enregistrer_appel("gemini", "gemini-1.5-pro", 1.0, RESULTAT_SUCCES, 1_000_000, 0, commande="test_totaux")
+    enregistrer_appel("mistral", "mistral-large-latest", 2.0, "erreur 429", reessais=1, commande="test_totaux")
+    totaux = totaux_commande("test_totaux")
+    assert avant["appels"] == 0
+    assert (totaux["appels"], totaux["erreurs"], totaux["reessais"], totaux["tokens_prompt"]) == (2, 1, 1, 1_000_000)
+    assert totaux["cout"] == pytest.approx(1.25)
+
+
+def test_export_prometheus(tmp_path):
+    enregistrer_appel("gemini", "gemini-1.5-flash", 1.5, RESULTAT_SUCCES, 10, 5, commande="test_export")
+    texte = texte_metriques()
+    etiquettes = 'commande="test_export",fournisseur="gemini",modele="gemini-1.5-flash"'
+    assert f'llm_appels_total{{{etiquettes},resultat="succès"}} 1' in texte
+    assert f'llm_tokens_total{{{etiquettes},type="prompt"}} 10' in texte
+    # Histogramme cumulatif : l'appel de 1,5 s n'entre pas dans la classe ≤ 1 s
+    assert f'llm_latence_secondes_bucket{{{etiquettes},le="1"}} 0' in texte
+    assert f'llm_latence_secondes_bucket{{{etiquettes},le="2"}} 1' in texte
+    assert f'llm_latence_secondes_bucket{{{etiquettes},le="+Inf"}} 1' in texte
+
+    chemin = tmp_path / "metriques.prom"
+    ecrire_metriques(str(chemin))
+    assert chemin.read_text(encoding="utf-8").startswith("# TYPE llm_appels_total counter")
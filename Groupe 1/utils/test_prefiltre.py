@@ -0,0 +1,66 @@
+# utils/test_prefiltre.py
+from utils import prefiltre
+from utils.prefiltre import (
+    DECISION_BASSE_PRIORITE, DECISION_NORMALE, DECISION_REJET, SATURATION, normaliser, score_local, termes_cv,
+)
+
+CV = {
+    "competences_techniques": ["Python", "C++", "Power BI", "SQL"],
+    "langues": ["Anglais (C1)"],
+    "certifications": ["TOEIC"],
+}
+
+
+def test_normaliser():
+    assert normaliser("Développeur C++ / Node.js – Œuvre") == "developpeur c++ node.js oeuvre"
+
+
+def test_termes_cv():
+    assert termes_cv(CV) == {
+        "python": "Python", "c++": "C++", "power bi": "Power BI", "sql": "SQL", "anglais": "Anglais", "toeic": "TOEIC",
+    }
+
+
+def test_cv_sans_terme():
+    assert score_local({"competences_techniques": []}, {"titre": "Data analyst"}) is None
+
+
+def test_mots_entiers():
+    # « SQL » ne doit pas être trouvé dans « NoSQL », ni « Python » dans « Pythonista »
+    resultat = score_local(CV, {"description": "NoSQL, Pythonista"})
+    assert (resultat["score"], resultat["communs"]) == (0, [])
+
+
+def test_aucun_terme_commun_en_basse_priorite():
+    # Compétences formulées autrement : l'offre n'est pas écartée, le LLM tranchera
+    cv = {"competences_techniques": ["Analyse de données"]}
+    resultat = score_local(cv, {"titre": "Data analyst", "missions": "Data analysis"})
+    assert resultat == {"score": 0, "communs": [], "decision": DECISION_BASSE_PRIORITE}
+
+
+def test_seuil_de_rejet_configurable(monkeypatch):
+    monkeypatch.setattr(prefiltre, "SEUIL_REJET", 10)
+    assert score_local(CV, {"titre": "Comptable"})["decision"] == DECISION_REJET
+    assert score_local(CV, {"titre": "Développeur Python"})["decision"] == DECISION_BASSE_PRIORITE
+
+
+def test_libelles_regroupant_plusieurs_competences():
+    cv = {"competences_techniques": ["Python, SQL", "Excel ; Word (avancé)", "CI/CD"]}
+    assert termes_cv(cv) == {"python": "Python", "sql": "SQL", "excel": "Excel", "word": "Word", "ci cd": "CI/CD"}
+    assert score_local(cv, {"missions": "Requêtes SQL"})["communs"] == ["SQL"]
+
+
+def test_score_et_decisions():
+    resultat = score_local(CV, {"titre": "Data analyst", "profil_recherche": "Maîtrise de SQL"})
+    assert resultat["communs"] == ["SQL"]
+    assert resultat["score"] == 100 // SATURATION
+    assert resultat["decision"] == DECISION_BASSE_PRIORITE
+
+    resultat = score_local(CV, {"missions": "Python, C++, SQL, Power BI", "description": "anglais courant, TOEIC"})
+    assert resultat["score"] == 100
+    assert resultat["decision"] == DECISION_NORMALE
+
+
+def test_termes_precalcules():
+    offre = {"titre": "Développeur Python"}
+    assert score_local({}, offre, termes=termes_cv(CV)) == score_local(CV, offre)
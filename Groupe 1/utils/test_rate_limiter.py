@@ -0,0 +1,81 @@
+# utils/test_rate_limiter.py
+import asyncio
+from utils.rate_limiter import PRIORITE_ARRIERE_PLAN, PRIORITE_INTERACTIVE, LimiteurDebit, get_limiteur
+
+
+def test_passe_immediatement_dans_le_quota():
+    async def scenario():
+        limiteur = LimiteurDebit("test", 60, 10000)
+        await asyncio.wait_for(limiteur.acquerir(1000), 0.5)
+        await asyncio.wait_for(limiteur.acquerir(1000), 0.5)
+        assert limiteur.tokens < 8100
+        assert limiteur.profondeur == 0
+
+    asyncio.run(scenario())
+
+
+def test_priorite_interactive_servie_en_premier():
+    async def scenario():
+        # Une requête toutes les 50 ms, seau vidé au départ
+        limiteur = LimiteurDebit("test", 1200, 1000000)
+        limiteur.requetes = 0
+        ordre = []
+
+        async def demander(nom, priorite):
+            await limiteur.acquerir(0, priorite)
+            ordre.append(nom)
+
+        taches = [asyncio.create_task(demander(f"fond {i}", PRIORITE_ARRIERE_PLAN)) for i in range(2)]
+        await asyncio.sleep(0)
+        taches.append(asyncio.create_task(demander("interactive", PRIORITE_INTERACTIVE)))
+        await asyncio.sleep(0)
+        assert limiteur.profondeur == 3
+        await asyncio.wait_for(asyncio.gather(*taches), 2)
+        assert ordre == ["interactive", "fond 0", "fond 1"]
+
+    asyncio.run(scenario())
+
+
+def test_requete_plus_grosse_que_le_seau():
+    async def scenario():
+        limiteur = LimiteurDebit("test", 60, 1000)
+        await asyncio.wait_for(limiteur.acquerir(5000), 0.5)
+
+    asyncio.run(scenario())
+
+
+def test_annulation_libere_la_file():
+    async def scenario():
+        limiteur = LimiteurDebit("test", 1200, 1000000)
+        limiteur.requetes = 0
+        annulee = asyncio.create_task(limiteur.acquerir(0, PRIORITE_INTERACTIVE))
+        suivante = asyncio.create_task(limiteur.acquerir(0, PRIORITE_ARRIERE_PLAN))
+        await asyncio.sleep(0)
+        annulee.cancel()
+        await asyncio.wait_for(suivante, 1)
+        assert annulee.cancelled()
+        assert limiteur.profondeur == 0
+
+    asyncio.run(scenario())
+
+
+def test_signaler_limite_suspend_les_requetes():
+    async def scenario():
+        limiteur = LimiteurDebit("test", 6000, 1000000)
+        limiteur.signaler_limite(0.2)
+        debut = asyncio.get_running_loop().time()
+        await asyncio.wait_for(limiteur.acquerir(0), 2)
+        assert asyncio.get_running_loop().time() - debut >= 0.15
+
+    asyncio.run(scenario())
+
+
+def test_ajuster_tokens():
+    limiteur = LimiteurDebit("test", 60, 10000)
+    limiteur.ajuster_tokens(1500, 1000)
+    assert limiteur.tokens == 9500
+
+
+def test_limiteur_partage_par_cle():
+    assert get_limiteur("mistral", "cle-test") is get_limiteur("mistral", "cle-test")
+    assert get_limiteur("mistral", "cle-test") is not get_limiteur("mistral", "autre-cle")
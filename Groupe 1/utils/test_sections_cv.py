@@ -0,0 +1,40 @@
+# utils/test_sections_cv.py
+from utils.sections_cv import LIGNES_CONTACT_PAR_DEFAUT, decouper_sections, section_du_titre
+
+
+def test_titres_reconnus():
+    assert section_du_titre("FORMATION") == "formation"
+    assert section_du_titre("Expériences professionnelles") == "experience"
+    assert section_du_titre("Compétences techniques") == "competences"
+    assert section_du_titre("Centres d'intérêt") == "competences"
+    assert section_du_titre("Langues :") == "langues"
+    assert section_du_titre("Coordonnées") == "contact"
+
+
+def test_lignes_qui_ne_sont_pas_des_titres():
+    assert section_du_titre("") is None
+    assert section_du_titre("Technical Skills") is None
+    assert section_du_titre("Formation continue des équipes commerciales au nouvel outil CRM") is None
+    assert section_du_titre("Stage de six mois en analyse de données chez ACME") is None
+
+
+def test_decoupage():
+    texte = "Jean Dupont\njean@mail.fr\nFORMATION\nMaster MIAGE\nEXPÉRIENCES\nStage Data\nLANGUES\nAnglais (B2)"
+    assert decouper_sections(texte) == {
+        "contact": "Jean Dupont\njean@mail.fr",
+        "formation": "FORMATION\nMaster MIAGE",
+        "experience": "EXPÉRIENCES\nStage Data",
+        "langues": "LANGUES\nAnglais (B2)",
+    }
+
+
+def test_titre_non_reconnu_rattache_a_la_section_precedente():
+    sections = decouper_sections("Jean Dupont\nExpériences\nStage Data\nTechnical Skills\nPython")
+    assert sections["experience"] == "Expériences\nStage Data\nTechnical Skills\nPython"
+    assert "competences" not in sections
+
+
+def test_contact_par_defaut_en_tete_du_cv():
+    lignes = [f"ligne {i}" for i in range(12)]
+    sections = decouper_sections("Formation\n" + "\n".join(lignes))
+    assert sections["contact"].split("\n") == ["Formation"] + lignes[:LIGNES_CONTACT_PAR_DEFAUT - 1]
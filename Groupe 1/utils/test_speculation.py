@@ -0,0 +1,77 @@
+# utils/test_speculation.py
+import asyncio
+import pytest
+from utils import speculation
+from utils.metriques import enregistrer_appel, totaux_commande
+from utils.speculation import annuler_speculation, attendre_speculation, lancer_speculation
+
+
+async def travail(resultat="résultat", duree=0.01):
+    await asyncio.sleep(duree)
+    return resultat
+
+
+def test_speculation_refusee_sans_cle_ou_desactivee(monkeypatch):
+    async def scenario():
+        refusees = speculation.statistiques["refusées"]
+        assert lancer_speculation("test", travail(), "mistral", "mistral-small-latest", None) is None
+        monkeypatch.setattr(speculation, "SPECULATION_ACTIVE", False)
+        assert lancer_speculation("test", travail(), "mistral", "mistral-small-latest", "cle-test") is None
+        assert speculation.statistiques["refusées"] == refusees + 2
+
+    asyncio.run(scenario())
+
+
+def test_nombre_de_speculations_borne(monkeypatch):
+    monkeypatch.setattr(speculation, "SPECULATIONS_MAX", 1)
+
+    async def scenario():
+        premiere = lancer_speculation("test", travail(duree=1), "mistral", "mistral-small-latest", "cle-test")
+        assert premiere is not None
+        await asyncio.sleep(0)
+        assert lancer_speculation("test", travail(), "mistral", "mistral-small-latest", "cle-test") is None
+        annuler_speculation(premiere)
+        await asyncio.wait([premiere])
+        assert lancer_speculation("test", travail(), "mistral", "mistral-small-latest", "cle-test") is not None
+
+    asyncio.run(scenario())
+
+
+def test_resultat_adopte_et_attribue_a_la_speculation():
+    async def scenario():
+        async def appel():
+            enregistrer_appel("mistral", "mistral-small-latest", 0.1)
+            return "CV extrait"
+
+        tache = lancer_speculation("adoption", appel(), "mistral", "mistral-small-latest", "cle-test")
+        assert await attendre_speculation(tache) == "CV extrait"
+
+    asyncio.run(scenario())
+    assert totaux_commande("spéculation_adoption")["appels"] == 1
+
+
+def test_annulation_de_la_commande_n_annule_pas_la_speculation():
+    async def scenario():
+        tache = lancer_speculation("test", travail(duree=0.05), "mistral", "mistral-small-latest", "cle-test")
+        commande = asyncio.create_task(attendre_speculation(tache))
+        await asyncio.sleep(0.01)
+        commande.cancel()
+        assert await tache == "résultat"
+
+    asyncio.run(scenario())
+
+
+def test_speculation_annulee_comptee():
+    async def scenario():
+        annulees = speculation.statistiques["annulées"]
+        tache = lancer_speculation("test", travail(duree=1), "mistral", "mistral-small-latest", "cle-test")
+        await asyncio.sleep(0)
+        annuler_speculation(tache)
+        with pytest.raises(asyncio.CancelledError):
+            await tache
+        assert speculation.statistiques["annulées"] == annulees + 1
+        # Tâche terminée ou absente : rien à faire
+        annuler_speculation(tache)
+        annuler_speculation(None)
+
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+# utils/test_texte.py
+from utils.texte import SAUT_DE_PAGE, compacter_texte_cv, estimer_tokens
+
+
+def test_texte_vide():
+    assert compacter_texte_cv("") == ""
+
+
+def test_espaces_lignes_vides_et_pagination():
+    texte = "Jean   Dupont\n\n   \n•\nPage 1/2\nDéveloppeur\t Python\n- 2 -"
+    assert compacter_texte_cv(texte) == "Jean Dupont\nDéveloppeur Python"
+
+
+def test_cesures_et_ligatures():
+    assert compacter_texte_cv("Chef de pro-\njet, ﬁnance") == "Chef de projet, finance"
+
+
+def test_en_tete_et_pied_de_page_repetes():
+    page_1 = "CV – Jean Dupont – 1\nEXPÉRIENCES\nStage Data\njean@mail.fr – Lyon"
+    page_2 = "CV – Jean Dupont – 2\nFORMATION\nMaster MIAGE\njean@mail.fr – Lyon"
+    assert compacter_texte_cv(page_1 + SAUT_DE_PAGE + page_2).split("\n") == [
+        "CV – Jean Dupont – 1", "EXPÉRIENCES", "Stage Data", "jean@mail.fr – Lyon",
+        "FORMATION", "Master MIAGE",
+    ]
+
+
+def test_ligne_repetee_hors_bordure_conservee():
+    # Une ville ou un employeur cité plusieurs fois n'est pas un en-tête
+    page_1 = "Jean Dupont\nEXPÉRIENCES\nStage Data\nParis\nMissions\nAnalyse\nReporting\nFin"
+    page_2 = "FORMATION\nMaster\nUniversité\nParis\nMention\nBien\nProjet\nSoutenance"
+    assert compacter_texte_cv(page_1 + SAUT_DE_PAGE + page_2).count("Paris") == 2
+
+
+def test_ligne_repetee_sans_saut_de_page_conservee():
+    texte = "Stage Capgemini\nParis\nAlternance Capgemini\nParis"
+    assert compacter_texte_cv(texte) == texte
+
+
+def test_estimer_tokens():
+    assert estimer_tokens("") == 1
+    assert estimer_tokens("a" * 400) == 100
+
+
+def test_gain_affiche(capsys):
+    compacter_texte_cv("Jean   Dupont\n\n\n\nPage 1/2\n" + "Développeur Python\n" * 3)
+    assert "Texte du CV compacté" in capsys.readouterr().out
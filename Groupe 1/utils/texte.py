@@ -0,0 +1,97 @@
+# utils/texte.py
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Set, Tuple
+
+# Ligatures fréquentes dans le texte extrait des PDF
+LIGATURES = {
+    "ﬀ": "ff", "ﬁ": "fi", "ﬂ": "fl", "ﬃ": "ffi", "ﬄ": "ffl", "ﬆ": "st",
+}
+
+# Lignes de pagination (« Page 2/3 », « 2 / 3 », « - 2 - », « 2 »)
+MOTIF_PAGINATION = re.compile(r"^(page\s*)?[-–—]?\s*\d{1,3}\s*([/|]\s*\d{1,3}|sur\s+\d{1,3})?\s*[-–—]?$", re.IGNORECASE)
+
+# Lignes sans contenu (puces isolées, séparateurs)
+MOTIF_LIGNE_VIDE = re.compile(r"^[\s•·●▪■◦○\-–—_=*|.]*$")
+
+# Mot coupé en fin de ligne (« dévelop-\npement »)
+MOTIF_CESURE = re.compile(r"(\w)-[ \t]*\n\s*([a-zà-ÿ])")
+
+# Séparateur de pages inséré par utils/documents.py entre les pages des PDF
+SAUT_DE_PAGE = "\f"
+
+# En-têtes et pieds de page : lignes répétées parmi les premières ou dernières lignes de plusieurs pages
+LIGNES_BORDURE_PAGE = 3
+
+# Les lignes plus courtes ne sont pas dédoublonnées (« R », « C++ », « B2 »...)
+LONGUEUR_MIN_DEDOUBLONNAGE = 4
+
+
+def estimer_tokens(texte: str) -> int:
+    """Estimation grossière du nombre de tokens d'un texte (~4 caractères par token)"""
+    return max(1, len(texte or "") // 4)
+
+
+def _positions_bordure(page: List[str], i: int) -> Set[Tuple]:
+    """
+    Positions d'une ligne comptée depuis le haut et le bas de sa page, avec son texte
+    (chiffres ignorés : « CV – Jean Dupont – 2 » ≈ « ... – 3 »). Vide hors des bordures de la page.
+    """
+    ligne = page[i]
+    if len(ligne) < LONGUEUR_MIN_DEDOUBLONNAGE:
+        return set()
+    cle = re.sub(r"\d+", "#", ligne.casefold())
+    positions = set()
+    if i < LIGNES_BORDURE_PAGE:
+        positions.add(("haut", i, cle))
+    if len(page) - 1 - i < LIGNES_BORDURE_PAGE:
+        positions.add(("bas", len(page) - 1 - i, cle))
+    return positions
+
+
+def compacter_texte_cv(texte: str) -> str:
+    """
+    Compacte le texte brut extrait d'un CV avant de l'insérer dans un prompt :
+    normalisation Unicode et des espaces, recollage des césures, suppression des
+    numéros de page, des lignes vides et des en-têtes/pieds de page répétés d'une page à l'autre.
+    Le reste du texte n'est pas dédoublonné : une ville, un employeur ou un diplôme peut
+    légitimement apparaître plusieurs fois.
+    """
+    if not texte:
+        return texte
+
+    avant = estimer_tokens(texte)
+
+    texte = unicodedata.normalize("NFC", texte)
+    for ligature, remplacement in LIGATURES.items():
+        texte = texte.replace(ligature, remplacement)
+    texte = texte.replace("\u00ad", "").replace("\x00", "").replace("\r", "\n")
+    texte = MOTIF_CESURE.sub(r"\1\2", texte)
+
+    pages = []
+    for page in texte.split(SAUT_DE_PAGE):
+        lignes = (" ".join(ligne.split()) for ligne in page.split("\n"))
+        pages.append([ligne for ligne in lignes if not (MOTIF_LIGNE_VIDE.match(ligne) or MOTIF_PAGINATION.match(ligne))])
+
+    # En-têtes et pieds de page : même ligne à la même place en haut ou en bas d'au moins
+    # deux pages ; seule la première occurrence est gardée
+    occurrences = Counter(
+        position for page in pages for position in set().union(*(_positions_bordure(page, i) for i in range(len(page))))
+    )
+    repetees = {position for position, nombre in occurrences.items() if nombre >= 2}
+    deja_vues = set()
+    lignes = []
+    for page in pages:
+        for i, ligne in enumerate(page):
+            positions = _positions_bordure(page, i) & repetees
+            if positions:
+                if positions & deja_vues:
+                    continue
+                deja_vues |= positions
+            lignes.append(ligne)
+
+    resultat = "\n".join(lignes)
+    apres = estimer_tokens(resultat)
+    print(f"🗜️ Texte du CV compacté : {avant} → {apres} tokens estimés (-{100 * (avant - apres) // avant}%)")
+    return resultat
@@ -1,6 +1,16 @@
+import os
+import sys
 import requests
 from docx import Document
 
+# Lecture tolérante du JSON renvoyé par Gemini, partagée avec le bot (Groupe 1/utils/json_tolerant.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Groupe 1"))
+from utils.json_tolerant import charger_json
+
+# Criblage par lot : nombre d'offres évaluées par appel et score minimal de pertinence
+TAILLE_LOT_CRIBLAGE = 15
+SEUIL_PERTINENCE = 70
+
 # --- 1. Fonctions pour générer les prompts ---
 
 def formatter_formation(formation):
@@ -15,7 +25,7 @@ def formatter_experience(experience):
         "\n  ".join(e['details']) for e in experience
     )
 
-def generer_prompt_pertinence(cv_dict, offre_dict):
+def formatter_cv(cv_dict):
     formations = formatter_formation(cv_dict["formation"])
     experiences = formatter_experience(cv_dict["experience"])
     competences = "\n- ".join(cv_dict["competences_techniques"])
@@ -23,7 +33,7 @@ def generer_prompt_pertinence(cv_dict, offre_dict):
     langues = "\n- ".join(cv_dict["langues"])
     certifications = "\n- ".join(cv_dict["certifications"])
 
-    cv_txt = f"""Nom : {cv_dict['prenom_nom']}
+    return f"""Nom : {cv_dict['prenom_nom']}
 Email : {cv_dict['email']}
 Téléphone : {cv_dict['telephone']}
 
@@ -46,6 +56,9 @@ Certifications :
 - {certifications}
 """
 
+def generer_prompt_pertinence(cv_dict, offre_dict):
+    cv_txt = formatter_cv(cv_dict)
+
     offre_txt = f"""Titre : {offre_dict['titre']}
 Entreprise : {offre_dict['entreprise']}
 Lieu : {offre_dict['lieu']}
@@ -73,6 +86,29 @@ Voici un CV et une offre d'emploi. Réponds uniquement par "oui" si le profil co
 {offre_txt}
 """
 
+def generer_prompt_criblage(cv_dict, offres_numerotees):
+    # Le CV n'est envoyé qu'une fois pour tout le lot d'offres
+    offres_txt = "\n\n".join(
+        f"[{numero}] {offre['titre']} – {offre['entreprise']} ({offre['lieu']}, {offre['type_contrat']})\n"
+        f"Missions : {' '.join(offre['missions'].split())}\n"
+        f"Profil : {' '.join(offre['profil_recherche'].split())}"
+        for numero, offre in offres_numerotees
+    )
+
+    return f"""
+Tu es un expert RH.
+
+Voici un CV et {len(offres_numerotees)} offres d'emploi numérotées. Évalue la compatibilité du profil avec chaque offre.
+Réponds uniquement avec un tableau JSON, sans aucun texte autour, contenant un objet par offre :
+[{{"numero": <numéro de l'offre>, "score": <pourcentage de correspondance entre 0 et 100>, "raison": "<une phrase courte>"}}]
+
+--- CV ---
+{formatter_cv(cv_dict)}
+
+--- Offres ---
+{offres_txt}
+"""
+
 def generer_prompt_lettre(cv_dict, offre_dict, infos_perso=None):
     if infos_perso is None:
         infos_perso = {"motivation": "", "lien_entreprise": "", "contraintes": ""}
@@ -259,6 +295,39 @@ def interroger_gemini(prompt):
         print(f"\n❌ Erreur Gemini : {response.status_code}")
         print(response.text)
         return None
+
+def cribler_offres(cv_dict, offres):
+    """Retourne, pour chaque offre, un dictionnaire {"score", "raison"} ou None si l'évaluation a échoué"""
+    offres_numerotees = list(enumerate(offres, start=1))
+    scores = {}
+    for i in range(0, len(offres_numerotees), TAILLE_LOT_CRIBLAGE):
+        lot = offres_numerotees[i:i + TAILLE_LOT_CRIBLAGE]
+        reponse = interroger_gemini(generer_prompt_criblage(cv_dict, lot))
+        if not reponse:
+            continue
+        try:
+            tableau = charger_json(reponse)
+        except ValueError as e:
+            print(f"⚠️ Réponse de criblage illisible : {e}")
+            continue
+        if isinstance(tableau, dict):
+            # Tableau renvoyé dans un objet ({"scores": [...]})
+            tableau = next((valeur for valeur in tableau.values() if isinstance(valeur, list)), None)
+        if not isinstance(tableau, list):
+            print("⚠️ Réponse de criblage illisible : tableau de scores attendu")
+            continue
+        numeros = {numero for numero, _ in lot}
+        for element in tableau:
+            # Un élément incomplet (réponse tronquée) n'invalide pas le reste du lot
+            try:
+                numero = int(element["numero"])
+                score = max(0, min(100, int(float(element["score"]))))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if numero in numeros:
+                scores[numero] = {"score": score, "raison": str(element.get("raison", "")).strip()}
+    return [scores.get(numero) for numero, _ in offres_numerotees]
+
 # --- 5. Interaction utilisateur ---
 def demander_infos_complementaires():
     print("\n📝 Tu peux maintenant ajouter quelques éléments personnalisés à intégrer dans ta lettre (facultatif).")
@@ -272,12 +341,15 @@ def demander_infos_complementaires():
     }
 
 # --- 6. Traitement principal ---
-for offre in liste_offres:
+# Toutes les offres sont évaluées en un appel par lot de TAILLE_LOT_CRIBLAGE offres
+scores = cribler_offres(cv_dict, liste_offres)
+
+for offre, score in zip(liste_offres, scores):
     print(f"\n🔍 Traitement de l'offre chez {offre['entreprise']}...")
-    prompt_pertinence = generer_prompt_pertinence(cv_dict, offre)
-    reponse = interroger_gemini(prompt_pertinence)
+    if score:
+        print(f"📊 Score : {score['score']}/100 – {score['raison']}")
 
-    if reponse and reponse.lower() == "oui":
+    if score and score["score"] >= SEUIL_PERTINENCE:
         print("✅ Profil pertinent. Génération de la lettre...")
         infos_perso = demander_infos_complementaires()
         prompt_lettre = generer_prompt_lettre(cv_dict, offre, infos_perso)
@@ -19,8 +19,6 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 
 sys.excepthook = handle_exception
 
-print("\n=== DÉMARRAGE DU BOT PRINCIPAL ===")
-
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -34,6 +32,10 @@ from extract_cv import setup_cv_mistral_command, setup_cv_gemini_command, setup_
 from match_cv_offer import setup_compare_command
 from generate_cover_letter import setup_letter_command
 from utils.helper import UserData, user_data
+from llm_client import fermer_sessions
+from utils.metriques import definir_commande, ecrire_metriques
+from utils.documents import fermer_pool_documents
+from metriques_discord import setup_metriques_command
 # Import des nouvelles fonctionnalités du groupe 5
 from partieLLM_discord import setup_partillm_commands
 # Import des commandes de parsing de CV (version originale)
@@ -47,7 +49,26 @@ except ImportError:
 # Configuration du bot
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+class JobHunterTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Associer les appels LLM déclenchés par la commande à son nom (métriques)
+        if interaction.command is not None:
+            definir_commande(interaction.command.name)
+        return True
+
+class JobHunterBot(commands.Bot):
+    async def close(self):
+        # Fermer les sessions HTTP partagées avec les fournisseurs LLM
+        await fermer_sessions()
+        # Arrêter les processus de lecture des documents
+        fermer_pool_documents()
+        # Conserver les métriques des appels LLM si un fichier est configuré
+        if os.getenv("METRIQUES_FICHIER"):
+            ecrire_metriques(os.getenv("METRIQUES_FICHIER"))
+        await super().close()
+
+bot = JobHunterBot(command_prefix='!', intents=intents, tree_cls=JobHunterTree)
 
 @bot.event
 async def on_ready():
@@ -72,6 +93,7 @@ def setup(bot):
     setup_upload_cv_command(bot)  # Ajout de la commande de téléchargement de CV
     setup_compare_command(bot)
     setup_letter_command(bot)
+    setup_metriques_command(bot)
     
     # Configurer les commandes de parsing de CV (version originale)
     if PARSE_CV_COMMANDS_AVAILABLE:
@@ -85,36 +107,44 @@ def setup(bot):
     else:
         print("❌ Commandes PartieLLM non configurées (clé API manquante)")
 
-# Initialiser les commandes
-setup(bot)
+# Démarrage uniquement si le fichier est exécuté : les processus de lecture des documents
+# (utils/documents.py) réimportent ce module sans relancer le bot
+if __name__ == "__main__":
+    print("\n=== DÉMARRAGE DU BOT PRINCIPAL ===")
 
-# Démarrer le bot
-TOKEN = os.getenv("DISCORD_TOKEN")
+    # Initialiser les commandes
+    setup(bot)
 
-if TOKEN is None:
-    print("❌ Le token Discord est introuvable. Vérifie ton fichier .env.")
-else:
-    print(f"Démarrage du bot avec le token: {'*' * len(TOKEN)}")
-    
-    print("\n📋 Commandes disponibles :")
-    print("  Commandes slash (/) :")
-    print("  - /telecharger_cv - Télécharger un CV pour analyse")
-    print("  - /extraire_cv - Extraire les informations d'un CV avec Mistral")
-    print("  - /extraire_cv_gemini - Extraire les informations d'un CV avec Gemini")
-    if PARSE_CV_COMMANDS_AVAILABLE:
-        print("  - /parse_cv_mistral - Analyser un CV avec Mistral et générer un fichier JSON")
-        print("  - /parse_cv_gemini - Analyser un CV avec Gemini et générer un fichier JSON")
-    print("  - /chercher_emploi - Rechercher des offres d'emploi")
-    print("  - /selectionner_offre - Sélectionner une offre d'emploi")
-    print("  - /comparer_cv_offre - Comparer votre CV avec la fiche de poste")
-    print("  - /analyser_cv_offre - Analyser la compatibilité CV/offre (Groupe 5)")
-    print("  - /infos_lettre_g5 - Ajouter des informations pour la lettre (Groupe 5)")
-    print("  - /generer_lettre - Générer une lettre de motivation")
-    print("  - /generer_lettre_g5 - Générer une lettre avec Gemini (Groupe 5)")
-    
-    print("\n  Commandes préfixées (!) :")
-    if PARSE_CV_COMMANDS_AVAILABLE:
-        print("  - !parse_cv - Analyser un CV avec Mistral (ancienne méthode)")
-    
-    print("\nDémarrage du bot...")
-    bot.run(TOKEN)
+    # Démarrer le bot
+    TOKEN = os.getenv("DISCORD_TOKEN")
+
+    if TOKEN is None:
+        print("❌ Le token Discord est introuvable. Vérifie ton fichier .env.")
+    else:
+        print(f"Démarrage du bot avec le token: {'*' * len(TOKEN)}")
+
+        print("\n📋 Commandes disponibles :")
+        print("  Commandes slash (/) :")
+        print("  - /telecharger_cv - Télécharger un CV pour analyse")
+        print("  - /extraire_cv - Extraire les informations d'un CV avec Mistral")
+        print("  - /extraire_cv_gemini - Extraire les informations d'un CV avec Gemini")
+        if PARSE_CV_COMMANDS_AVAILABLE:
+            print("  - /parse_cv_mistral - Analyser un CV avec Mistral et générer un fichier JSON")
+            print("  - /parse_cv_gemini - Analyser un CV avec Gemini et générer un fichier JSON")
+        print("  - /chercher_emploi - Rechercher des offres d'emploi")
+        print("  - /selectionner_offre - Sélectionner une offre d'emploi")
+        print("  - /comparer_cv_offre - Comparer votre CV avec la fiche de poste")
+        print("  - /analyser_cv_offre - Analyser la compatibilité CV/offre (Groupe 5)")
+        print("  - /infos_lettre_g5 - Ajouter des informations pour la lettre (Groupe 5)")
+        print("  - /generer_lettre - Générer une lettre de motivation")
+        print("  - /generer_lettre_g5 - Générer une lettre avec Gemini (Groupe 5)")
+        print("  - /cribler_offres - Évaluer toutes les offres de la dernière recherche (Groupe 5)")
+        print("  - /generer_lettres_g5 - Générer les lettres de plusieurs offres en une archive (Groupe 5)")
+        print("  - /metriques_llm - Coût et latence des appels LLM (administrateurs)")
+
+        print("\n  Commandes préfixées (!) :")
+        if PARSE_CV_COMMANDS_AVAILABLE:
+            print("  - !parse_cv - Analyser un CV avec Mistral (ancienne méthode)")
+
+        print("\nDémarrage du bot...")
+        bot.run(TOKEN)